@@ -0,0 +1,112 @@
+"""
+Benchmark: backpressure between vehicles and a transport that can't
+keep up, e.g. during an SQS latency spike.
+
+Vehicles run with the `VehicleScheduler` against a sink that takes
+`--latency` seconds per message with `--workers` threads, so the fleet
+produces more messages than the transport sends. Compares the
+`AsyncMessageSender` without an in-flight limit, where the backlog
+piles up, against the `QueuedMessageSender` bounded queue policies.
+
+Reports produced steps and sent messages per second, dropped and
+coalesced messages, the backlog left when the run stops, and the age of
+sent messages, from their `created_time` to the send.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+import json
+import random
+import threading
+import time
+from typing import Union
+from app.core.interfaces import MessageSender
+from app.core.scheduler import VehicleScheduler
+from app.core.send import AsyncMessageSender, QueuedMessageSender
+from app.core.vehicle_factory import BasicVehicleFactory, singleton_map
+
+
+class SlowSink(MessageSender):
+    """Takes `latency` seconds per message, records messages age"""
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.ages: list = []
+        self._lock = threading.Lock()
+
+    def send_message(self, message):
+        time.sleep(self.latency)
+        created_time = datetime.fromisoformat(
+            json.loads(message)['created_time'])
+        age = (datetime.now(timezone.utc) - created_time).total_seconds()
+        with self._lock:
+            self.ages.append(age)
+
+
+def create_sender(mode: str, sink: SlowSink, queue_size: int,
+                  workers: int
+                  ) -> Union[AsyncMessageSender, QueuedMessageSender]:
+    if mode == 'unbounded':
+        return AsyncMessageSender(sender=sink, max_workers=workers,
+                                  max_in_flight=10**9)
+    return QueuedMessageSender(sender=sink, max_size=queue_size,
+                               policy=mode, max_workers=workers)
+
+
+def run(mode: str, args) -> dict:
+    sink = SlowSink(latency=args.latency)
+    sender = create_sender(mode, sink, args.queue_size, args.workers)
+    factory = BasicVehicleFactory(map_singleton=singleton_map,
+                                  message_sender=sender)
+    vehicles = [factory.create_vehicle() for _ in range(args.vehicles)]
+    scheduler = VehicleScheduler(
+        vehicles=vehicles, intervals=[args.interval] * len(vehicles),
+        workers=10, message_sender=sender, rng=random.Random(0))
+    asyncio.run(scheduler.run(duration=args.duration))
+    sent = len(sink.ages)
+    backlog = sender.stats.get('queued', sender.stats.get('in_flight'))
+    ages = sorted(sink.ages)
+    start = time.perf_counter()
+    sender.close()
+    return {
+        'steps_per_sec': scheduler.steps / scheduler.elapsed,
+        'sent_per_sec': sent / scheduler.elapsed,
+        'dropped': sender.stats.get('messages_dropped', 0),
+        'coalesced': sender.stats.get('messages_coalesced', 0),
+        'backlog': backlog,
+        'drain_sec': time.perf_counter() - start,
+        'age_p50': ages[len(ages) // 2],
+        'age_p99': ages[int(len(ages) * 0.99)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--vehicles', type=int, default=500)
+    parser.add_argument('--interval', type=float, default=0.5,
+                        help="reporting interval of a vehicle, seconds")
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help="transport latency per message, seconds")
+    parser.add_argument('--workers', type=int, default=8,
+                        help="transport threads")
+    parser.add_argument('--queue-size', type=int, default=1_000)
+    parser.add_argument('--duration', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"demand {args.vehicles / args.interval:,.0f} messages/s, "
+          f"transport capacity {args.workers / args.latency:,.0f} "
+          f"messages/s")
+    print(f"{'mode':>11} {'steps/s':>8} {'sent/s':>7} {'dropped':>8} "
+          f"{'coalesced':>10} {'backlog':>8} {'drain s':>8} "
+          f"{'age p50 ms':>11} {'age p99 ms':>11}")
+    for mode in ('unbounded', 'block', 'drop_oldest', 'coalesce'):
+        result = run(mode, args)
+        print(f"{mode:>11} {result['steps_per_sec']:>8,.0f} "
+              f"{result['sent_per_sec']:>7,.0f} {result['dropped']:>8,} "
+              f"{result['coalesced']:>10,} {result['backlog']:>8,} "
+              f"{result['drain_sec']:>8.2f} "
+              f"{result['age_p50'] * 1000:>11,.0f} "
+              f"{result['age_p99'] * 1000:>11,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: tasks assigned per second by the `TaskDispatcher` and total
+fleet travel distance to assigned tasks, per strategy.
+
+Idle vehicles and tasks are placed uniformly at random on a square map,
+a single dispatch cycle assigns a batch of tasks. The `random` row is
+the travel distance without a dispatcher, when every vehicle draws its
+own random task.
+"""
+import argparse
+import math
+import random
+import time
+from app.core.dispatcher import DISPATCH_STRATEGIES, TaskDispatcher
+from app.core.spatial import SpatialGridIndex
+from app.utils import schemas
+
+
+def create_fleet(qty_vehicles: int, map_size: int, rng: random.Random):
+    index = SpatialGridIndex()
+    for key in range(qty_vehicles):
+        index.insert(key, rng.randrange(map_size), rng.randrange(map_size))
+    return index
+
+
+def run(qty_vehicles: int, qty_tasks: int, map_size: int) -> None:
+    rng = random.Random(0)
+    index = create_fleet(qty_vehicles, map_size, rng)
+    tasks = [schemas.Location(x=rng.randrange(map_size),
+                              y=rng.randrange(map_size))
+             for _ in range(qty_tasks)]
+
+    random_distance = sum(
+        math.hypot(task.x - index.location(key)[0],
+                   task.y - index.location(key)[1])
+        for key, task in zip(range(qty_vehicles), tasks))
+    assigned = min(qty_vehicles, qty_tasks)
+    print(f"{qty_vehicles:>9,} {qty_tasks:>8,} {'random':>8} {'':>12} "
+          f"{random_distance:>12,.0f} {random_distance / assigned:>8.1f}")
+
+    for strategy in DISPATCH_STRATEGIES:
+        dispatcher = TaskDispatcher(spatial_index=index, strategy=strategy,
+                                    batch_size=qty_tasks)
+        for key in range(qty_vehicles):
+            dispatcher.request_task(key)
+        for task in tasks:
+            dispatcher.submit(task)
+        start = time.perf_counter()
+        assigned = dispatcher.dispatch()
+        rate = assigned / (time.perf_counter() - start)
+        print(f"{qty_vehicles:>9,} {qty_tasks:>8,} {strategy:>8} "
+              f"{rate:>12,.0f} {dispatcher.travel_distance:>12,.0f} "
+              f"{dispatcher.travel_distance / assigned:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--vehicles', type=int, nargs='+',
+                        default=[1_000, 10_000])
+    parser.add_argument('--tasks-ratio', type=float, nargs='+',
+                        default=[0.5, 1.0],
+                        help="tasks per vehicle in a dispatch cycle")
+    parser.add_argument('--map-size', type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"map {args.map_size}x{args.map_size}")
+    print(f"{'vehicles':>9} {'tasks':>8} {'strategy':>8} {'tasks/s':>12} "
+          f"{'distance':>12} {'mean':>8}")
+    for qty_vehicles in args.vehicles:
+        for ratio in args.tasks_ratio:
+            run(qty_vehicles, int(qty_vehicles * ratio), args.map_size)
+
+
+if __name__ == '__main__':
+    main()
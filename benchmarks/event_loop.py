@@ -0,0 +1,83 @@
+"""
+Benchmark: event loop lag and messages per second of the vehicle loop.
+
+Runs vehicles with `vehicle_execution_loop` against a slow local SQS
+stand-in, once with the blocking `SQSMessageSender` and once with the
+`AsyncMessageSender` that hands off messages to a thread pool. Event
+loop lag is measured by a coroutine that sleeps for a fixed interval and
+records how late it wakes up.
+"""
+import argparse
+import asyncio
+from asyncio import Semaphore
+import statistics
+import time
+from app.app import vehicle_execution_loop
+from app.core.send import AsyncMessageSender, SQSMessageSender
+from app.core.vehicle_factory import BasicVehicleFactory, singleton_map
+from benchmarks.stubs import LocalSQSServer
+
+LAG_PROBE_INTERVAL = 0.01
+
+
+async def probe_event_loop_lag(lags: list, stop: asyncio.Event) -> None:
+    """Records how late the event loop wakes up a sleeping coroutine"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - LAG_PROBE_INTERVAL)
+
+
+async def run_fleet(message_sender, qty: int, rounds: int) -> list:
+    """Runs the fleet, returns event loop lags"""
+    factory = BasicVehicleFactory(map_singleton=singleton_map,
+                                  message_sender=message_sender)
+    vehicles = [factory.create_vehicle() for _ in range(qty)]
+    semaphore = Semaphore(qty)
+    lags: list = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_event_loop_lag(lags, stop))
+    async with asyncio.TaskGroup() as tg:
+        for vehicle in vehicles:
+            tg.create_task(vehicle_execution_loop(
+                vehicle=vehicle,
+                rounds=rounds,
+                run_infinitely=False,
+                sleep_min=0.1,
+                sleep_max=0.2,
+                semaphore=semaphore,
+                message_sender=message_sender))
+    stop.set()
+    await probe
+    return lags
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--vehicles', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help="Stand-in response latency, seconds")
+    args = parser.parse_args()
+
+    print(f"{'sender':>10} {'messages/s':>11} {'lag mean ms':>12} "
+          f"{'lag p99 ms':>11} {'lag max ms':>11}")
+    for name in ('blocking', 'async'):
+        with LocalSQSServer(latency=args.latency) as server:
+            sender = SQSMessageSender(endpoint_url=server.endpoint_url)
+            if name == 'async':
+                sender = AsyncMessageSender(sender=sender)
+            start = time.perf_counter()
+            lags = asyncio.run(run_fleet(sender, args.vehicles, args.rounds))
+            sender.close()
+            elapsed = time.perf_counter() - start
+            messages = server.requests['SendMessage']
+        lags_ms = sorted(lag * 1000 for lag in lags)
+        p99 = lags_ms[int(len(lags_ms) * 0.99)]
+        print(f"{name:>10} {messages / elapsed:>11,.0f} "
+              f"{statistics.mean(lags_ms):>12.1f} {p99:>11.1f} "
+              f"{lags_ms[-1]:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
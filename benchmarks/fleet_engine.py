@@ -0,0 +1,61 @@
+"""
+Benchmark: vehicles stepped per second.
+
+Compares the batched `FleetEngine.tick` against stepping each vehicle
+with `Vehicle.run_execution_step`. Telemetry of the per-object path is
+sent to a `NullMessageSender`, so only simulation cost is measured.
+"""
+import argparse
+import time
+from app.core.fleet import FleetEngine
+from app.core.location import NavigationMap
+from app.core.vehicle_factory import BasicVehicleFactory, singleton_map
+from benchmarks.stubs import NullMessageSender
+
+
+def per_object_rate(nav_map: NavigationMap, qty: int, steps: int) -> float:
+    """Vehicles stepped per second by the per-object path"""
+    factory = BasicVehicleFactory(map_singleton=nav_map,
+                                  message_sender=NullMessageSender())
+    vehicles = [factory.create_vehicle() for _ in range(qty)]
+    start = time.perf_counter()
+    for _ in range(steps):
+        for vehicle in vehicles:
+            vehicle.run_execution_step()
+    elapsed = time.perf_counter() - start
+    return qty * steps / elapsed
+
+
+def fleet_engine_rate(nav_map: NavigationMap, qty: int, steps: int) -> float:
+    """Vehicles stepped per second by the FleetEngine"""
+    engine = FleetEngine(size=qty, nav_map=nav_map)
+    start = time.perf_counter()
+    engine.run(steps)
+    elapsed = time.perf_counter() - start
+    return qty * steps / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--vehicles', type=int, nargs='+',
+                        default=[1_000, 10_000, 100_000])
+    parser.add_argument('--steps', type=int, default=20)
+    parser.add_argument('--max-object-vehicles', type=int, default=10_000,
+                        help="Skip the per-object path above this fleet size")
+    args = parser.parse_args()
+
+    nav_map = singleton_map
+    print(f"{'vehicles':>10} {'per-object/s':>14} {'engine/s':>14} "
+          f"{'speedup':>8}")
+    for qty in args.vehicles:
+        engine_rate = fleet_engine_rate(nav_map, qty, args.steps)
+        if qty <= args.max_object_vehicles:
+            object_rate = per_object_rate(nav_map, qty, args.steps)
+            print(f"{qty:>10} {object_rate:>14,.0f} {engine_rate:>14,.0f} "
+                  f"{engine_rate / object_rate:>7.1f}x")
+        else:
+            print(f"{qty:>10} {'-':>14} {engine_rate:>14,.0f} {'-':>8}")
+
+
+if __name__ == '__main__':
+    main()
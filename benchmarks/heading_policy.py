@@ -0,0 +1,77 @@
+"""
+Benchmark: heading decisions per second of `HeadingDirectionManager`,
+probabilities rebuilt on every decision against the compiled
+`HeadingPolicy` lookup, for single and batched decisions.
+
+Managers have the destination tracker of a vehicle as the heading
+provider, as created by the vehicle factory, plus optional extra
+providers with fixed suggestions.
+"""
+import argparse
+import time
+from app.core.heading import select_heading_directions
+from app.core.sinks import NullSink
+from app.core.vehicle_factory import BasicVehicleFactory, singleton_map
+from app.utils import schemas
+
+
+class FixedProvider:
+    """Heading provider suggesting the same directions"""
+    heading_directions = [schemas.Direction.UP]
+
+    def update_heading_directions(self):
+        pass
+
+
+def create_managers(qty: int, extra_providers: int):
+    factory = BasicVehicleFactory(map_singleton=singleton_map,
+                                  message_sender=NullSink())
+    managers = []
+    for _ in range(qty):
+        vehicle = factory.create_vehicle()
+        vehicle.run_execution_step()  # gets a destination
+        manager = vehicle.navigation_manager.heading_selector
+        for i in range(extra_providers):
+            manager.register_heading_provider(
+                provider=FixedProvider(), provider_name=f"extra {i}",
+                provider_weight=2)
+        managers.append(manager)
+    return managers
+
+
+def reference_decision(manager):
+    """Decision as made before compiling policies"""
+    probabilities = manager._calculate_heading_probabilities()
+    manager.heading_direction = manager.rng.choices(
+        population=list(probabilities),
+        weights=list(probabilities.values()), k=1)[0]
+
+
+def rate(decide, managers, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        decide(managers)
+    return len(managers) * rounds / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--managers', type=int, default=1_000)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'providers':>9} {'rebuilt/s':>12} {'compiled/s':>12} "
+          f"{'batched/s':>12}")
+    for extra_providers in (0, 1, 2):
+        managers = create_managers(args.managers, extra_providers)
+        rebuilt = rate(lambda ms: [reference_decision(m) for m in ms],
+                       managers, args.rounds)
+        compiled = rate(lambda ms: [m.update_heading_direction()
+                                    for m in ms], managers, args.rounds)
+        batched = rate(select_heading_directions, managers, args.rounds)
+        print(f"{1 + extra_providers:>9} {rebuilt:>12,.0f} "
+              f"{compiled:>12,.0f} {batched:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: records per second written by the SQS to DynamoDB Lambda.
+
+Compares writing one `PutItem` per record, of the track item and the
+latest state item, against the batched handler, for several SQS batch
+sizes, against a local DynamoDB stand-in. The batched handler writes
+track items in batches and a conditional latest state `PutItem` per
+vehicle, every record comes from a different vehicle.
+"""
+import argparse
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from common.schemas.sqs_messages import (
+    Location,
+    VehicleTrackingMessageV1_0_0,
+)
+from benchmarks.stubs import LocalDynamoDBServer, load_lambda
+
+
+def create_message(vehicle_id: uuid.UUID) -> str:
+    return VehicleTrackingMessageV1_0_0(
+        schema_version='1.0.0',
+        vehicle_id=vehicle_id,
+        task_state='In progress',
+        vehicle_location=Location(x=10, y=20),
+        destination=Location(x=50, y=60),
+        vehicle_speed=3,
+        distance_to_destination=56.6,
+        heading_direction='Up',
+        out_of_zone_status=False,
+        created_time=datetime.now(timezone.utc),
+    ).model_dump_json()
+
+
+def create_events(qty_records: int, batch_size: int) -> list:
+    """SQS events, each record from a different vehicle"""
+    records = [{'messageId': str(i), 'body': create_message(uuid.uuid4())}
+               for i in range(qty_records)]
+    return [{'Records': records[start:start + batch_size]}
+            for start in range(0, qty_records, batch_size)]
+
+
+def put_item_per_record(lambda_module, event) -> None:
+    """Writes a record at a time, as the handler did before batching"""
+    for record in event['Records']:
+        message = lambda_module.parse_record(record)
+        lambda_module.table.put_item(Item=lambda_module.track_item(message))
+        lambda_module.write_latest_state(
+            lambda_module.latest_state_item(message))
+
+
+def batched(lambda_module, event) -> None:
+    lambda_module.lambda_handler(event, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--batch-sizes', type=int, nargs='+',
+                        default=[1, 10, 100])
+    parser.add_argument('--records', type=int, default=2_000)
+    parser.add_argument('--latency', type=float, default=0.002,
+                        help="Stand-in response latency, seconds")
+    args = parser.parse_args()
+
+    print(f"{'batch size':>10} {'handler':>12} {'records/s':>10} "
+          f"{'requests':>9}")
+    with LocalDynamoDBServer(latency=args.latency) as server:
+        os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-central-1')
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'mock_access_key')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'mock_secret_key')
+        os.environ['AWS_ENDPOINT_URL_DYNAMODB'] = server.endpoint_url
+        os.environ['DYNAMODB_TABLE'] = 'vehicle-tracking'
+        lambda_module = load_lambda('sqs_to_dynamodb')
+
+        for batch_size in args.batch_sizes:
+            events = create_events(args.records, batch_size)
+            for name, handler in (('put_item', put_item_per_record),
+                                  ('batched', batched)):
+                requests_before = sum(server.requests.values())
+                start = time.perf_counter()
+                for event in events:
+                    handler(lambda_module, event)
+                elapsed = time.perf_counter() - start
+                requests = sum(server.requests.values()) - requests_before
+                print(f"{batch_size:>10} {name:>12} "
+                      f"{args.records / elapsed:>10,.0f} {requests:>9}")
+
+
+if __name__ == '__main__':
+    main()
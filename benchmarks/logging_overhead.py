@@ -0,0 +1,75 @@
+"""
+Benchmark: vehicle execution steps per second under logging
+configurations: debug records written synchronously, through the queue
+listener, sampled and rate limited, and with debug disabled.
+
+Logging settings are read at import time, so every configuration runs in
+a separate interpreter. Records are written to the null device.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+CONFIGURATIONS = {
+    'debug, sync': {'LOGGING_LEVEL': 'DEBUG', 'LOGGING_MODE': 'sync'},
+    'debug, queue': {'LOGGING_LEVEL': 'DEBUG', 'LOGGING_MODE': 'queue'},
+    'debug, queue, sampled 1%': {
+        'LOGGING_LEVEL': 'DEBUG', 'LOGGING_MODE': 'queue',
+        'LOGGING_SAMPLING': 'app=0.01'},
+    'debug, queue, 100/s': {
+        'LOGGING_LEVEL': 'DEBUG', 'LOGGING_MODE': 'queue',
+        'LOGGING_RATE_LIMIT': 'app=100'},
+    'warning': {'LOGGING_LEVEL': 'WARNING', 'LOGGING_MODE': 'sync'},
+}
+
+
+def run_steps(qty_vehicles: int, steps: int) -> None:
+    """Prints steps per second of the per-object vehicle path, without
+    and with writing of queued records"""
+    # pylint: disable=import-outside-toplevel
+    from app.core.vehicle_factory import BasicVehicleFactory, singleton_map
+    from app.utils.logger import stop_logging
+    from benchmarks.stubs import NullMessageSender
+
+    factory = BasicVehicleFactory(map_singleton=singleton_map,
+                                  message_sender=NullMessageSender())
+    vehicles = [factory.create_vehicle() for _ in range(qty_vehicles)]
+    start = time.perf_counter()
+    for _ in range(steps):
+        for vehicle in vehicles:
+            vehicle.run_execution_step()
+    elapsed = time.perf_counter() - start
+    stop_logging()  # include writing queued records
+    elapsed_with_flush = time.perf_counter() - start
+    print(qty_vehicles * steps / elapsed,
+          qty_vehicles * steps / elapsed_with_flush)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--vehicles', type=int, default=100)
+    parser.add_argument('--steps', type=int, default=50)
+    parser.add_argument('--child', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_steps(args.vehicles, args.steps)
+        return
+
+    print(f"{'configuration':>25} {'steps/s':>10} {'incl. flush':>12}")
+    for name, env in CONFIGURATIONS.items():
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.logging_overhead', '--child',
+             '--vehicles', str(args.vehicles), '--steps', str(args.steps)],
+            env={**os.environ, 'LOGGING_SAMPLING': '',
+                 'LOGGING_RATE_LIMIT': '', **env},
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True,
+            text=True).stdout
+        rate, rate_with_flush = map(float, output.split())
+        print(f"{name:>25} {rate:>10,.0f} {rate_with_flush:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
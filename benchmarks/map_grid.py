@@ -0,0 +1,128 @@
+"""
+Benchmark: per-process memory and cell lookups per second of worker
+processes reading a large `NavigationMap` grid, memory-mapped with
+`load_grid` against loaded in full by every worker.
+
+Workers run concurrently, look up random cells with `is_passable` and
+`speed_limit`, then report their memory growth from
+`/proc/self/smaps_rollup`: RSS, private pages and PSS (proportional
+set size, shared pages divided by the number of processes sharing
+them). Linux only.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+import numpy as np
+from app.core.location import (
+    GRID_LAYERS,
+    NavigationMap,
+    create_grid_file,
+    load_grid,
+)
+from app.utils.schemas import MapSize
+
+
+def memory() -> dict:
+    """Memory of the current process in MiB"""
+    values = {}
+    with open('/proc/self/smaps_rollup') as smaps:
+        for line in smaps:
+            name, _, value = line.partition(':')
+            if value.strip().endswith('kB'):
+                values[name] = int(value.split()[0]) / 1024
+    return {
+        'rss': values['Rss'],
+        'pss': values['Pss'],
+        'private': values['Private_Clean'] + values['Private_Dirty'],
+    }
+
+
+def create_grid(path: str, map_size: MapSize, seed: int = 0) -> None:
+    """Random obstacles on 10% of cells and speed limits 1 to 5"""
+    rng = np.random.default_rng(seed)
+    grid = create_grid_file(path, map_size)
+    blocked = grid[GRID_LAYERS.index('blocked')]
+    speed_limit = grid[GRID_LAYERS.index('speed_limit')]
+    rows = 1_000
+    for start in range(0, map_size.x_size + 1, rows):
+        shape = blocked[start:start + rows].shape
+        blocked[start:start + rows] = rng.random(shape) < 0.1
+        speed_limit[start:start + rows] = rng.integers(1, 5, shape,
+                                                       endpoint=True)
+    grid.flush()
+    del grid
+
+
+def worker(path, mapped, map_size, lookups, seed, barrier, results):
+    rng = random.Random(seed)
+    cells = [(rng.randint(0, map_size.x_size), rng.randint(0, map_size.y_size))
+             for _ in range(lookups)]
+    before = memory()
+    grid = load_grid(path) if mapped else np.load(path)
+    nav_map = NavigationMap(map_size=map_size, grid=grid)
+    start = time.perf_counter()
+    for x, y in cells:
+        nav_map.is_passable(x, y)
+        nav_map.speed_limit(x, y)
+    elapsed = time.perf_counter() - start
+    # measure once all workers touched the grid, shared pages are then
+    # accounted to all of them
+    barrier.wait()
+    after = memory()
+    results.put({
+        'lookups_per_sec': lookups / elapsed,
+        **{name: after[name] - before[name] for name in after},
+    })
+    barrier.wait()
+
+
+def run(path, mapped, map_size, workers, lookups) -> dict:
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(path, mapped, map_size, lookups,
+                                             seed, barrier, results))
+        for seed in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return {name: sum(report[name] for report in reports) / workers
+            for name in reports[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=10_000,
+                        help="map x and y size")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--lookups', type=int, default=200_000,
+                        help="random cell lookups per worker")
+    parser.add_argument('--path', help="grid file, created if missing, "
+                        "a temporary file by default")
+    args = parser.parse_args()
+
+    map_size = MapSize(x_size=args.size, y_size=args.size)
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.path or os.path.join(directory, 'grid.npy')
+        if not os.path.exists(path):
+            create_grid(path, map_size)
+        print(f"grid {os.path.getsize(path) / 2**20:,.0f} MiB, "
+              f"{args.workers} workers, memory growth per worker in MiB")
+        print(f"{'mode':>6} {'lookups/s':>10} {'rss':>8} {'private':>8} "
+              f"{'pss':>8}")
+        for name, mapped in (('mmap', True), ('load', False)):
+            result = run(path, mapped, map_size, args.workers, args.lookups)
+            print(f"{name:>6} {result['lookups_per_sec']:>10,.0f} "
+                  f"{result['rss']:>8,.1f} {result['private']:>8,.1f} "
+                  f"{result['pss']:>8,.1f}")
+
+
+if __name__ == '__main__':
+    main()
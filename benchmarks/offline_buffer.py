@@ -0,0 +1,130 @@
+"""
+Benchmark: memory of offline buffers and replay throughput of buffered
+tracking messages after a fleet-wide outage.
+
+All trackers are forced OFFLINE for `--outage` execution steps, then
+reconnect at once. Buffered messages are kept in memory only, or in a
+small memory buffer spilled to memory-mapped segments in a temporary
+directory, or in a small memory buffer dropping the oldest messages.
+
+Reports buffered and dropped messages, buffer memory (message bytes
+and allocations traced during the outage), spilled bytes, and replay
+throughput of the reconnect, buffered messages sent one by one against
+batched `send_messages`, through `SQSMessageSender` and a local SQS
+stand-in.
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from typing import Tuple
+import boto3
+from app.core.interfaces import MessageSender
+from app.core.offline import SpillStore
+from app.core.send import AWS_REGION, SQSMessageSender
+from app.core.vehicle_factory import BasicVehicleFactory, singleton_map
+from app.utils.schemas import TrackerStatus
+from benchmarks.stubs import LocalSQSServer, answer_in_process
+
+
+class OneByOneSQSSender(SQSMessageSender):
+    """Replays buffered messages with a request per message"""
+    send_messages = MessageSender.send_messages
+
+
+def create_sender(batched: bool
+                  ) -> Tuple[SQSMessageSender, LocalSQSServer]:
+    """Sender answered in process by a local SQS stand-in, and the
+    stand-in"""
+    client = boto3.client('sqs', endpoint_url='http://127.0.0.1:1',
+                          region_name=AWS_REGION)
+    server = LocalSQSServer()
+    answer_in_process(client, server)
+    sender_class = SQSMessageSender if batched else OneByOneSQSSender
+    return sender_class(sqs_client=client, queue_name='benchmark'), server
+
+
+def set_status(vehicles, status: TrackerStatus) -> None:
+    for vehicle in vehicles:
+        vehicle.tracker_manager.statuses_values = [status]
+        vehicle.tracker_manager.statuses_weights = [1]
+
+
+def run(args, buffer_size: int, spill: bool, batched: bool) -> dict:
+    sender, server = create_sender(batched)
+    with tempfile.TemporaryDirectory() as directory:
+        spill_store = SpillStore(directory=directory,
+                                 max_bytes=args.spill_max_bytes) \
+            if spill else None
+        factory = BasicVehicleFactory(map_singleton=singleton_map,
+                                      message_sender=sender, root_seed=0,
+                                      offline_buffer_size=buffer_size,
+                                      offline_spill_store=spill_store)
+        vehicles = [factory.create_vehicle() for _ in range(args.vehicles)]
+        buffers = [vehicle.tracker_manager.offline_buffer
+                   for vehicle in vehicles]
+
+        set_status(vehicles, TrackerStatus.OFFLINE)
+        tracemalloc.start()
+        for _ in range(args.outage):
+            for vehicle in vehicles:
+                vehicle.run_execution_step()
+        traced, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        buffered = sum(map(len, buffers))
+        result = {
+            'buffered': buffered,
+            'dropped': sum(buffer.messages_dropped for buffer in buffers),
+            'memory_bytes': sum(buffer.memory_bytes for buffer in buffers),
+            'traced_bytes': traced,
+            'spilled_bytes': spill_store.stats['bytes_spilled']
+            if spill_store is not None else 0,
+        }
+
+        set_status(vehicles, TrackerStatus.ONLINE)
+        start = time.perf_counter()
+        for vehicle in vehicles:
+            vehicle.tracker_manager.update()
+            vehicle.tracker_manager.send_tracking_data()
+        elapsed = time.perf_counter() - start
+        if spill_store is not None:
+            spill_store.close()
+    result['requests'] = server.requests['SendMessage'] \
+        + server.requests['SendMessageBatch']
+    result['replay_per_sec'] = (buffered + len(vehicles)) / elapsed
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--vehicles', type=int, default=100)
+    parser.add_argument('--outage', type=int, default=300,
+                        help="outage length, execution steps")
+    parser.add_argument('--memory-buffer', type=int, default=20,
+                        help="messages per vehicle kept in memory by the "
+                        "small buffers")
+    parser.add_argument('--spill-max-bytes', type=int, default=256 * 2**20)
+    args = parser.parse_args()
+
+    print(f"{'buffer':>18} {'replay':>8} {'buffered':>9} {'dropped':>8} "
+          f"{'memory KiB':>11} {'traced KiB':>11} {'spilled KiB':>12} "
+          f"{'requests':>9} {'replay msgs/s':>14}")
+    configs = (
+        ('memory', args.outage, False, False),
+        ('memory', args.outage, False, True),
+        ('memory + spill', args.memory_buffer, True, True),
+        ('memory, drop', args.memory_buffer, False, True),
+    )
+    for name, buffer_size, spill, batched in configs:
+        result = run(args, buffer_size, spill, batched)
+        print(f"{name:>18} {'batched' if batched else 'single':>8} "
+              f"{result['buffered']:>9,} {result['dropped']:>8,} "
+              f"{result['memory_bytes'] / 1024:>11,.0f} "
+              f"{result['traced_bytes'] / 1024:>11,.0f} "
+              f"{result['spilled_bytes'] / 1024:>12,.0f} "
+              f"{result['requests']:>9,} "
+              f"{result['replay_per_sec']:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
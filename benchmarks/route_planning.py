@@ -0,0 +1,80 @@
+"""
+Benchmark: steps per completed task and out of zone steps of vehicles
+driven by the destination heading provider alone (biased random walk)
+against vehicles also following A* routes, with the route cache hit
+rate and execution steps per second.
+
+Optionally a share of map cells is blocked, routes avoid them.
+
+Vehicles only turn at speeds up to `TURN_SPEED_THRESHOLD`, and speed does
+not drop below 1 while moving, so the benchmark sets its own threshold.
+"""
+import argparse
+import random
+import time
+from app.core import movement
+from app.core.routing import RouteCache, RoutePlanner
+from app.core.sinks import NullSink
+from app.core.vehicle_factory import BasicVehicleFactory, singleton_map
+from app.utils.schemas import TaskState
+
+
+def run(route_planner, qty_vehicles: int, steps: int) -> dict:
+    factory = BasicVehicleFactory(map_singleton=singleton_map,
+                                  message_sender=NullSink(),
+                                  route_planner=route_planner)
+    vehicles = [factory.create_vehicle() for _ in range(qty_vehicles)]
+    completed_tasks = moving_steps = out_of_zone_steps = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        for vehicle in vehicles:
+            moving = vehicle.get_current_task_status() \
+                == TaskState.IN_PROGRESS
+            vehicle.run_execution_step()
+            if not moving:
+                continue
+            moving_steps += 1
+            out_of_zone_steps += vehicle.navigation_manager.out_of_zone_status
+            completed_tasks += vehicle.get_current_task_status() \
+                == TaskState.IDLE
+    elapsed = time.perf_counter() - start
+    return {
+        'steps_per_sec': qty_vehicles * steps / elapsed,
+        'completed_tasks': completed_tasks,
+        'steps_per_task': moving_steps / completed_tasks
+        if completed_tasks else float('inf'),
+        'out_of_zone': out_of_zone_steps / moving_steps,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--vehicles', type=int, default=200)
+    parser.add_argument('--steps', type=int, default=300)
+    parser.add_argument('--blocked-ratio', type=float, default=0.0,
+                        help="share of map cells blocked")
+    parser.add_argument('--turn-speed-threshold', type=int, default=1)
+    args = parser.parse_args()
+    movement.TURN_SPEED_THRESHOLD = args.turn_speed_threshold
+
+    rng = random.Random(0)
+    singleton_map.block_cells(
+        (rng.randint(0, singleton_map.x_size),
+         rng.randint(0, singleton_map.y_size))
+        for _ in range(int(args.blocked_ratio * singleton_map.x_size
+                           * singleton_map.y_size)))
+    print(f"{'mode':>12} {'steps/s':>10} {'tasks':>7} {'steps/task':>11} "
+          f"{'out of zone':>12} {'cache hits':>11}")
+    cache = RouteCache()
+    for name, planner in (('random walk', None),
+                          ('route', RoutePlanner(singleton_map, cache))):
+        result = run(planner, args.vehicles, args.steps)
+        hit_rate = f"{cache.hit_rate:.1%}" if planner else '-'
+        print(f"{name:>12} {result['steps_per_sec']:>10,.0f} "
+              f"{result['completed_tasks']:>7} "
+              f"{result['steps_per_task']:>11.1f} "
+              f"{result['out_of_zone']:>12.1%} {hit_rate:>11}")
+
+
+if __name__ == '__main__':
+    main()
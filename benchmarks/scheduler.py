@@ -0,0 +1,89 @@
+"""
+Benchmark: achieved execution steps per second against target rate.
+
+Compares the coroutine-per-vehicle `vehicle_execution_loop`, limited by
+a semaphore, against the `VehicleScheduler` with a fixed pool of
+workers. Every vehicle is scheduled to make a step per interval, so the
+target rate is number of vehicles divided by interval.
+"""
+import argparse
+import asyncio
+from asyncio import Semaphore
+import time
+from unittest.mock import patch
+from app.app import vehicle_execution_loop
+from app.core.scheduler import VehicleScheduler
+from app.core.vehicle import Vehicle
+from app.core.vehicle_factory import BasicVehicleFactory, singleton_map
+from benchmarks.stubs import NullMessageSender
+
+
+def count_steps(counter: list):
+    """Wraps execution step of vehicles to count steps"""
+    step = Vehicle.run_execution_step
+
+    def counted_step(self):
+        counter[0] += 1
+        step(self)
+    return patch.object(Vehicle, 'run_execution_step', counted_step)
+
+
+async def run_loops(vehicles, sender, interval, workers, duration) -> int:
+    counter = [0]
+    semaphore = Semaphore(workers)
+    try:
+        with count_steps(counter):
+            async with asyncio.timeout(duration), \
+                    asyncio.TaskGroup() as tg:
+                for vehicle in vehicles:
+                    tg.create_task(vehicle_execution_loop(
+                        vehicle=vehicle,
+                        rounds=0,
+                        run_infinitely=True,
+                        sleep_min=interval,
+                        sleep_max=interval,
+                        semaphore=semaphore,
+                        message_sender=sender))
+    except TimeoutError:
+        pass
+    return counter[0]
+
+
+async def run_scheduler(vehicles, sender, interval, workers,
+                        duration) -> int:
+    scheduler = VehicleScheduler(
+        vehicles=vehicles,
+        intervals=[interval] * len(vehicles),
+        workers=workers,
+        message_sender=sender)
+    await scheduler.run(duration=duration)
+    return scheduler.steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--vehicles', type=int, nargs='+',
+                        default=[100, 1_000, 10_000])
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--workers', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'vehicles':>10} {'mode':>10} {'target/s':>10} "
+          f"{'achieved/s':>11}")
+    for qty in args.vehicles:
+        for name, run in (('loop', run_loops), ('scheduler', run_scheduler)):
+            factory = BasicVehicleFactory(map_singleton=singleton_map,
+                                          message_sender=NullMessageSender())
+            vehicles = [factory.create_vehicle() for _ in range(qty)]
+            start = time.perf_counter()
+            steps = asyncio.run(run(vehicles, factory.message_sender,
+                                    args.interval, args.workers,
+                                    args.duration))
+            elapsed = time.perf_counter() - start
+            print(f"{qty:>10} {name:>10} {qty / args.interval:>10,.0f} "
+                  f"{steps / elapsed:>11,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark: tracking messages serialized per second by
+`BasicTrackerManager`, for the single-pass path and for the debug mode
+with full validation (`TRACKING_VALIDATE_MESSAGES`), per schema version.
+
+Each message is collected from vehicle state and serialized, as done by
+`update` and `send_tracking_data` on every execution step.
+"""
+import argparse
+import time
+from app.core.vehicle_factory import BasicVehicleFactory, singleton_map
+from benchmarks.stubs import NullMessageSender
+
+
+def create_tracker(schema_version: str, validate_messages: bool):
+    vehicle = BasicVehicleFactory(
+        map_singleton=singleton_map,
+        message_sender=NullMessageSender(),
+    ).create_vehicle(vehicle_index=0)
+    for _ in range(5):  # get a task in progress
+        vehicle.run_execution_step()
+    tracker = vehicle.tracker_manager
+    tracker.schema_version = schema_version
+    tracker.validate_messages = validate_messages
+    return tracker
+
+
+def messages_per_sec(tracker, qty: int) -> float:
+    start = time.perf_counter()
+    for _ in range(qty):
+        tracker.collect_tracking_data()
+        tracker._generate_tracking_message()  # pylint: disable=W0212
+    return qty / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{'schema':>7} {'validated/s':>12} {'single-pass/s':>14} "
+          f"{'speedup':>8}")
+    for schema_version in ('1.0.0', '2.0.0'):
+        validated = messages_per_sec(
+            create_tracker(schema_version, True), args.messages)
+        single_pass = messages_per_sec(
+            create_tracker(schema_version, False), args.messages)
+        print(f"{schema_version:>7} {validated:>12,.0f} "
+              f"{single_pass:>14,.0f} {single_pass / validated:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: vehicle execution steps per second with local message sinks,
+to measure message generation separately from transport.
+
+Runs the same fleet with the null, ring buffer, file (JSONL and binary)
+and Unix domain socket sinks, for each tracking schema version. The
+socket sink streams to a reader thread that drains the socket.
+"""
+import argparse
+import os
+import socket
+import tempfile
+import threading
+import time
+from app.core.sinks import (
+    FileSink,
+    NullSink,
+    RingBufferSink,
+    UnixSocketSink,
+)
+from app.core.vehicle_factory import BasicVehicleFactory, singleton_map
+
+
+def drain(server: socket.socket) -> None:
+    connection, _ = server.accept()
+    with connection:
+        while connection.recv(1 << 20):
+            pass
+
+
+def create_sinks(directory: str):
+    """Sink name and a function creating the sink"""
+    socket_path = os.path.join(directory, 'tracking.sock')
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen()
+
+    def unix_sink():
+        threading.Thread(target=drain, args=(server,), daemon=True).start()
+        return UnixSocketSink(path=socket_path, sink_format='jsonl')
+
+    return [
+        ('null', NullSink),
+        ('ring', RingBufferSink),
+        ('file jsonl', lambda: FileSink(
+            path=os.path.join(directory, 'tracking.jsonl'),
+            sink_format='jsonl')),
+        ('file binary', lambda: FileSink(
+            path=os.path.join(directory, 'tracking.bin'),
+            sink_format='binary')),
+        ('unix jsonl', unix_sink),
+    ]
+
+
+def run(sink, schema_version: str, qty_vehicles: int, steps: int) -> float:
+    factory = BasicVehicleFactory(map_singleton=singleton_map,
+                                  message_sender=sink)
+    vehicles = [factory.create_vehicle() for _ in range(qty_vehicles)]
+    for vehicle in vehicles:
+        vehicle.tracker_manager.schema_version = schema_version
+    start = time.perf_counter()
+    for _ in range(steps):
+        for vehicle in vehicles:
+            vehicle.run_execution_step()
+    sink.close()
+    return qty_vehicles * steps / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--vehicles', type=int, default=1_000)
+    parser.add_argument('--steps', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        sinks = create_sinks(directory)
+        print(f"{'sink':>12} {'schema':>7} {'steps/s':>10} {'MB':>7}")
+        for schema_version in ('1.0.0', '2.0.0'):
+            for name, create_sink in sinks:
+                sink = create_sink()
+                rate = run(sink, schema_version, args.vehicles, args.steps)
+                written = getattr(sink, 'bytes_written', 0) / 1e6
+                print(f"{name:>12} {schema_version:>7} {rate:>10,.0f} "
+                      f"{written:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: nearest neighbours and range queries per second of the
+`SpatialGridIndex` against a brute force scan of all vehicle locations,
+and the cost of keeping the index up to date.
+
+Vehicles are placed uniformly at random on a square map. Updates move
+every vehicle by up to `MAX_SPEED` cells, as an execution step does.
+"""
+import argparse
+import heapq
+import math
+import random
+import time
+from app.core.spatial import SpatialGridIndex, SPATIAL_INDEX_CELL_SIZE
+
+MAX_SPEED = 5
+
+
+def brute_force_nearest(locations, x, y, k):
+    return heapq.nsmallest(
+        k, ((math.hypot(lx - x, ly - y), key)
+            for key, (lx, ly) in locations.items()))
+
+
+def brute_force_range(locations, x_min, y_min, x_max, y_max):
+    return [key for key, (x, y) in locations.items()
+            if x_min <= x <= x_max and y_min <= y <= y_max]
+
+
+def rate(operation, queries) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        operation(*query)
+    return len(queries) / (time.perf_counter() - start)
+
+
+def run(qty_vehicles: int, map_size: int, cell_size: int, qty_queries: int,
+        k: int, range_size: int) -> None:
+    rng = random.Random(0)
+    locations = {key: (rng.randrange(map_size), rng.randrange(map_size))
+                 for key in range(qty_vehicles)}
+    index = SpatialGridIndex(cell_size=cell_size)
+    for key, location in locations.items():
+        index.insert(key, *location)
+
+    points = [(rng.randrange(map_size), rng.randrange(map_size))
+              for _ in range(qty_queries)]
+    nearest_queries = [(x, y, k) for x, y in points]
+    range_queries = [(x, y, x + range_size, y + range_size)
+                     for x, y in points]
+    # brute force is slow on large fleets, a fraction of queries is enough
+    brute_queries = max(qty_queries * 1_000 // qty_vehicles, 5)
+
+    moves = []
+    for key, (x, y) in locations.items():
+        moves.append((key, x + rng.randint(-MAX_SPEED, MAX_SPEED),
+                      y + rng.randint(-MAX_SPEED, MAX_SPEED)))
+
+    results = [
+        ('nearest', rate(index.nearest, nearest_queries),
+         rate(lambda *q: brute_force_nearest(locations, *q),
+              nearest_queries[:brute_queries])),
+        ('range', rate(index.range_query, range_queries),
+         rate(lambda *q: brute_force_range(locations, *q),
+              range_queries[:brute_queries])),
+        ('update', rate(index.move, moves),
+         rate(lambda key, x, y: locations.__setitem__(key, (x, y)), moves)),
+    ]
+    for name, indexed, brute_force in results:
+        print(f"{qty_vehicles:>9,} {name:>8} {indexed:>12,.0f} "
+              f"{brute_force:>12,.0f} {indexed / brute_force:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--vehicles', type=int, nargs='+',
+                        default=[10_000, 100_000])
+    parser.add_argument('--map-size', type=int, default=1_000)
+    parser.add_argument('--cell-size', type=int,
+                        default=SPATIAL_INDEX_CELL_SIZE)
+    parser.add_argument('--queries', type=int, default=2_000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--range-size', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"map {args.map_size}x{args.map_size}, cell size "
+          f"{args.cell_size}, k={args.k}, range {args.range_size}x"
+          f"{args.range_size}")
+    print(f"{'vehicles':>9} {'op':>8} {'index op/s':>12} "
+          f"{'brute op/s':>12} {'speedup':>9}")
+    for qty_vehicles in args.vehicles:
+        run(qty_vehicles, args.map_size, args.cell_size, args.queries,
+            args.k, args.range_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark: fleet startup time.
+
+Compares instantiating a fleet where every vehicle creates its own
+`SQSMessageSender` (own client, connection pool and queue resolution
+calls) against vehicles sharing a sender from `sender_registry`.
+Senders set up their client and queue on first send, the benchmark
+sets them up on creation to count the calls of every sender.
+
+Time to first message runs a fresh process per path, from the
+simulator import to the first message accepted by the queue: vehicles
+created one by one with `boto3` imported and the sender set up
+upfront, against `create_fleet`, frozen by the garbage collector as in the
+app, with the sender set up on the first send.
+
+Runs against a local SQS stand-in.
+"""
+import argparse
+import gc
+import json
+import subprocess
+import sys
+import time
+
+
+def per_vehicle_senders_startup(nav_map, endpoint_url, qty):
+    """Seconds to create a fleet with a sender per vehicle"""
+    # pylint: disable=import-outside-toplevel
+    from app.core.send import SQSMessageSender
+    from app.core.vehicle_factory import BasicVehicleFactory
+    factory = BasicVehicleFactory(map_singleton=nav_map)
+    start = time.perf_counter()
+    for _ in range(qty):
+        sender = SQSMessageSender(endpoint_url=endpoint_url)
+        _ = sender.queue_url
+        factory.create_vehicle(message_sender=sender)
+    return time.perf_counter() - start
+
+
+def shared_sender_startup(nav_map, endpoint_url, qty):
+    """Seconds to create a fleet sharing a sender from a registry"""
+    # pylint: disable=import-outside-toplevel
+    from app.core.send import MessageSenderRegistry
+    from app.core.vehicle_factory import BasicVehicleFactory
+    registry = MessageSenderRegistry()
+    factory = BasicVehicleFactory(map_singleton=nav_map)
+    start = time.perf_counter()
+    for _ in range(qty):
+        sender = registry.get_sender(endpoint_url=endpoint_url)
+        _ = sender.queue_url
+        factory.create_vehicle(message_sender=sender)
+    return time.perf_counter() - start
+
+
+def first_message(path: str, qty: int, endpoint_url: str) -> dict:
+    """Seconds of startup phases until the first message is sent, in a
+    fresh process"""
+    # pylint: disable=import-outside-toplevel,unused-import
+    start = time.perf_counter()
+    if path == 'eager':
+        import boto3  # noqa: F401
+    from app.core.send import SQSMessageSender
+    from app.core.vehicle_factory import BasicVehicleFactory, singleton_map
+    from app.utils.schemas import TrackerStatus
+    imported = time.perf_counter()
+    sender = SQSMessageSender(endpoint_url=endpoint_url)
+    if path == 'eager':
+        _ = sender.queue_url
+    factory = BasicVehicleFactory(map_singleton=singleton_map,
+                                  message_sender=sender)
+    if path == 'eager':
+        vehicles = [factory.create_vehicle() for _ in range(qty)]
+    else:
+        vehicles = factory.create_fleet(qty=qty)
+        gc.freeze()
+    built = time.perf_counter()
+    tracker = vehicles[0].tracker_manager
+    tracker.current_status = TrackerStatus.ONLINE
+    tracker.collect_tracking_data()
+    tracker.send_tracking_data()
+    sent = time.perf_counter()
+    return {
+        'import': imported - start,
+        'fleet': built - imported,
+        'first_send': sent - built,
+        'total': sent - start,
+    }
+
+
+def run_first_message(path: str, qty: int, endpoint_url: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.startup', '--first-message',
+         path, str(qty), endpoint_url],
+        check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--vehicles', type=int, nargs='+',
+                        default=[1_000, 10_000])
+    parser.add_argument('--max-per-vehicle-senders', type=int,
+                        default=1_000,
+                        help="Skip the sender-per-vehicle path above "
+                             "this fleet size")
+    parser.add_argument('--first-message-vehicles', type=int,
+                        default=100_000,
+                        help="fleet size of the time to first message")
+    parser.add_argument('--first-message', nargs=3,
+                        metavar=('PATH', 'VEHICLES', 'ENDPOINT_URL'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.first_message:
+        path, qty, endpoint_url = args.first_message
+        print(json.dumps(first_message(path, int(qty), endpoint_url)))
+        return
+
+    # pylint: disable=import-outside-toplevel
+    from app.core.vehicle_factory import singleton_map
+    from benchmarks.stubs import LocalSQSServer
+    nav_map = singleton_map
+    print(f"{'vehicles':>10} {'path':>20} {'seconds':>9} "
+          f"{'control-plane calls':>20}")
+    for qty in args.vehicles:
+        runs = [('shared sender', shared_sender_startup)]
+        if qty <= args.max_per_vehicle_senders:
+            runs.insert(0, ('sender per vehicle',
+                            per_vehicle_senders_startup))
+        for name, run in runs:
+            with LocalSQSServer() as server:
+                seconds = run(nav_map, server.endpoint_url, qty)
+                calls = server.requests['CreateQueue'] \
+                    + server.requests['GetQueueUrl']
+            print(f"{qty:>10} {name:>20} {seconds:>9.2f} {calls:>20}")
+
+    qty = args.first_message_vehicles
+    print(f"\ntime to first message, {qty:,} vehicles, seconds")
+    print(f"{'path':>20} {'import':>7} {'fleet':>7} {'1st send':>9} "
+          f"{'total':>7}")
+    for name, path in (('one by one, eager', 'eager'),
+                       ('create_fleet, lazy', 'lazy')):
+        with LocalSQSServer() as server:
+            result = run_first_message(path, qty, server.endpoint_url)
+        print(f"{name:>20} {result['import']:>7.2f} {result['fleet']:>7.2f} "
+              f"{result['first_send']:>9.2f} {result['total']:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
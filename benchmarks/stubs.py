@@ -0,0 +1,197 @@
+"""In-process stand-ins for network dependencies used by benchmarks"""
+import hashlib
+import importlib.util
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from botocore.awsrequest import AWSResponse
+from app.core.interfaces import MessageSender
+
+
+class NullMessageSender(MessageSender):
+    """Discards messages, counts them"""
+    def __init__(self):
+        self.messages_sent = 0
+
+    def send_message(self, message):
+        self.messages_sent += 1
+
+
+class _AWSJSONRequestHandler(BaseHTTPRequestHandler):
+    """Serves AWS JSON protocol requests with the stand-in server"""
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        body = json.loads(self.rfile.read(
+            int(self.headers['Content-Length'])) or b'{}')
+        action = self.headers['X-Amz-Target'].split('.')[-1]
+        server: LocalAWSServer = self.server.stand_in
+        server.count(action)
+        if server.latency:
+            time.sleep(server.latency)
+
+        payload = json.dumps(server.handle(action, body)).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-amz-json-1.0')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class _StandInHTTPServer(ThreadingHTTPServer):
+    """HTTP server handing requests to its stand-in"""
+    daemon_threads = True
+
+    def __init__(self, server_address, handler_class,
+                 stand_in: 'LocalAWSServer'):
+        super().__init__(server_address, handler_class)
+        self.stand_in = stand_in
+
+
+class LocalAWSServer:
+    """Local HTTP stand-in for an AWS service using JSON protocol.
+
+    Counts requests per action and can add a fixed latency to every
+    response to simulate a slow endpoint. Use as a context manager.
+    """
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._server = _StandInHTTPServer(('127.0.0.1', 0),
+                                          _AWSJSONRequestHandler, self)
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+
+    @property
+    def endpoint_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def count(self, action: str) -> None:
+        with self._lock:
+            self.requests[action] += 1
+
+    def handle(self, action: str, body: dict) -> dict:
+        """Response to an action request"""
+        raise NotImplementedError
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _message_result(message_body: str) -> dict:
+    return {
+        'MessageId': str(uuid.uuid4()),
+        'MD5OfMessageBody': hashlib.md5(message_body.encode()).hexdigest(),
+    }
+
+
+class LocalSQSServer(LocalAWSServer):
+    """Serves the subset of SQS used by the simulator"""
+    def handle(self, action: str, body: dict) -> dict:
+        if action in ('CreateQueue', 'GetQueueUrl'):
+            return {'QueueUrl': f"{self.endpoint_url}/000000000000/"
+                                f"{body['QueueName']}"}
+        if action == 'SendMessage':
+            return _message_result(body['MessageBody'])
+        if action == 'SendMessageBatch':
+            return {
+                'Successful': [
+                    {'Id': entry['Id'],
+                     **_message_result(entry['MessageBody'])}
+                    for entry in body['Entries']],
+                'Failed': [],
+            }
+        return {}
+
+
+class LocalDynamoDBServer(LocalAWSServer):
+    """Serves the subset of DynamoDB used by the Lambda functions.
+
+    Items are stored by table and key. `unprocessed_ratio` of every batch
+    write is returned as unprocessed to exercise retries.
+    """
+    def __init__(self, latency: float = 0.0, key_attributes=('pk', 'sk'),
+                 unprocessed_ratio: float = 0.0):
+        super().__init__(latency=latency)
+        self.key_attributes = key_attributes
+        self.unprocessed_ratio = unprocessed_ratio
+        self.tables: dict = {}
+        self.items_written = 0
+
+    def _put(self, table_name: str, item: dict) -> None:
+        key = tuple(json.dumps(item[attribute], sort_keys=True)
+                    for attribute in self.key_attributes)
+        with self._lock:
+            self.tables.setdefault(table_name, {})[key] = item
+            self.items_written += 1
+
+    def handle(self, action: str, body: dict) -> dict:
+        if action == 'PutItem':
+            self._put(body['TableName'], body['Item'])
+            return {}
+        if action == 'BatchWriteItem':
+            unprocessed = {}
+            for table_name, requests in body['RequestItems'].items():
+                qty_unprocessed = int(len(requests) * self.unprocessed_ratio)
+                for request in requests[qty_unprocessed:]:
+                    self._put(table_name, request['PutRequest']['Item'])
+                if qty_unprocessed:
+                    unprocessed[table_name] = requests[:qty_unprocessed]
+            return {'UnprocessedItems': unprocessed}
+        return {}
+
+
+class _RawResponse:
+    """Raw body of a response answered in-process"""
+    def __init__(self, payload: bytes):
+        self.payload = payload
+
+    def stream(self, **kwargs):  # pylint: disable=unused-argument
+        yield self.payload
+
+
+def answer_in_process(client, stand_in: LocalAWSServer) -> None:
+    """Answers requests of a boto3 client with a stand-in, without HTTP.
+
+    Requests are still serialized and responses parsed by the client, so
+    only the network is left out. The stand-in server is not started.
+    """
+    def before_send(request, **kwargs):  # pylint: disable=unused-argument
+        target = request.headers['X-Amz-Target']
+        if isinstance(target, bytes):
+            target = target.decode()
+        body = json.loads(request.body or b'{}')
+        action = target.split('.')[-1]
+        stand_in.count(action)
+        payload = json.dumps(stand_in.handle(action, body)).encode()
+        return AWSResponse(request.url, 200,
+                           {'Content-Type': 'application/x-amz-json-1.0'},
+                           _RawResponse(payload))
+
+    client.meta.events.register('before-send', before_send)
+
+
+def load_lambda(name: str):
+    """Imports a Lambda function module from the `lambdas` folder"""
+    path = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                        'lambdas', name, 'lambda_function.py')
+    spec = importlib.util.spec_from_file_location(f"{name}_lambda", path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Cannot load Lambda function from {path}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
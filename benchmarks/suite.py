@@ -0,0 +1,263 @@
+"""
+Benchmark suite of the simulator and consumer hot paths.
+
+Every case times single operations and reports operations per second and
+p50/p99 latency. Results are stored as JSON baselines, by default to
+`benchmarks/baselines/<commit>.json`, and can be compared to flag
+regressions between commits:
+
+    python -m benchmarks.suite run [--filter NAME] [--output PATH]
+    python -m benchmarks.suite compare BASELINE CURRENT [--threshold 0.1]
+
+`compare` exits with status 1 if any case lost more than the threshold
+of its operations per second, or gained more than the threshold of its
+p50 latency.
+
+Cases run offline: the SQS sender and the Lambda DynamoDB client are
+answered in-process by stand-ins, HTTP is left out.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple
+import boto3
+from benchmarks.stubs import (
+    LocalDynamoDBServer,
+    LocalSQSServer,
+    NullMessageSender,
+    answer_in_process,
+    load_lambda,
+)
+
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+
+
+class Case(NamedTuple):
+    """Benchmark case, `setup` returns the operation to time.
+
+    Iterations are per repeat."""
+    name: str
+    setup: Callable[[], Callable[[], None]]
+    iterations: int
+
+
+def create_vehicle(steps: int = 5):
+    """Vehicle that made a few steps, so it has a task in progress"""
+    # pylint: disable=import-outside-toplevel
+    from app.core.vehicle_factory import BasicVehicleFactory, singleton_map
+    vehicle = BasicVehicleFactory(
+        map_singleton=singleton_map,
+        message_sender=NullMessageSender(),
+    ).create_vehicle(vehicle_index=0)
+    for _ in range(steps):
+        vehicle.run_execution_step()
+    return vehicle
+
+
+def setup_vehicle_step():
+    return create_vehicle().run_execution_step
+
+
+def setup_heading_update():
+    return create_vehicle().navigation_manager.heading_selector \
+        .update_heading_direction
+
+
+def setup_destination_tracker_update():
+    return create_vehicle().navigation_manager.destination_tracker \
+        .update_state
+
+
+def setup_serialization():
+    tracker = create_vehicle().tracker_manager
+
+    def serialize():
+        tracker.collect_tracking_data()
+        tracker._generate_tracking_message()  # pylint: disable=W0212
+    return serialize
+
+
+def setup_sqs_send():
+    # pylint: disable=import-outside-toplevel
+    from app.core.send import AWS_REGION, SQSMessageSender
+    client = boto3.client('sqs', endpoint_url='http://127.0.0.1:1',
+                          region_name=AWS_REGION)
+    answer_in_process(client, LocalSQSServer())
+    sender = SQSMessageSender(sqs_client=client, queue_name='benchmark')
+    tracker = create_vehicle().tracker_manager
+    tracker.collect_tracking_data()
+    message = tracker._generate_tracking_message()  # pylint: disable=W0212
+    return lambda: sender.send_message(message)
+
+
+def setup_lambda_handler(batch_size: int = 10):
+    os.environ.setdefault('DYNAMODB_TABLE', 'vehicle-tracking')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-central-1')
+    lambda_module = load_lambda('sqs_to_dynamodb')
+    answer_in_process(lambda_module.dynamodb.meta.client,
+                      LocalDynamoDBServer())
+    records = []
+    for i in range(batch_size):
+        tracker = create_vehicle(steps=5 + i).tracker_manager
+        tracker.collect_tracking_data()
+        records.append({'messageId': str(i),
+                        'body': tracker._generate_tracking_message()})
+    event = {'Records': records}
+    return lambda: lambda_module.lambda_handler(event, None)
+
+
+CASES = [
+    Case('vehicle_step', setup_vehicle_step, 2_000),
+    Case('heading_update', setup_heading_update, 2_000),
+    Case('destination_tracker_update', setup_destination_tracker_update,
+         2_000),
+    Case('serialization', setup_serialization, 2_000),
+    Case('sqs_send', setup_sqs_send, 400),
+    Case('lambda_handler_10_records', setup_lambda_handler, 100),
+]
+
+
+def measure(operation: Callable[[], None], iterations: int,
+            repeats: int) -> Dict:
+    """Times every call of an operation, after a warm up.
+
+    Operations per second is the median of repeats, latency percentiles
+    are taken over calls of all repeats. Garbage collection is disabled
+    while timing, as done by `timeit`.
+    """
+    for _ in range(max(iterations // 10, 1)):
+        operation()
+    latencies = []
+    rates = []
+    perf_counter_ns = time.perf_counter_ns
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = perf_counter_ns()
+            for _ in range(iterations):
+                call_start = perf_counter_ns()
+                operation()
+                latencies.append(perf_counter_ns() - call_start)
+            rates.append(iterations / (perf_counter_ns() - start) * 1e9)
+            gc.collect()
+    finally:
+        if gc_enabled:
+            gc.enable()
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        'iterations': iterations,
+        'repeats': repeats,
+        'ops_per_sec': round(statistics.median(rates), 1),
+        'p50_us': round(percentiles[49] / 1000, 2),
+        'p99_us': round(percentiles[98] / 1000, 2),
+    }
+
+
+def current_commit() -> str:
+    """Short hash of the checked out commit, `unknown` outside of git"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(args) -> None:
+    cases = [case for case in CASES
+             if not args.filter or args.filter in case.name]
+    commit = current_commit()
+    results = {}
+    print(f"{'case':>28} {'ops/s':>10} {'p50 us':>9} {'p99 us':>9}")
+    for case in cases:
+        result = measure(case.setup(), args.iterations or case.iterations,
+                         args.repeats)
+        results[case.name] = result
+        print(f"{case.name:>28} {result['ops_per_sec']:>10,.0f} "
+              f"{result['p50_us']:>9.2f} {result['p99_us']:>9.2f}")
+
+    output = args.output or os.path.join(BASELINES_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump({
+            'commit': commit,
+            'created_time': datetime.now(timezone.utc).isoformat(
+                timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': results,
+        }, file, indent=2)
+    print(f"Results stored to {output}")
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float
+                    ) -> List[str]:
+    """Names of cases that regressed by more than a threshold"""
+    regressions = []
+    print(f"{'case':>28} {'ops/s':>10} {'change':>8} {'p50 us':>9} "
+          f"{'change':>8} {'p99 us':>9}")
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"{name:>28} {'new case':>10}")
+            continue
+        ops_change = result['ops_per_sec'] / base['ops_per_sec'] - 1
+        p50_change = result['p50_us'] / base['p50_us'] - 1
+        regressed = ops_change < -threshold or p50_change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:>28} {result['ops_per_sec']:>10,.0f} "
+              f"{ops_change:>+8.1%} {result['p50_us']:>9.2f} "
+              f"{p50_change:>+8.1%} {result['p99_us']:>9.2f}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def compare(args) -> None:
+    with open(args.baseline, encoding='utf-8') as file:
+        baseline = json.load(file)
+    with open(args.current, encoding='utf-8') as file:
+        current = json.load(file)
+    print(f"Baseline {baseline['commit']}, current {current['commit']}, "
+          f"threshold {args.threshold:.0%}")
+    regressions = compare_results(baseline, current, args.threshold)
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="run cases, store results")
+    run_parser.add_argument('--filter', help="run cases containing NAME")
+    run_parser.add_argument('--iterations', type=int,
+                            help="override iterations of every case")
+    run_parser.add_argument('--repeats', type=int, default=5)
+    run_parser.add_argument('--output', help="results path")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser(
+        'compare', help="compare results, flag regressions")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help="relative change flagged, 0.1 is 10%%")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark: memory per vehicle.
+
+Builds fleets with `create_fleet` and reports bytes per vehicle traced by
+`tracemalloc`, after construction and after `--steps` execution steps,
+for vehicles with the destination heading provider only and for
+vehicles following A* routes.
+
+The breakdown of vehicles following routes lists shallow sizes of the
+components of a vehicle, the instance and its `__dict__`, if any, and
+the top allocation sites of the fleet per vehicle.
+"""
+import argparse
+import gc
+import sys
+import tracemalloc
+from app.core.routing import RouteCache, RoutePlanner
+from app.core.vehicle_factory import BasicVehicleFactory, singleton_map
+from benchmarks.stubs import NullMessageSender
+
+
+def components(vehicle) -> dict:
+    """Components of a vehicle by name"""
+    navigation = vehicle.navigation_manager
+    tracker = vehicle.tracker_manager
+    found = {
+        'Vehicle': vehicle,
+        'navigation manager': navigation,
+        'location service': navigation.location_service,
+        'movement manager': navigation.movement_manager,
+        'heading selector': navigation.heading_selector,
+        'destination tracker': navigation.destination_tracker,
+        'allowed zone manager': navigation.allowed_zone_manager,
+        'tasks manager': vehicle.tasks_manager,
+        'tracker manager': tracker,
+        'offline buffer': tracker.offline_buffer,
+        'rng': tracker.rng,
+    }
+    known = set(map(id, found.values()))
+    for provider in navigation.heading_selector.providers:
+        if id(provider) not in known:
+            found[type(provider).__name__] = provider
+    return found
+
+
+def shallow_size(component) -> int:
+    """Bytes of an instance and its attributes dict"""
+    size = sys.getsizeof(component)
+    instance_dict = getattr(component, '__dict__', None)
+    if instance_dict is not None:
+        size += sys.getsizeof(instance_dict)
+    return size
+
+
+def measure(args, routes: bool):
+    """Traced bytes per vehicle after construction and after steps, and
+    the snapshot of the fleet after construction"""
+    route_planner = RoutePlanner(singleton_map, RouteCache()) \
+        if routes else None
+    factory = BasicVehicleFactory(map_singleton=singleton_map,
+                                  message_sender=NullMessageSender(),
+                                  root_seed=0, route_planner=route_planner)
+    factory.create_fleet(qty=1)  # warm up caches and interned objects
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    vehicles = factory.create_fleet(qty=args.vehicles)
+    gc.collect()
+    built, _ = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    for _ in range(args.steps):
+        for vehicle in vehicles:
+            vehicle.run_execution_step()
+    gc.collect()
+    stepped, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ((built - start) / args.vehicles,
+            (stepped - start) / args.vehicles,
+            vehicles[0], snapshot)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--vehicles', type=int, default=10_000)
+    parser.add_argument('--steps', type=int, default=10)
+    parser.add_argument('--top', type=int, default=10,
+                        help="allocation sites in the breakdown")
+    args = parser.parse_args()
+
+    results = [(name, measure(args, routes))
+               for name, routes in (('destination', False),
+                                    ('routes', True))]
+    print(f"{'heading':>12} {'built B/veh':>12} "
+          f"{f'{args.steps} steps B/veh':>16}")
+    for name, (built, stepped, _, _) in results:
+        print(f"{name:>12} {built:>12,.0f} {stepped:>16,.0f}")
+
+    _, _, vehicle, snapshot = results[-1][1]
+    print(f"\n{'component':>24} {'bytes':>7} {'__dict__':>9}")
+    for name, component in components(vehicle).items():
+        has_dict = hasattr(component, '__dict__')
+        print(f"{name:>24} {shallow_size(component):>7,} "
+              f"{'yes' if has_dict else 'no':>9}")
+
+    print(f"\n{'allocation site':>48} {'B/veh':>7}")
+    for statistic in snapshot.statistics('lineno')[:args.top]:
+        frame = statistic.traceback[0]
+        site = f"{frame.filename.rsplit('/', 2)[-1]}:{frame.lineno}"
+        print(f"{site[-48:]:>48} {statistic.size / args.vehicles:>7,.0f}")
+
+
+if __name__ == '__main__':
+    main()
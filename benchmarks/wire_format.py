@@ -0,0 +1,75 @@
+"""
+Benchmark: tracking message size and encode/decode throughput of schema
+1.0.0 (JSON) against schema 2.0.0 (compact binary, base64 encoded).
+
+Decoding is measured both with `decode_tracking_message` and with the
+SQS to DynamoDB Lambda `parse_record`.
+"""
+import argparse
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from common.schemas.sqs_messages import (
+    VehicleTrackingMessageV1_0_0,
+    VehicleTrackingMessageV2_0_0,
+    decode_tracking_message,
+)
+from benchmarks.stubs import load_lambda
+
+SCHEMAS = {
+    '1.0.0': (VehicleTrackingMessageV1_0_0, 'model_dump_json'),
+    '2.0.0': (VehicleTrackingMessageV2_0_0, 'to_wire'),
+}
+
+
+def create_message(schema_version: str):
+    schema, _ = SCHEMAS[schema_version]
+    return schema(
+        schema_version=schema_version,
+        vehicle_id=uuid.uuid4(),
+        task_state='In progress',
+        vehicle_location={'x': 10, 'y': 20},
+        destination={'x': 50, 'y': 60},
+        vehicle_speed=3,
+        distance_to_destination=56.6,
+        heading_direction='Up',
+        out_of_zone_status=False,
+        created_time=datetime.now(timezone.utc),
+    )
+
+
+def ops_per_sec(func, qty: int) -> float:
+    start = time.perf_counter()
+    for _ in range(qty):
+        func()
+    return qty / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=20_000)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DYNAMODB_TABLE', 'vehicle-tracking')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-central-1')
+    lambda_module = load_lambda('sqs_to_dynamodb')
+
+    print(f"{'schema':>7} {'bytes':>6} {'encode/s':>10} {'decode/s':>10} "
+          f"{'lambda decode/s':>16}")
+    for schema_version, (_, encode_method) in SCHEMAS.items():
+        message = create_message(schema_version)
+        encode = getattr(message, encode_method)
+        body = encode()
+        record = {'body': body}
+        encoded = ops_per_sec(encode, args.messages)
+        decoded = ops_per_sec(lambda: decode_tracking_message(body),
+                              args.messages)
+        lambda_decoded = ops_per_sec(
+            lambda: lambda_module.parse_record(record), args.messages)
+        print(f"{schema_version:>7} {len(body.encode()):>6} "
+              f"{encoded:>10,.0f} {decoded:>10,.0f} {lambda_decoded:>16,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,26 @@
-"""Data validation for Vehicle tracking message"""
+"""
+Data validation for Vehicle tracking message.
+
+Two wire formats are supported:
+
+- `1.0.0` - JSON document.
+- `2.0.0` - compact fixed-layout binary record, base64 encoded to fit
+  into SQS text message body. Enums are stored as integers, vehicle id
+  as 16 bytes, created time as epoch milliseconds, distance to
+  destination in tenths.
+
+Use `decode_tracking_message` to decode a message of any version.
+
+Schema classes validate messages. On hot paths, where fields are already
+known to be valid, use `dump_tracking_message_json` and `encode_v2` to
+serialize a plain dict of fields without validation.
+"""
+import base64
+import json
+import math
+import struct
 from datetime import datetime, timezone
-from typing import Literal
+from typing import Literal, get_args
 from uuid import UUID
 from pydantic import (
     BaseModel,
@@ -8,9 +28,14 @@ from pydantic import (
     field_validator,
     NonNegativeFloat,
     NonNegativeInt,
+    TypeAdapter,
 )
 
 
+TaskState = Literal['Idle', 'In progress']
+HeadingDirection = Literal['Up', 'Down', 'Left', 'Right']
+
+
 class Location(BaseModel):
     """Vehicle location schema"""
     x: int = Field(..., ge=-100, le=200, description="Vehicle horizontal"
@@ -19,15 +44,16 @@ class Location(BaseModel):
                    " position on a map. Should be within expected range")
 
 
-class VehicleTrackingMessageV1_0_0(BaseModel):
-    """Schema of message send by vehicle to SQS queue"""
-    schema_version: Literal['1.0.0'] = Field(
+class _VehicleTrackingMessage(BaseModel):
+    """Fields of message send by vehicle to SQS queue, common to all
+    schema versions"""
+    schema_version: str = Field(
         ..., description="Version of the schema")
 
     vehicle_id: UUID = Field(
         ..., description="Unique identifier of the vehicle")
 
-    task_state: Literal['Idle', 'In progress'] = Field(
+    task_state: TaskState = Field(
         ..., description="Vehicle task execution state")
 
     vehicle_location: Location = Field(
@@ -42,7 +68,7 @@ class VehicleTrackingMessageV1_0_0(BaseModel):
     distance_to_destination: NonNegativeFloat = Field(
         ..., description="Distance to destination")
 
-    heading_direction: Literal['Up', 'Down', 'Left', 'Right'] = Field(
+    heading_direction: HeadingDirection = Field(
         ..., description="Vehicle heading direction")
 
     out_of_zone_status: bool = Field(
@@ -66,3 +92,122 @@ class VehicleTrackingMessageV1_0_0(BaseModel):
 
     class ConfigDict:
         extra = 'forbid'  # to prevent unexpected data in the message
+
+
+class VehicleTrackingMessageV1_0_0(_VehicleTrackingMessage):
+    """Schema of message send by vehicle to SQS queue"""
+    schema_version: Literal['1.0.0'] = Field(
+        ..., description="Version of the schema")
+
+
+# Binary layout of schema 2.0.0, little-endian:
+# version major, vehicle id, created time (epoch ms), task state,
+# heading direction, flags (bit 0 - out of zone), location x, y,
+# destination x, y, speed, distance to destination (tenths)
+V2_LAYOUT = struct.Struct('<B16sqBBBhhhhHI')
+V2_MAJOR_VERSION = 2
+V2_TASK_STATES = get_args(TaskState)
+V2_HEADING_DIRECTIONS = get_args(HeadingDirection)
+V2_DISTANCE_INFINITY = 0xFFFFFFFF
+V2_OUT_OF_ZONE_FLAG = 0x01
+
+# compiled once, serializes UUID and datetime values as schema does
+_fields_serializer = TypeAdapter(dict).serializer
+
+
+class VehicleTrackingMessageV2_0_0(_VehicleTrackingMessage):
+    """Schema of message send by vehicle to SQS queue, compact binary
+    wire format. Fields are the same as of schema 1.0.0, distance to
+    destination is kept with 0.1 precision, created time with
+    milliseconds precision.
+    """
+    schema_version: Literal['2.0.0'] = Field(
+        ..., description="Version of the schema")
+
+    def to_bytes(self) -> bytes:
+        """Encodes message to binary record"""
+        return encode_v2(self.model_dump())
+
+    def to_wire(self) -> str:
+        """Encodes message to SQS message body"""
+        return base64.b64encode(self.to_bytes()).decode('ascii')
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'VehicleTrackingMessageV2_0_0':
+        """Decodes and validates binary record"""
+        return cls.model_validate(decode_v2(data))
+
+    @classmethod
+    def from_wire(cls, body: str) -> 'VehicleTrackingMessageV2_0_0':
+        """Decodes and validates SQS message body"""
+        return cls.from_bytes(base64.b64decode(body))
+
+
+def dump_tracking_message_json(fields: dict) -> str:
+    """
+    Serializes a dict of message fields to JSON, without validation.
+
+    Fields are expected as produced by `model_dump`: locations as dicts,
+    vehicle id as UUID, created time as datetime.
+    """
+    return _fields_serializer.to_json(fields).decode()
+
+
+def encode_v2(fields: dict) -> bytes:
+    """Encodes a dict of message fields to schema 2.0.0 binary record,
+    without validation. Fields are expected as for
+    `dump_tracking_message_json`."""
+    distance = fields['distance_to_destination']
+    location = fields['vehicle_location']
+    destination = fields['destination']
+    return V2_LAYOUT.pack(
+        V2_MAJOR_VERSION,
+        fields['vehicle_id'].bytes,
+        round(fields['created_time'].timestamp() * 1000),
+        V2_TASK_STATES.index(fields['task_state']),
+        V2_HEADING_DIRECTIONS.index(fields['heading_direction']),
+        V2_OUT_OF_ZONE_FLAG if fields['out_of_zone_status'] else 0,
+        location['x'],
+        location['y'],
+        destination['x'],
+        destination['y'],
+        fields['vehicle_speed'],
+        V2_DISTANCE_INFINITY if math.isinf(distance)
+        else round(distance * 10),
+    )
+
+
+def decode_v2(data: bytes) -> dict:
+    """Decodes schema 2.0.0 binary record to a dict with the fields of
+    schema 1.0.0 JSON document, without validation"""
+    (major, vehicle_id, created_time, task_state, heading_direction,
+     flags, x, y, destination_x, destination_y, speed,
+     distance) = V2_LAYOUT.unpack(data)
+    if major != V2_MAJOR_VERSION:
+        raise ValueError(f"Expected schema major version "
+                         f"{V2_MAJOR_VERSION}, got {major}")
+    created_time = datetime.fromtimestamp(created_time / 1000,
+                                          tz=timezone.utc)
+    return {
+        'schema_version': '2.0.0',
+        'vehicle_id': str(UUID(bytes=vehicle_id)),
+        'task_state': V2_TASK_STATES[task_state],
+        'vehicle_location': {'x': x, 'y': y},
+        'destination': {'x': destination_x, 'y': destination_y},
+        'vehicle_speed': speed,
+        'distance_to_destination': math.inf
+        if distance == V2_DISTANCE_INFINITY else distance / 10,
+        'heading_direction': V2_HEADING_DIRECTIONS[heading_direction],
+        'out_of_zone_status': bool(flags & V2_OUT_OF_ZONE_FLAG),
+        'created_time': created_time.isoformat(timespec='milliseconds'),
+    }
+
+
+def decode_tracking_message(body: str) -> dict:
+    """
+    Decodes SQS message body of any schema version to a dict with the
+    fields of schema 1.0.0 JSON document, without validation.
+    """
+    if body.lstrip().startswith('{'):
+        return json.loads(body)
+    return decode_v2(base64.b64decode(body))
@@ -0,0 +1,110 @@
+"""
+Key layout and query helpers of the vehicle tracking DynamoDB table.
+
+The table stores a time series of tracking messages per vehicle:
+
+- partition key `pk` - vehicle id, optionally followed by a time bucket
+  (`<vehicle_id>#<bucket>`) to bound a partition size;
+- sort key `sk` - message creation time, UTC, fixed width ISO format
+  with milliseconds, so that lexicographic order is time order.
+
+Besides the track, every vehicle has a compact latest state item with
+partition key `<vehicle_id>` and sort key `LATEST`. Time sort keys start
+with a digit and always sort before `LATEST`, so range queries never
+return it. The latest state is written only if it was created after the
+stored one, see `write_latest_state` of the Lambda.
+
+The layout is written by `lambdas/sqs_to_dynamodb/lambda_function.py`,
+keep both in sync.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional
+from boto3.dynamodb.conditions import Key
+
+LATEST_STATE_SORT_KEY = 'LATEST'
+
+# Time bucket name and its duration, `none` keeps a partition per vehicle
+TIME_BUCKETS = {
+    'none': None,
+    'day': timedelta(days=1),
+    'hour': timedelta(hours=1),
+}
+
+
+def format_sort_key(created_time: datetime) -> str:
+    """Fixed width UTC time with milliseconds"""
+    created_time = created_time.astimezone(timezone.utc)
+    return f"{created_time:%Y-%m-%dT%H:%M:%S}." \
+           f"{created_time.microsecond // 1000:03d}Z"
+
+
+def format_bucket(created_time: datetime, bucket: str) -> Optional[str]:
+    """Time bucket of a creation time, None if not bucketed"""
+    if TIME_BUCKETS[bucket] is None:
+        return None
+    created_time = created_time.astimezone(timezone.utc)
+    if bucket == 'day':
+        return f"{created_time:%Y-%m-%d}"
+    return f"{created_time:%Y-%m-%dT%H}"
+
+
+def format_partition_key(vehicle_id: str, time_bucket: Optional[str]) -> str:
+    """Partition key of a track item"""
+    return vehicle_id if time_bucket is None \
+        else f"{vehicle_id}#{time_bucket}"
+
+
+def iterate_buckets(start: datetime, end: datetime,
+                    bucket: str) -> Iterator[Optional[str]]:
+    """Time buckets covering a time range, in time order, none if the
+    range is empty"""
+    step = TIME_BUCKETS[bucket]
+    if start > end:
+        return
+    if step is None:
+        yield None
+        return
+    current = start.astimezone(timezone.utc)
+    end = end.astimezone(timezone.utc)
+    current_bucket = None
+    while current <= end:
+        current_bucket = format_bucket(current, bucket)
+        yield current_bucket
+        current += step
+    # a step from within the range can pass over the bucket of its end
+    last_bucket = format_bucket(end, bucket)
+    if current_bucket != last_bucket:
+        yield last_bucket
+
+
+def query_track(table, vehicle_id: str, start: datetime, end: datetime,
+                bucket: str = 'none') -> List[dict]:
+    """
+    Fetch a vehicle track within a time range, in time order.
+
+    Without time buckets the track is fetched with a single `Query` call
+    (plus continuation calls if the result exceeds 1 MB). With time
+    buckets a `Query` is made per bucket covered by the range. A range
+    starting after its end is empty, no `Query` is made.
+    """
+    time_range = Key('sk').between(format_sort_key(start),
+                                   format_sort_key(end))
+    items = []
+    for time_bucket in iterate_buckets(start, end, bucket):
+        partition_key = format_partition_key(vehicle_id, time_bucket)
+        query = {'KeyConditionExpression':
+                 Key('pk').eq(partition_key) & time_range}
+        while True:
+            response = table.query(**query)
+            items.extend(response['Items'])
+            if 'LastEvaluatedKey' not in response:
+                break
+            query['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return items
+
+
+def get_latest_state(table, vehicle_id: str) -> Optional[dict]:
+    """Fetch the latest state item of a vehicle"""
+    response = table.get_item(
+        Key={'pk': vehicle_id, 'sk': LATEST_STATE_SORT_KEY})
+    return response.get('Item')
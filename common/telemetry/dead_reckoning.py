@@ -0,0 +1,134 @@
+"""
+Dead reckoning of vehicle locations between tracking messages.
+
+With dead reckoning reporting (`TRACKING_REPORTING=dead_reckoning` of
+the vehicle simulator) a vehicle does not send a message on every
+execution step, only when its state diverges from what consumers can
+derive from its last message:
+
+- task state or heading direction changed;
+- speed changed by more than a threshold;
+- location predicted by `predict_location` from the last message is
+  off by more than a threshold;
+- no message was sent for the heartbeat interval.
+
+Between two messages a vehicle keeps its heading direction, but for
+the last step, with a nearly constant speed, so consumers
+`interpolate_location` along the path at a constant speed. After the
+latest message use `predict_location_at`.
+
+The location threshold is checked against the location predicted by
+the number of execution steps since the last message, which consumers
+do not know. `predict_location_at` converts elapsed time to steps with
+a fixed step interval, so the threshold holds for consumers only if
+vehicles make steps at a fixed interval (`SLEEP_TIME_MIN_SEC` equal to
+`SLEEP_TIME_MAX_SEC` in the vehicle simulator, or the scheduler). With
+random step intervals, predict with the mean interval: the error grows
+with the spread of intervals and is bounded by the heartbeat.
+
+Messages are dicts with the fields of schema `1.0.0` JSON document, as
+returned by `decode_tracking_message`. Created time can be a `datetime`
+or an ISO format string.
+"""
+from bisect import bisect_right
+from datetime import datetime
+from typing import Iterable, List, Sequence, Tuple, Union
+
+# location shift of a single cell per heading direction
+HEADING_VECTORS = {
+    'Up': (0, 1),
+    'Down': (0, -1),
+    'Left': (-1, 0),
+    'Right': (1, 0),
+}
+
+
+def predict_location(location: dict, heading_direction: str, speed: int,
+                     steps: float) -> Tuple[float, float]:
+    """Location after `steps` execution steps at constant heading
+    direction and speed"""
+    shift_x, shift_y = HEADING_VECTORS[heading_direction]
+    distance = speed * steps
+    return (location['x'] + shift_x * distance,
+            location['y'] + shift_y * distance)
+
+
+def predict_location_at(message: dict, created_time: Union[datetime, str],
+                        step_interval: float) -> Tuple[float, float]:
+    """Location at a time after a message, assuming an execution step
+    every `step_interval` seconds. A vehicle idle at the message stays
+    there"""
+    location = message['vehicle_location']
+    if message['task_state'] == 'Idle':
+        return location['x'], location['y']
+    elapsed = _timestamp(created_time) - _timestamp(message['created_time'])
+    return predict_location(location, message['heading_direction'],
+                            message['vehicle_speed'],
+                            max(elapsed, 0) / step_interval)
+
+
+def _timestamp(created_time: Union[datetime, str]) -> float:
+    if isinstance(created_time, str):
+        created_time = datetime.fromisoformat(created_time)
+    return created_time.timestamp()
+
+
+def interpolate_location(previous: dict, following: dict,
+                         created_time: Union[datetime, str]
+                         ) -> Tuple[float, float]:
+    """Location at a time between two messages of a vehicle.
+
+    The last step before a message is made with the message heading
+    direction and speed, the steps before it with the heading direction
+    of the previous message. The location moves along these two legs at
+    a constant speed. A vehicle idle at the previous message stays there
+    until the following message. Clamped to the messages locations
+    outside of their times.
+    """
+    start = _timestamp(previous['created_time'])
+    end = _timestamp(following['created_time'])
+    time = _timestamp(created_time)
+    start_x = previous['vehicle_location']['x']
+    start_y = previous['vehicle_location']['y']
+    end_x = following['vehicle_location']['x']
+    end_y = following['vehicle_location']['y']
+    if time >= end:
+        return end_x, end_y
+    if time <= start or previous['task_state'] == 'Idle':
+        return start_x, start_y
+    # location before the last step
+    shift_x, shift_y = HEADING_VECTORS[following['heading_direction']]
+    speed = following['vehicle_speed']
+    turn_x, turn_y = end_x - shift_x * speed, end_y - shift_y * speed
+    first_leg = abs(turn_x - start_x) + abs(turn_y - start_y)
+    if first_leg + speed == 0:
+        # did not move between the messages
+        return start_x, start_y
+    distance = (first_leg + speed) * (time - start) / (end - start)
+    if distance <= first_leg:
+        share = distance / first_leg
+        return (start_x + (turn_x - start_x) * share,
+                start_y + (turn_y - start_y) * share)
+    share = (distance - first_leg) / speed
+    return turn_x + (end_x - turn_x) * share, turn_y + (end_y - turn_y) * share
+
+
+def interpolate_track(messages: Sequence[dict],
+                      times: Iterable[Union[datetime, str]]
+                      ) -> List[Tuple[float, float]]:
+    """Locations of a vehicle at given times, from its messages in time
+    order. Times outside of the messages time range get the location of
+    the first or the last message."""
+    if len(messages) == 1:
+        location = messages[0]['vehicle_location']
+        return [(location['x'], location['y']) for _ in times]
+    timestamps = [_timestamp(message['created_time'])
+                  for message in messages]
+    locations = []
+    for created_time in times:
+        # messages around the time, the first or the last pair outside
+        following = bisect_right(timestamps, _timestamp(created_time))
+        following = min(max(following, 1), len(messages) - 1)
+        locations.append(interpolate_location(
+            messages[following - 1], messages[following], created_time))
+    return locations
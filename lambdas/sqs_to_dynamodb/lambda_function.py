@@ -1,10 +1,64 @@
 """
 Implementation of Lambda function that shifts tracking messages from
 SQS queue to DynamoDB table.
+
+Every message is stored as a track item, keyed by vehicle id (optionally
+with a time bucket) and creation time. Besides, a compact latest state
+item is kept per vehicle. See `common/storage/tracking_table.py` for the
+table layout and query helpers, keep both in sync.
+
+Message bodies of schema `1.0.0` are JSON documents, of schema `2.0.0`
+base64 encoded binary records. Both are decoded to the same message
+fields, see `common/schemas/sqs_messages.py` for the binary layout, keep
+both in sync.
+
+Track items are written with `BatchWriteItem`, up to 25 items per
+request. Items with the same key within an invocation are coalesced to
+the most recently created one. Unprocessed items are retried with
+exponential backoff, if some are still unprocessed the invocation fails
+so SQS redelivers the batch.
+
+Latest state items are written with a conditional `PutItem`, only if no
+state of the vehicle is stored yet or the stored one was created
+earlier. Messages arrive out of order across invocations, as SQS
+redelivers messages and trackers replay messages buffered while offline,
+so an older state never overwrites a newer one.
 """
+import base64
 import json
 import os
+import struct
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import UUID
 import boto3
+from botocore.exceptions import ClientError
+
+MAX_BATCH_WRITE_ITEMS = 25  # DynamoDB `BatchWriteItem` limit
+BATCH_WRITE_MAX_RETRIES = int(os.environ.get('BATCH_WRITE_MAX_RETRIES', 5))
+BATCH_WRITE_BACKOFF_SEC = float(
+    os.environ.get('BATCH_WRITE_BACKOFF_SEC', 0.05))
+# `none`, `day` or `hour`
+TRACK_TIME_BUCKET = os.environ.get('TRACK_TIME_BUCKET', 'none')
+
+LATEST_STATE_SORT_KEY = 'LATEST'
+LATEST_STATE_FIELDS = (
+    'task_state',
+    'vehicle_location',
+    'destination',
+    'vehicle_speed',
+    'heading_direction',
+    'out_of_zone_status',
+)
+
+# schema 2.0.0 binary layout
+V2_LAYOUT = struct.Struct('<B16sqBBBhhhhHI')
+V2_MAJOR_VERSION = 2
+V2_TASK_STATES = ('Idle', 'In progress')
+V2_HEADING_DIRECTIONS = ('Up', 'Down', 'Left', 'Right')
+V2_DISTANCE_INFINITY = 0xFFFFFFFF
+V2_OUT_OF_ZONE_FLAG = 0x01
 
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table(os.environ['DYNAMODB_TABLE'])
@@ -12,16 +66,157 @@ table = dynamodb.Table(os.environ['DYNAMODB_TABLE'])
 
 def lambda_handler(event, context):
     """Lambda function entry point"""
-    for record in event['Records']:
-        message_body = json.loads(record['body'])
-        vehicle_id = message_body.get('vehicle_id', 'unknown')
-        table.put_item(
-            Item={
-                'vehicle_id': vehicle_id,
-                'data': message_body
-            }
-        )
+    messages = [parse_record(record) for record in event['Records']]
+    write_items(coalesce_items([track_item(message)
+                                for message in messages]))
+    for item in coalesce_items([latest_state_item(message)
+                                for message in messages]):
+        write_latest_state(item)
     return {
         'statusCode': 200,
         'body': json.dumps('Processed successfully')
     }
+
+
+def parse_record(record) -> dict:
+    """Parses SQS record body of any schema version to a message"""
+    body = record['body']
+    if body.lstrip().startswith('{'):
+        # DynamoDB does not accept float values
+        return json.loads(body, parse_float=Decimal)
+    return decode_v2(base64.b64decode(body))
+
+
+def decode_v2(data: bytes) -> dict:
+    """Decodes schema 2.0.0 binary record to a message"""
+    (major, vehicle_id, created_time, task_state, heading_direction,
+     flags, x, y, destination_x, destination_y, speed,
+     distance) = V2_LAYOUT.unpack(data)
+    if major != V2_MAJOR_VERSION:
+        raise ValueError(f"Unsupported schema major version {major}")
+    created_time = datetime.fromtimestamp(created_time / 1000,
+                                          tz=timezone.utc)
+    return {
+        'schema_version': '2.0.0',
+        'vehicle_id': str(UUID(bytes=vehicle_id)),
+        'task_state': V2_TASK_STATES[task_state],
+        'vehicle_location': {'x': x, 'y': y},
+        'destination': {'x': destination_x, 'y': destination_y},
+        'vehicle_speed': speed,
+        # DynamoDB does not accept infinity, store as null
+        'distance_to_destination': None if distance == V2_DISTANCE_INFINITY
+        else Decimal(distance) / 10,
+        'heading_direction': V2_HEADING_DIRECTIONS[heading_direction],
+        'out_of_zone_status': bool(flags & V2_OUT_OF_ZONE_FLAG),
+        'created_time': format_sort_key(created_time),
+    }
+
+
+def parse_created_time(message) -> datetime:
+    """Message creation time, current time if not available"""
+    created_time = message.get('created_time')
+    if created_time is None:
+        return datetime.now(timezone.utc)
+    # `fromisoformat` does not accept `Z` suffix before Python 3.11
+    return datetime.fromisoformat(created_time.replace('Z', '+00:00'))
+
+
+def format_sort_key(created_time: datetime) -> str:
+    """Fixed width UTC time with milliseconds"""
+    created_time = created_time.astimezone(timezone.utc)
+    return f"{created_time:%Y-%m-%dT%H:%M:%S}." \
+           f"{created_time.microsecond // 1000:03d}Z"
+
+
+def format_partition_key(vehicle_id: str, created_time: datetime) -> str:
+    """Vehicle id, followed by time bucket if enabled"""
+    created_time = created_time.astimezone(timezone.utc)
+    if TRACK_TIME_BUCKET == 'day':
+        return f"{vehicle_id}#{created_time:%Y-%m-%d}"
+    if TRACK_TIME_BUCKET == 'hour':
+        return f"{vehicle_id}#{created_time:%Y-%m-%dT%H}"
+    return vehicle_id
+
+
+def track_item(message) -> dict:
+    """Converts message to a track item"""
+    vehicle_id = message.get('vehicle_id', 'unknown')
+    created_time = parse_created_time(message)
+    return {
+        'pk': format_partition_key(vehicle_id, created_time),
+        'sk': format_sort_key(created_time),
+        'vehicle_id': vehicle_id,
+        'data': message
+    }
+
+
+def latest_state_item(message) -> dict:
+    """Converts message to a compact latest state item"""
+    vehicle_id = message.get('vehicle_id', 'unknown')
+    item = {
+        'pk': vehicle_id,
+        'sk': LATEST_STATE_SORT_KEY,
+        'vehicle_id': vehicle_id,
+        'created_time': format_sort_key(parse_created_time(message)),
+    }
+    item.update({field: message[field] for field in LATEST_STATE_FIELDS
+                 if field in message})
+    return item
+
+
+def item_key(item) -> tuple:
+    """Table key of an item"""
+    return (item['pk'], item['sk'])
+
+
+def item_created_time(item) -> str:
+    """Sortable creation time of an item"""
+    return item['sk'] if item['sk'] != LATEST_STATE_SORT_KEY \
+        else item['created_time']
+
+
+def coalesce_items(items) -> list:
+    """Keeps a single item per key, the one created last"""
+    latest: dict = {}
+    for item in items:
+        key = item_key(item)
+        if key not in latest or \
+                item_created_time(item) >= item_created_time(latest[key]):
+            latest[key] = item
+    return list(latest.values())
+
+
+def write_items(items: list) -> None:
+    """Writes items in batches"""
+    for start in range(0, len(items), MAX_BATCH_WRITE_ITEMS):
+        write_batch(items[start:start + MAX_BATCH_WRITE_ITEMS])
+
+
+def write_latest_state(item: dict) -> None:
+    """Writes latest state item unless a newer state is stored"""
+    try:
+        table.put_item(
+            Item=item,
+            ConditionExpression='attribute_not_exists(pk) '
+                                'OR created_time < :created_time',
+            ExpressionAttributeValues={':created_time': item['created_time']},
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        # the stored state is newer or the same, e.g. a redelivery
+
+
+def write_batch(items: list) -> None:
+    """Single batch write, retries unprocessed items"""
+    requests = [{'PutRequest': {'Item': item}} for item in items]
+    for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+        if attempt > 0:
+            time.sleep(BATCH_WRITE_BACKOFF_SEC * 2 ** (attempt - 1))
+        response = dynamodb.batch_write_item(
+            RequestItems={table.name: requests})
+        requests = response.get('UnprocessedItems', {}).get(table.name, [])
+        if not requests:
+            return
+    raise RuntimeError(f"{len(requests)} items unprocessed after "
+                       f"{BATCH_WRITE_MAX_RETRIES} retries")
@@ -39,13 +39,22 @@ resource "aws_sqs_queue" "vehicle_tracking" {
   message_retention_seconds         = 3600
 }
 
+# Time series of tracking messages, see common/storage/tracking_table.py
+# pk - vehicle id, optionally followed by a time bucket
+# sk - message creation time, `LATEST` for the latest state item
 resource "aws_dynamodb_table" "vehicle_tracking" {
   name         = var.dynamodb_table_name
   billing_mode = "PAY_PER_REQUEST"
-  hash_key     = "vehicle_id"
+  hash_key     = "pk"
+  range_key    = "sk"
 
   attribute {
-    name = "vehicle_id"
+    name = "pk"
+    type = "S"
+  }
+
+  attribute {
+    name = "sk"
     type = "S"
   }
 }
@@ -85,7 +94,8 @@ resource "aws_iam_policy" "lambda_executor_policy" {
       {
         Effect = "Allow",
         Action = [
-          "dynamodb:PutItem"
+          "dynamodb:PutItem",
+          "dynamodb:BatchWriteItem"
         ],
         Resource = aws_dynamodb_table.vehicle_tracking.arn
       },
@@ -116,7 +126,8 @@ resource "aws_lambda_function" "sqs_to_dynamodb" {
 
   environment {
     variables = {
-      DYNAMODB_TABLE = aws_dynamodb_table.vehicle_tracking.name
+      DYNAMODB_TABLE    = aws_dynamodb_table.vehicle_tracking.name
+      TRACK_TIME_BUCKET = var.track_time_bucket
     }
   }
 }
\ No newline at end of file
@@ -28,6 +28,12 @@ variable "dynamodb_table_name" {
   default     = "vehicle-tracking"
 }
 
+variable "track_time_bucket" {
+  description = "Time bucket of tracking table partitions: none, day or hour"
+  type        = string
+  default     = "none"
+}
+
 variable "lambda_role_name" {
   description = "The name of the IAM role for Lambda execution"
   type        = string
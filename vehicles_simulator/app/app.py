@@ -2,20 +2,62 @@
 Vehicle simulator app entry point.
 
 Instantiates vehicles and runs each in a asynchronous loop.
+
+With `SHARDS` greater than 1 the fleet is split across worker processes.
+Each shard runs its own vehicles, sender and random seed with the
+scheduler, the parent process aggregates shards statistics.
+
+With `METRICS_ENABLED` the app serves metrics at
+`http://METRICS_HOST:METRICS_PORT/metrics`, shards at consecutive
+ports, and logs a stats line every `METRICS_LOG_INTERVAL_SEC`.
+
+With `TASK_SOURCE=dispatcher` vehicles get tasks from the fleet
+`TaskDispatcher`, fed with random tasks while vehicles run.
 """
 import asyncio
 from asyncio import Semaphore
+from contextlib import asynccontextmanager
+import gc
+import multiprocessing
+import queue
 import random
+from typing import Any, Dict, List, Optional
 from decouple import config
 from app.core.vehicle import Vehicle
-from app.core.vehicle_factory import create_vehicle
-from app.utils.logger import get_logger
+from app.core.send import sender_registry
+from app.core.interfaces import MessageSender
+from app.core.dispatcher import run_dispatcher
+from app.core.scheduler import VehicleScheduler
+from app.core.vehicle_factory import (
+    create_fleet,
+    get_message_sender,
+    offline_spill_store,
+    task_dispatcher,
+)
+from app.utils.logger import get_logger, stop_logging
+from app.utils.metrics import (
+    METRICS_LOG_INTERVAL_SEC,
+    METRICS_PORT,
+    log_stats_periodically,
+    metrics,
+    monitor_event_loop_lag,
+    start_metrics_server,
+)
 
 
 RANDOM_SEED = config('RANDOM_SEED', cast=int)
+EXECUTION_MODE = config('EXECUTION_MODE', default='loop')
+SHARDS = config('SHARDS', cast=int, default=1)
+# how often the parent checks whether shards without results are alive
+SHARD_RESULT_POLL_SEC = 1.0
 
 logger = get_logger(__name__)
-random.seed(RANDOM_SEED)
+active_vehicles_gauge = metrics.gauge('active_vehicles',
+                                      "Vehicles being run")
+event_loop_lag_gauge = metrics.gauge('event_loop_lag_seconds',
+                                     "Delay of a periodic event loop wake up")
+# drives steps timing only, vehicles own their generators
+scheduling_rng = random.Random(RANDOM_SEED)
 
 
 async def vehicle_execution_loop(
@@ -25,50 +67,257 @@ async def vehicle_execution_loop(
         sleep_min: float,
         sleep_max: float,
         semaphore: Semaphore,
+        message_sender: MessageSender,
         ):
     """Vehicle execution coroutine"""
     i = rounds
-    while run_infinitely or i > 0:
-        async with semaphore:
-            vehicle.run_execution_step()
-            sleep_duration = round(random.uniform(
-                sleep_min, sleep_max), 1)
-            logger.debug("%s execution step is done, sleep_time: %s",
-                         vehicle.vehicle_id, sleep_duration)
-            await asyncio.sleep(sleep_duration)
-            i -= 1
-
-
-async def main():
+    active_vehicles_gauge.inc()
+    try:
+        while run_infinitely or i > 0:
+            async with semaphore:
+                await message_sender.wait_for_capacity()
+                vehicle.run_execution_step()
+                sleep_duration = round(scheduling_rng.uniform(
+                    sleep_min, sleep_max), 1)
+                logger.debug("%s execution step is done, sleep_time: %s",
+                             vehicle.vehicle_id, sleep_duration)
+                await asyncio.sleep(sleep_duration)
+                i -= 1
+    finally:
+        active_vehicles_gauge.dec()
+
+
+async def run_scheduler(
+        vehicles: List[Vehicle],
+        rounds: Optional[int],
+        sleep_min: float,
+        sleep_max: float,
+        workers: int,
+        message_sender: MessageSender,
+        ):
+    """Runs vehicles with a scheduler and a fixed pool of workers.
+
+    Each vehicle gets a reporting interval drawn between `sleep_min` and
+    `sleep_max`.
+    """
+    intervals = [scheduling_rng.uniform(sleep_min, sleep_max)
+                 for _ in vehicles]
+    scheduler = VehicleScheduler(
+        vehicles=vehicles,
+        intervals=intervals,
+        workers=workers,
+        rounds=rounds,
+        message_sender=message_sender,
+        rng=scheduling_rng)
+    active_vehicles_gauge.inc(len(vehicles))
+    try:
+        await scheduler.run()
+    finally:
+        active_vehicles_gauge.dec(len(vehicles))
+    return scheduler.stats
+
+
+@asynccontextmanager
+async def instrumentation(metrics_port: int):
+    """Serves metrics, monitors event loop lag and logs stats, if metrics
+    are enabled"""
+    if not metrics.enabled:
+        yield
+        return
+    server = start_metrics_server(metrics, port=metrics_port)
+    tasks = [asyncio.create_task(monitor_event_loop_lag(event_loop_lag_gauge))]
+    if METRICS_LOG_INTERVAL_SEC > 0:
+        tasks.append(asyncio.create_task(
+            log_stats_periodically(metrics, METRICS_LOG_INTERVAL_SEC)))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        server.shutdown()
+        server.server_close()
+
+
+@asynccontextmanager
+async def dispatching():
+    """Submits and dispatches tasks, if vehicles get tasks from the
+    dispatcher"""
+    if task_dispatcher is None:
+        yield
+        return
+    task = asyncio.create_task(run_dispatcher(
+        task_dispatcher, rng=random.Random(scheduling_rng.random())))
+    try:
+        yield
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        logger.info("Dispatcher stats: %s", task_dispatcher.stats)
+
+
+async def main(
+        qty_vehicles: Optional[int] = None,
+        execution_mode: str = EXECUTION_MODE,
+        first_vehicle_index: int = 0,
+        metrics_port: int = METRICS_PORT,
+        ) -> Optional[Dict[str, float]]:
     """
     App entry point.
 
     Spawns coroutines and executes them asynchronously.
+    Returns scheduler statistics in the scheduler execution mode.
+
+    Vehicles ids and random generators are derived from their index, so
+    vehicles keep trajectories when the fleet is split into shards.
     """
     concurrency_limit = config('CONCURRENCY_LIMIT', cast=int, default=10)
     run_infinitely = config('RUN_INFINITELY', cast=bool)
     rounds = config('ROUNDS', cast=int)
-    qty_vehicles = config('QTY_VEHICLES', cast=int)
+    qty_vehicles = qty_vehicles if qty_vehicles is not None \
+        else config('QTY_VEHICLES', cast=int)
     sleep_min = config('SLEEP_TIME_MIN_SEC', cast=float)
     sleep_max = config('SLEEP_TIME_MAX_SEC', cast=float)
 
     semaphore = Semaphore(concurrency_limit)
 
     # instantiate vehicles:
-    vehicles = [create_vehicle() for _ in range(qty_vehicles)]
-
-    async with asyncio.TaskGroup() as tg:
-        _ = [
-                tg.create_task(vehicle_execution_loop(
-                    vehicle=vehicle,
-                    rounds=rounds,
-                    run_infinitely=run_infinitely,
+    vehicles = create_fleet(qty=qty_vehicles,
+                            first_vehicle_index=first_vehicle_index)
+    # the fleet lives for the whole run, keep full garbage collection
+    # passes from traversing it
+    gc.freeze()
+    message_sender = get_message_sender()
+
+    try:
+        async with instrumentation(metrics_port), dispatching():
+            if execution_mode == 'scheduler':
+                return await run_scheduler(
+                    vehicles=vehicles,
+                    rounds=None if run_infinitely else rounds,
                     sleep_min=sleep_min,
                     sleep_max=sleep_max,
-                    semaphore=semaphore))
-                for vehicle in vehicles
-            ]
+                    workers=concurrency_limit,
+                    message_sender=message_sender)
+            async with asyncio.TaskGroup() as tg:
+                _ = [
+                        tg.create_task(vehicle_execution_loop(
+                            vehicle=vehicle,
+                            rounds=rounds,
+                            run_infinitely=run_infinitely,
+                            sleep_min=sleep_min,
+                            sleep_max=sleep_max,
+                            semaphore=semaphore,
+                            message_sender=message_sender))
+                        for vehicle in vehicles
+                    ]
+    finally:
+        # send messages pending in senders buffers
+        sender_registry.close_all()
+        # messages of trackers still offline are lost
+        if offline_spill_store is not None:
+            offline_spill_store.close()
+    return None
+
+
+def split_fleet(qty_vehicles: int, shards: int) -> List[int]:
+    """Splits number of vehicles between shards as evenly as possible"""
+    base, remainder = divmod(qty_vehicles, shards)
+    return [base + 1 if shard < remainder else base
+            for shard in range(shards)]
+
+
+def run_shard(
+        shard: int,
+        qty_vehicles: int,
+        first_vehicle_index: int,
+        results: multiprocessing.Queue,
+        ) -> None:
+    """Shard worker process entry point"""
+    scheduling_rng.seed(RANDOM_SEED + shard)
+    try:
+        stats = asyncio.run(main(qty_vehicles=qty_vehicles,
+                                 execution_mode='scheduler',
+                                 first_vehicle_index=first_vehicle_index,
+                                 metrics_port=METRICS_PORT + shard))
+    except Exception as e:
+        results.put({'shard': shard, 'error': repr(e)})
+        raise
+    finally:
+        # worker processes exit without running exit handlers
+        stop_logging()
+    results.put({'shard': shard, 'vehicles': qty_vehicles, **(stats or {})})
+
+
+def run_sharded(shards: int) -> List[Dict[str, Any]]:
+    """
+    Runs the fleet split across worker processes.
+
+    Shards are independent processes, so a crashed shard does not stop
+    the others. Returns statistics of each shard.
+    """
+    qty_vehicles = config('QTY_VEHICLES', cast=int)
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    shards_vehicles = split_fleet(qty_vehicles, shards)
+    processes = [
+        context.Process(target=run_shard, name=f"shard-{shard}",
+                        args=(shard, shard_vehicles,
+                              sum(shards_vehicles[:shard]), results))
+        for shard, shard_vehicles in enumerate(shards_vehicles)
+    ]
+    for process in processes:
+        process.start()
+
+    # results are drained before joining, a process that put data on a
+    # queue does not exit until the data is consumed
+    stats_by_shard: Dict[int, Dict[str, Any]] = {}
+    while len(stats_by_shard) < len(processes):
+        # checked before waiting: results of exited shards are readable
+        exited = not any(process.is_alive() for process in processes)
+        try:
+            stats = results.get(timeout=SHARD_RESULT_POLL_SEC)
+        except queue.Empty:
+            if exited:
+                break  # crashed shards without a result
+            continue
+        stats_by_shard[stats['shard']] = stats
+    for process in processes:
+        process.join()
+
+    for shard, process in enumerate(processes):
+        if process.exitcode != 0:
+            stats_by_shard.setdefault(shard, {'shard': shard})
+            stats_by_shard[shard]['exitcode'] = process.exitcode
+    shards_stats = [stats_by_shard[shard] for shard in sorted(stats_by_shard)]
+
+    log_shards_stats(shards_stats)
+    return shards_stats
+
+
+def log_shards_stats(shards_stats: List[Dict[str, Any]]) -> None:
+    """Logs per-shard and aggregated throughput and errors"""
+    for stats in shards_stats:
+        if 'exitcode' in stats:
+            logger.error("Shard %s crashed, exit code %s, error: %s",
+                         stats['shard'], stats['exitcode'],
+                         stats.get('error'))
+        else:
+            logger.info("Shard stats: %s", stats)
+
+    completed = [stats for stats in shards_stats if 'exitcode' not in stats]
+    logger.info(
+        "Sharded run: %s shards, %s crashed, %s steps, %s failed steps, "
+        "%.1f steps/s",
+        len(shards_stats),
+        len(shards_stats) - len(completed),
+        sum(stats['steps'] for stats in completed),
+        sum(stats['failed_steps'] for stats in completed),
+        sum(stats['achieved_steps_per_sec'] for stats in completed))
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    if SHARDS > 1:
+        run_sharded(SHARDS)
+    else:
+        asyncio.run(main())
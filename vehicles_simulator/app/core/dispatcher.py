@@ -0,0 +1,203 @@
+"""
+Implements the TaskDispatcher class, a fleet level source of tasks.
+
+The dispatcher owns a queue of pending tasks. Vehicles request tasks
+through `DispatchedTasksManager` (see `task.py`), an idle vehicle that
+has no assignment is registered as idle at its current location, taken
+from the fleet spatial index. Every dispatch cycle pending tasks are
+assigned to idle vehicles by distance, a vehicle picks its assignment up
+on the next request.
+
+Strategies, selected with `DISPATCH_STRATEGY`:
+
+- `fifo` - oldest task first, each to the nearest idle vehicle.
+- `greedy` - globally shortest task to vehicle pairs first, among the
+  `DISPATCH_CANDIDATES` nearest idle vehicles of every task. Gives a
+  shorter total travel distance than `fifo` for the same assignments.
+
+A cycle considers at most `DISPATCH_BATCH_SIZE` oldest pending tasks.
+With `TASK_SOURCE=dispatcher` the app submits random tasks at
+`DISPATCH_TASKS_PER_SEC` and runs a cycle every `DISPATCH_INTERVAL_SEC`,
+see `run_dispatcher`.
+"""
+import asyncio
+import itertools
+import random
+from collections import deque
+from typing import Deque, Dict, Hashable, List, Optional
+from decouple import config
+from app.core.spatial import SpatialGridIndex
+from app.utils import schemas
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+TASK_SOURCE = config('TASK_SOURCE', default='random')
+DISPATCH_STRATEGY = config('DISPATCH_STRATEGY', default='greedy')
+DISPATCH_CANDIDATES = config('DISPATCH_CANDIDATES', cast=int, default=4)
+DISPATCH_BATCH_SIZE = config('DISPATCH_BATCH_SIZE', cast=int, default=1_000)
+DISPATCH_INTERVAL_SEC = config('DISPATCH_INTERVAL_SEC', cast=float,
+                               default=1.0)
+DISPATCH_TASKS_PER_SEC = config('DISPATCH_TASKS_PER_SEC', cast=float,
+                                default=1.0)
+NAVIGATION_MAP_X_SIZE = config('NAVIGATION_MAP_X_SIZE', cast=int)
+NAVIGATION_MAP_Y_SIZE = config('NAVIGATION_MAP_Y_SIZE', cast=int)
+
+DISPATCH_STRATEGIES = ('fifo', 'greedy')
+
+logger = get_logger(__name__)
+tasks_assigned_counter = metrics.counter(
+    'dispatcher_tasks_assigned_total', "Tasks assigned to vehicles")
+travel_distance_counter = metrics.counter(
+    'dispatcher_travel_distance_total',
+    "Distance from assigned vehicles to their tasks, in map cells")
+pending_tasks_gauge = metrics.gauge('dispatcher_pending_tasks',
+                                    "Tasks waiting for a vehicle")
+idle_vehicles_gauge = metrics.gauge('dispatcher_idle_vehicles',
+                                    "Vehicles waiting for a task")
+dispatch_timer = metrics.histogram('dispatcher_cycle_seconds',
+                                   "Duration of dispatch cycles")
+
+
+class TaskDispatcher:
+    """Assigns pending tasks to the nearest idle vehicles"""
+    def __init__(
+            self,
+            spatial_index: SpatialGridIndex,
+            strategy: str = DISPATCH_STRATEGY,
+            candidates: int = DISPATCH_CANDIDATES,
+            batch_size: int = DISPATCH_BATCH_SIZE,
+            ) -> None:
+        if strategy not in DISPATCH_STRATEGIES:
+            raise ValueError(f"Unsupported dispatch strategy {strategy}, "
+                             f"expected one of {DISPATCH_STRATEGIES}")
+        # locations of all vehicles, kept by their location services
+        self.spatial_index = spatial_index
+        self.strategy = strategy
+        self.candidates = candidates
+        self.batch_size = batch_size
+        self.pending: Deque[schemas.Location] = deque()
+        # idle vehicles do not move, so they are indexed once
+        self._idle = SpatialGridIndex(cell_size=spatial_index.cell_size)
+        self._assignments: Dict[Hashable, schemas.Location] = {}
+
+        # counters
+        self.tasks_submitted: int = 0
+        self.tasks_assigned: int = 0
+        self.travel_distance: float = 0.0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'tasks_submitted': self.tasks_submitted,
+            'tasks_assigned': self.tasks_assigned,
+            'pending_tasks': len(self.pending),
+            'idle_vehicles': len(self._idle),
+            'travel_distance': round(self.travel_distance, 1),
+        }
+
+    def submit(self, task: schemas.Location) -> None:
+        """Queues a task"""
+        self.pending.append(task)
+        self.tasks_submitted += 1
+
+    def request_task(self, vehicle_key: Hashable
+                     ) -> Optional[schemas.Location]:
+        """Task assigned to the vehicle, if any, otherwise registers the
+        vehicle as idle"""
+        task = self._assignments.pop(vehicle_key, None)
+        if task is None and vehicle_key not in self._idle:
+            self._idle.insert(vehicle_key,
+                              *self.spatial_index.location(vehicle_key))
+        return task
+
+    def dispatch(self) -> int:
+        """Assigns pending tasks to idle vehicles, returns number of
+        assigned tasks"""
+        assigned = set()
+        if self.pending and self._idle:
+            with dispatch_timer.time():
+                assigned = self._dispatch_batch()
+        pending_tasks_gauge.set(len(self.pending))
+        idle_vehicles_gauge.set(len(self._idle))
+        logger.debug("Dispatch cycle: %s", self.stats)
+        return len(assigned)
+
+    def _dispatch_batch(self) -> set:
+        qty_tasks = min(len(self.pending), self.batch_size)
+        tasks = list(itertools.islice(self.pending, qty_tasks))
+        if self.strategy == 'fifo':
+            assigned = self._assign_fifo(tasks)
+        else:
+            assigned = self._assign_greedy(tasks)
+        # keep unassigned tasks in order, ahead of newer ones
+        for _ in range(qty_tasks):
+            self.pending.popleft()
+        self.pending.extendleft(
+            reversed([task for i, task in enumerate(tasks)
+                      if i not in assigned]))
+        return assigned
+
+    def _assign_fifo(self, tasks: List[schemas.Location]) -> set:
+        assigned = set()
+        for i, task in enumerate(tasks):
+            nearest = self._idle.nearest(task.x, task.y, k=1)
+            if not nearest:
+                break
+            distance, vehicle_key = nearest[0]
+            self._assign(vehicle_key, task, distance)
+            assigned.add(i)
+        return assigned
+
+    def _assign_greedy(self, tasks: List[schemas.Location]) -> set:
+        assigned = set()
+        remaining = list(range(len(tasks)))
+        # a round assigns at least the shortest pair, tasks whose
+        # candidates were taken are retried with the rest of vehicles
+        while remaining and self._idle:
+            pairs = sorted(
+                (distance, i, vehicle_key)
+                for i in remaining
+                for distance, vehicle_key in self._idle.nearest(
+                    tasks[i].x, tasks[i].y, k=self.candidates))
+            for distance, i, vehicle_key in pairs:
+                if i in assigned or vehicle_key not in self._idle:
+                    continue
+                self._assign(vehicle_key, tasks[i], distance)
+                assigned.add(i)
+            remaining = [i for i in remaining if i not in assigned]
+        return assigned
+
+    def _assign(self, vehicle_key: Hashable, task: schemas.Location,
+                distance: float) -> None:
+        self._idle.remove(vehicle_key)
+        self._assignments[vehicle_key] = task
+        self.tasks_assigned += 1
+        self.travel_distance += distance
+        tasks_assigned_counter.inc()
+        travel_distance_counter.inc(distance)
+
+
+def generate_random_task(
+        rng: random.Random,
+        x_size: int = NAVIGATION_MAP_X_SIZE,
+        y_size: int = NAVIGATION_MAP_Y_SIZE,
+        ) -> schemas.Location:
+    """Random task within the navigation map"""
+    return schemas.Location(x=rng.randrange(x_size), y=rng.randrange(y_size))
+
+
+async def run_dispatcher(
+        dispatcher: TaskDispatcher,
+        rng: random.Random,
+        interval: float = DISPATCH_INTERVAL_SEC,
+        tasks_per_sec: float = DISPATCH_TASKS_PER_SEC,
+        ) -> None:
+    """Submits random tasks and runs a dispatch cycle every interval"""
+    due_tasks = 0.0
+    while True:
+        due_tasks += tasks_per_sec * interval
+        for _ in range(int(due_tasks)):
+            dispatcher.submit(generate_random_task(rng))
+        due_tasks -= int(due_tasks)
+        dispatcher.dispatch()
+        await asyncio.sleep(interval)
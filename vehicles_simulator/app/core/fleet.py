@@ -0,0 +1,275 @@
+"""
+Implements the FleetEngine class.
+
+FleetEngine simulates a whole fleet of vehicles in a single batched tick.
+Instead of a graph of per-vehicle objects, the fleet state is kept as a
+struct of NumPy arrays with one element per vehicle: location, speed,
+heading direction, distance until turn allowed, destination and task
+state.
+
+A tick follows the rules of `Vehicle.run_execution_step` for every
+vehicle at once:
+
+1. Idle vehicles try to get a new task (`BasicTasksManager`).
+   A vehicle that received a task does not move on the same tick.
+2. Vehicles with a task in progress that are not at destination move
+   (`BasicNavigationManager.move_to_destination`): if a turn is allowed,
+   a heading direction is selected (`HeadingDirectionManager` with the
+   destination as the only heading provider) and speed, shift and turn
+   permission are updated (`BasicMovementManager.move`).
+3. Destination and allowed zone statuses are updated
+   (`BasicDestinationTracker.update_state`,
+   `BasicAllowedZoneManager.update_state`).
+4. Vehicles that reached destination become idle.
+
+Telemetry is not sent by the engine. Use `tracking_data` to get the
+tracking data of a single vehicle.
+"""
+from datetime import datetime, timezone
+from typing import Optional
+import numpy as np
+from app.core.location import NavigationMap
+from app.core.movement import (
+    MAX_SPEED,
+    RANDOM_SEED,
+    SPEED_CHANGE_STEP,
+    TURN_DISTANCE_BASE,
+    TURN_DISTANCE_OFFSET,
+    TURN_SPEED_THRESHOLD,
+)
+from app.core.heading import (
+    DIRECTION_BITS,
+    DIRECTIONS as POLICY_DIRECTION_ORDER,
+    get_heading_policy,
+)
+from app.core.navigation import DESTINATION_REACHED_THRESHOLD
+from app.core.task import NAVIGATION_MAP_X_SIZE, NAVIGATION_MAP_Y_SIZE
+from app.utils import schemas
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Heading directions are stored as indices into this tuple
+DIRECTIONS = tuple(schemas.Direction)
+DIRECTION_INDEX = {direction: i for i, direction in enumerate(DIRECTIONS)}
+MOVEMENT_VECTORS = np.array(
+    [schemas.Movement[direction.name].value for direction in DIRECTIONS],
+    dtype=np.int64)
+
+LEFT = DIRECTION_INDEX[schemas.Direction.LEFT]
+RIGHT = DIRECTION_INDEX[schemas.Direction.RIGHT]
+UP = DIRECTION_INDEX[schemas.Direction.UP]
+DOWN = DIRECTION_INDEX[schemas.Direction.DOWN]
+# compiled heading policies order directions differently
+POLICY_DIRECTIONS = np.array(
+    [DIRECTION_INDEX[direction] for direction in POLICY_DIRECTION_ORDER],
+    dtype=np.int8)
+
+# Task states are stored as indices into this tuple
+TASK_STATES = (schemas.TaskState.IDLE, schemas.TaskState.IN_PROGRESS)
+TASK_IDLE = 0
+TASK_IN_PROGRESS = 1
+
+
+class FleetEngine:
+    """Struct-of-arrays simulation of a fleet of vehicles.
+
+    Every array attribute has the fleet size as the first dimension, a
+    vehicle is identified by its index.
+    """
+    def __init__(
+            self,
+            size: int,
+            nav_map: NavigationMap,
+            max_speed: int = MAX_SPEED,
+            task_fail_prob: float = 0.0,
+            initial_location: schemas.Location = schemas.Location(x=1, y=1),
+            destination_weight: float = 10,
+            destination_reached_threshold: int = (
+                DESTINATION_REACHED_THRESHOLD),
+            task_map_size: Optional[schemas.MapSize] = None,
+            seed: Optional[int] = RANDOM_SEED,
+            ) -> None:
+        self.size = size
+        self.nav_map = nav_map
+        self.destination_weight = destination_weight
+        self.destination_reached_threshold = destination_reached_threshold
+        self.task_map_size = task_map_size or schemas.MapSize(
+            x_size=NAVIGATION_MAP_X_SIZE,
+            y_size=NAVIGATION_MAP_Y_SIZE,
+        )
+        self.rng = np.random.default_rng(seed)
+        self.steps = 0
+
+        # movement
+        self.location = np.tile(
+            np.array([initial_location.x, initial_location.y],
+                     dtype=np.int64),
+            (size, 1))
+        self.speed = np.zeros(size, dtype=np.int64)
+        self.max_speed = np.full(size, max_speed, dtype=np.int64)
+        self.heading = np.full(size, UP, dtype=np.int8)
+        self.distance_until_turn_allowed = np.zeros(size, dtype=np.int64)
+        self.can_turn = np.ones(size, dtype=bool)
+
+        # tasks and destination
+        self.task_state = np.full(size, TASK_IDLE, dtype=np.int8)
+        self.fail_get_task_probability = np.full(size, task_fail_prob,
+                                                 dtype=np.float64)
+        self.destination = np.zeros((size, 2), dtype=np.int64)
+        self.destination_reached = np.zeros(size, dtype=bool)
+        self.distance_to_destination = np.full(size, np.inf,
+                                               dtype=np.float64)
+
+        # allowed zone
+        self.out_of_zone = np.zeros(size, dtype=bool)
+
+    def tick(self) -> None:
+        """Advance every vehicle of the fleet by one execution step"""
+        idle = np.flatnonzero(self.task_state == TASK_IDLE)
+        in_progress = np.flatnonzero(self.task_state == TASK_IN_PROGRESS)
+
+        assigned = self._assign_new_tasks(idle)
+        moving = in_progress[~self.destination_reached[in_progress]]
+        self._move(moving)
+        self._update_statuses(np.concatenate((assigned, in_progress)))
+
+        reached = in_progress[self.destination_reached[in_progress]]
+        self.task_state[reached] = TASK_IDLE
+        self.steps += 1
+        logger.debug("Tick %s: assigned %s, moved %s, reached %s",
+                     self.steps, assigned.size, moving.size, reached.size)
+
+    def run(self, steps: int) -> None:
+        """Advance the fleet by a number of execution steps"""
+        for _ in range(steps):
+            self.tick()
+
+    def _assign_new_tasks(self, idle: np.ndarray) -> np.ndarray:
+        """Mimic receiving new tasks by idle vehicles.
+
+        Returns indices of vehicles that received a task.
+        """
+        failed = self.rng.random(idle.size) \
+            < self.fail_get_task_probability[idle]
+        assigned = idle[~failed]
+        self.destination[assigned, 0] = self.rng.integers(
+            0, self.task_map_size.x_size, size=assigned.size)
+        self.destination[assigned, 1] = self.rng.integers(
+            0, self.task_map_size.y_size, size=assigned.size)
+        self.task_state[assigned] = TASK_IN_PROGRESS
+        return assigned
+
+    def _move(self, moving: np.ndarray) -> None:
+        """Turn if allowed, change speed and shift location"""
+        turning = moving[self.can_turn[moving]]
+        if turning.size:
+            self.heading[turning] = self._select_headings(turning)
+            self.distance_until_turn_allowed[turning] = \
+                self._define_distances_until_turn(turning.size)
+
+        speed = self.speed[moving]
+        distance_until_turn = self.distance_until_turn_allowed[moving]
+        max_speed = self._limit_speeds(moving, self.max_speed[moving])
+        speed = np.where(
+            distance_until_turn > speed,
+            np.minimum(speed + SPEED_CHANGE_STEP,
+                       np.maximum(max_speed, speed - SPEED_CHANGE_STEP)),
+            np.maximum(speed - SPEED_CHANGE_STEP, 1))
+        distance_until_turn -= speed
+
+        self.location[moving] += \
+            MOVEMENT_VECTORS[self.heading[moving]] * speed[:, None]
+        self.speed[moving] = speed
+        self.distance_until_turn_allowed[moving] = distance_until_turn
+        self.can_turn[moving] = (speed <= TURN_SPEED_THRESHOLD) \
+            & (distance_until_turn <= 0)
+
+    def _limit_speeds(self, moving: np.ndarray,
+                      max_speed: np.ndarray) -> np.ndarray:
+        """Cap max speeds by speed limits of the map grid cells, see
+        `BasicMovementManager.increase_speed`.
+        """
+        layer = self.nav_map.layer('speed_limit')
+        if layer is None:
+            return max_speed
+        location = self.location[moving]
+        in_zone = ((location >= 0)
+                   & (location <= (self.nav_map.x_size,
+                                   self.nav_map.y_size))).all(axis=1)
+        limits = np.zeros(moving.size, dtype=np.int64)
+        limits[in_zone] = layer[location[in_zone, 0], location[in_zone, 1]]
+        return np.where(limits > 0, np.minimum(max_speed, limits), max_speed)
+
+    def _select_headings(self, turning: np.ndarray) -> np.ndarray:
+        """Weighted random selection of heading direction.
+
+        Directions towards destination are boosted by the destination
+        weight, sampled from the compiled policy of
+        `HeadingDirectionManager` with the destination as the only
+        provider.
+        """
+        policy = get_heading_policy((self.destination_weight,))
+        bits = DIRECTION_BITS
+        diff = self.destination[turning] - self.location[turning]
+        threshold = self.destination_reached_threshold
+        keys = (np.where(diff[:, 0] > threshold,
+                         bits[schemas.Direction.RIGHT], 0)
+                | np.where(diff[:, 0] < -threshold,
+                           bits[schemas.Direction.LEFT], 0)
+                | np.where(diff[:, 1] > threshold,
+                           bits[schemas.Direction.UP], 0)
+                | np.where(diff[:, 1] < -threshold,
+                           bits[schemas.Direction.DOWN], 0))
+        selected = policy.sample_batch(keys, self.rng.random(turning.size))
+        return POLICY_DIRECTIONS[selected]
+
+    def _define_distances_until_turn(self, qty: int) -> np.ndarray:
+        """Simulate retrieving distance until next turn, see
+        `BasicMovementManager._define_distance_until_turn`.
+        """
+        draws = self.rng.integers(1, TURN_DISTANCE_BASE, size=qty,
+                                  endpoint=True)
+        return np.floor(np.sqrt(draws)).astype(np.int64) \
+            + TURN_DISTANCE_OFFSET
+
+    def _update_statuses(self, indices: np.ndarray) -> None:
+        """Update destination and allowed zone statuses"""
+        location = self.location[indices]
+        diff = self.destination[indices] - location
+        threshold = self.destination_reached_threshold
+        self.destination_reached[indices] = \
+            (np.abs(diff) <= threshold).all(axis=1)
+        self.distance_to_destination[indices] = np.round(
+            np.hypot(diff[:, 0], diff[:, 1]), 1)
+        self.out_of_zone[indices] = (
+            (location[:, 0] < 0)
+            | (location[:, 0] > self.nav_map.x_size)
+            | (location[:, 1] < 0)
+            | (location[:, 1] > self.nav_map.y_size)
+        )
+
+    def tracking_data(self, index: int) -> schemas.TrackingData:
+        """Collect tracking data of a single vehicle"""
+        return schemas.TrackingData(
+            task_state=TASK_STATES[self.task_state[index]].value,
+            vehicle_location=schemas.Location(
+                x=int(self.location[index, 0]),
+                y=int(self.location[index, 1])),
+            destination=schemas.Location(
+                x=int(self.destination[index, 0]),
+                y=int(self.destination[index, 1])),
+            vehicle_speed=int(self.speed[index]),
+            heading_direction=DIRECTIONS[self.heading[index]].value,
+            distance_to_destination=float(
+                self.distance_to_destination[index]),
+            out_of_zone_status=bool(self.out_of_zone[index]),
+            created_time=self._get_current_time(),
+        )
+
+    @staticmethod
+    def _get_current_time() -> datetime:
+        """Helper method to get current time, milliseconds precision"""
+        current_time = datetime.now(timezone.utc)
+        return current_time.replace(
+            microsecond=current_time.microsecond // 1000 * 1000)
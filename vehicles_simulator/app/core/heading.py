@@ -17,27 +17,186 @@ Desision for the next turn is done in two steps.
    based on probabilities from step 1.
 
 A heading direction provider can be registered on runtime.
+
+Providers suggest a subset of the 4 directions, so probabilities only
+depend on which subset every provider suggests. `HeadingPolicy`
+precompiles the cumulative distribution of every combination of
+suggestions for the providers weights, a decision is then a table
+lookup and a single uniform draw. Above `MAX_COMPILED_PROVIDERS`
+providers combinations are compiled on their first lookup instead.
+Draws are made the way `random.choices` does, so decisions match step 1
+and 2 above exactly for the same generator state.
+
+`select_heading_directions` decides headings for many managers at once,
+sampling the compiled tables with NumPy.
 """
-from typing import Dict, List
+from bisect import bisect
+from functools import lru_cache
+from itertools import accumulate
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
 import random
+import numpy as np
 from app.core.interfaces import HeadingDirectionsInterface
 from app.utils import schemas
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+INITIAL_HEADING_PROBABILITIES: Dict[schemas.Direction, float] = {
+    schemas.Direction.UP: 25,
+    schemas.Direction.DOWN: 25,
+    schemas.Direction.LEFT: 25,
+    schemas.Direction.RIGHT: 25
+}
+# Compiled tables store directions in this order, suggestions as bitmasks
+DIRECTIONS = tuple(INITIAL_HEADING_PROBABILITIES)
+DIRECTION_BITS = {direction: 1 << i for i, direction in enumerate(DIRECTIONS)}
+QTY_SUGGESTIONS = 1 << len(DIRECTIONS)
+# Policies with more providers compile combinations on first lookup
+MAX_COMPILED_PROVIDERS = 3
+
+
+def suggestions_mask(directions: Iterable[schemas.Direction]) -> int:
+    """Bitmask of suggested directions"""
+    mask = 0
+    for direction in directions:
+        mask |= DIRECTION_BITS[direction]
+    return mask
+
+
+class HeadingPolicy:
+    """Cumulative heading direction distributions for every combination of
+    providers suggestions, given providers weights.
+
+    A combination is identified by its key, suggestion masks of providers
+    as digits of a base 16 number, first provider is the lowest digit.
+
+    With up to `MAX_COMPILED_PROVIDERS` providers all combinations are
+    compiled upfront, with more providers a combination is compiled on its
+    first lookup, as the table grows 16 times per provider.
+    """
+    def __init__(self, weights: Sequence[float]) -> None:
+        self.weights: Tuple[float, ...] = tuple(weights)
+        self.rows: Dict[int, Tuple[List[float], float]] = {}
+        # same as `rows`, for batched sampling, if compiled upfront
+        self.cum_weights: Optional[np.ndarray] = None
+        self.totals: Optional[np.ndarray] = None
+        if len(self.weights) <= MAX_COMPILED_PROVIDERS:
+            self.rows = {
+                key: self._compile_row(key)
+                for key in range(QTY_SUGGESTIONS ** len(self.weights))}
+            self.cum_weights = np.array(
+                [row for row, _ in self.rows.values()])
+            self.totals = np.array(
+                [total for _, total in self.rows.values()])
+
+    def _compile_row(self, key: int) -> Tuple[List[float], float]:
+        probabilities = INITIAL_HEADING_PROBABILITIES.copy()
+        for weight in self.weights:
+            mask = key % QTY_SUGGESTIONS
+            key //= QTY_SUGGESTIONS
+            probabilities = {
+                direction: probability * weight
+                if mask & DIRECTION_BITS[direction] else probability
+                for direction, probability in probabilities.items()
+            }
+        total = sum(probabilities.values())
+        # as `random.choices` accumulates weights
+        cum_weights = list(accumulate(
+            probability / total for probability in probabilities.values()))
+        return cum_weights, cum_weights[-1] + 0.0
+
+    def row(self, key: int) -> Tuple[List[float], float]:
+        """Cumulative distribution and its total for a key"""
+        row = self.rows.get(key)
+        if row is None:
+            row = self.rows[key] = self._compile_row(key)
+        return row
+
+    def key(self, suggestions: Sequence[Iterable[schemas.Direction]]
+            ) -> int:
+        """Key of providers suggestions, in providers order"""
+        key = 0
+        for directions in reversed(suggestions):
+            key = key * QTY_SUGGESTIONS + suggestions_mask(directions)
+        return key
+
+    def sample(self, key: int, uniform: float) -> schemas.Direction:
+        """Direction for a uniform draw in [0, 1)"""
+        cum_weights, total = self.row(key)
+        return DIRECTIONS[
+            bisect(cum_weights, uniform * total, 0, len(DIRECTIONS) - 1)]
+
+    def sample_batch(self, keys: np.ndarray, uniforms: np.ndarray
+                     ) -> np.ndarray:
+        """Indices into `DIRECTIONS` for arrays of keys and uniform draws"""
+        if self.cum_weights is not None and self.totals is not None:
+            cum_weights = self.cum_weights[keys]
+            totals = self.totals[keys]
+        else:
+            rows = [self.row(int(key)) for key in keys]
+            cum_weights = np.array([row for row, _ in rows]).reshape(
+                len(rows), len(DIRECTIONS))
+            totals = np.array([total for _, total in rows])
+        draws = uniforms * totals
+        selected = (cum_weights <= draws[:, None]).sum(axis=1)
+        return np.minimum(selected, len(DIRECTIONS) - 1)
+
+
+@lru_cache(maxsize=None)
+def get_heading_policy(weights: Tuple[float, ...]) -> HeadingPolicy:
+    """Policy shared by managers with the same providers weights"""
+    return HeadingPolicy(weights)
+
+
+class ProviderRegistrations(NamedTuple):
+    """Names and weights of registered heading providers, in registration
+    order, and their compiled policy"""
+    names: Tuple[str, ...]
+    weights: Tuple[float, ...]
+    policy: HeadingPolicy
+
+
+@lru_cache(maxsize=None)
+def get_provider_registrations(names: Tuple[str, ...],
+                               weights: Tuple[float, ...]
+                               ) -> ProviderRegistrations:
+    """Registrations shared by managers with the same providers names and
+    weights"""
+    return ProviderRegistrations(names, weights, get_heading_policy(weights))
+
 
 class HeadingDirectionManager:
-    INITIAL_HEADING_PROBABILITIES = {
-        schemas.Direction.UP: 25,
-        schemas.Direction.DOWN: 25,
-        schemas.Direction.LEFT: 25,
-        schemas.Direction.RIGHT: 25
-    }
-
-    def __init__(self):
-        self.heading_providers: List[Dict[str, object]] = []
+    """Selects heading directions suggested by registered providers.
+
+    A manager keeps its provider entities only, their names, weights and
+    policy are interned `ProviderRegistrations` shared by all managers
+    registering the same providers.
+    """
+    __slots__ = ('providers', 'registrations', 'heading_direction', 'rng')
+
+    INITIAL_HEADING_PROBABILITIES = INITIAL_HEADING_PROBABILITIES
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.providers: Tuple[HeadingDirectionsInterface, ...] = ()
+        self.registrations: ProviderRegistrations = \
+            get_provider_registrations((), ())
         self.heading_direction: schemas.Direction = schemas.Direction.UP
+        self.rng: random.Random = rng or random.Random()
+
+    @property
+    def policy(self) -> HeadingPolicy:
+        return self.registrations.policy
+
+    @property
+    def heading_providers(self) -> List[Dict[str, object]]:
+        """Registered providers, in registration order"""
+        return [
+            {'entity': entity, 'name': name, 'weight': weight}
+            for entity, name, weight in zip(self.providers,
+                                            self.registrations.names,
+                                            self.registrations.weights)
+        ]
 
     def register_heading_provider(
             self,
@@ -46,24 +205,26 @@ class HeadingDirectionManager:
             provider_weight: float
             ) -> None:
         """Register a heading direction provider"""
-        self.heading_providers.append({
-            'entity': provider,
-            'name': provider_name,
-            'weight': provider_weight
-        })
+        self.providers += (provider,)
+        self.registrations = get_provider_registrations(
+            self.registrations.names + (provider_name,),
+            self.registrations.weights + (provider_weight,))
 
     def _calculate_heading_probabilities(self) -> Dict[schemas.Direction,
                                                        float]:
         """
         Iterate over providers, modify  heading directions and apply to
         base probabilities modified by provider's weight.
+
+        Reference for the compiled `HeadingPolicy`, not used on decisions.
         """
         heading_probabilities = self.INITIAL_HEADING_PROBABILITIES.copy()
-        for provider in self.heading_providers:
-            provider['entity'].update_heading_directions()
-            provider_headings = provider['entity'].heading_directions
+        for provider, weight in zip(self.providers,
+                                    self.registrations.weights):
+            provider.update_heading_directions()
+            provider_headings = provider.heading_directions
             heading_probabilities = {
-                direction: probability * provider['weight']
+                direction: probability * weight
                 if direction in provider_headings else probability
                 for direction, probability
                 in heading_probabilities.items()
@@ -76,19 +237,43 @@ class HeadingDirectionManager:
         """
         Define heading direction.
 
-        To do it collect each direction probability and use weighted
-        random generator to make final decision.
+        To do it look up each direction probability for the providers
+        suggestions and use a weighted random draw to make final decision.
         """
-        heading_probabilities = self._calculate_heading_probabilities()
-        logger.debug("Heading probabilities: %s", str(heading_probabilities))
-        heading_direction = random.choices(
-            population=[k for k, v in heading_probabilities.items()],
-            weights=list(heading_probabilities.values()),
-            k=1)[0]  # unpack from list
-
-        logger.debug("Direction: %s", heading_direction.value)
+        key = self._policy_key()
+        heading_direction = self.policy.sample(key, self.rng.random())
+        logger.debug("Heading policy key: %s, direction: %s", key,
+                     heading_direction.value)
         return heading_direction
 
+    def _policy_key(self) -> int:
+        """Updates providers and returns the key of their suggestions"""
+        for provider in self.providers:
+            provider.update_heading_directions()
+        return self.policy.key([provider.heading_directions
+                                for provider in self.providers])
+
     def update_heading_direction(self) -> None:
         """Update heading direction relying on internal logic"""
         self.heading_direction = self._define_next_direction()
+
+
+def select_heading_directions(
+        managers: Sequence[HeadingDirectionManager]) -> None:
+    """Updates heading directions of many managers at once.
+
+    Every manager draws from its own generator, so directions are the
+    same as of `update_heading_direction` called on each manager.
+    """
+    by_policy: Dict[int, List[int]] = {}
+    keys = np.empty(len(managers), dtype=np.int64)
+    uniforms = np.empty(len(managers), dtype=np.float64)
+    for i, manager in enumerate(managers):
+        keys[i] = manager._policy_key()  # pylint: disable=W0212
+        uniforms[i] = manager.rng.random()
+        by_policy.setdefault(id(manager.policy), []).append(i)
+    for indices in by_policy.values():
+        policy = managers[indices[0]].policy
+        selected = policy.sample_batch(keys[indices], uniforms[indices])
+        for i, direction_index in zip(indices, selected):
+            managers[i].heading_direction = DIRECTIONS[direction_index]
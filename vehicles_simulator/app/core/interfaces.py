@@ -1,8 +1,12 @@
 """
 This file contains all interfaces, implemented as abstract classes, used
 within the Vehicle class.
+
+Vehicle component interfaces declare empty `__slots__`, so that
+implementations declaring their own `__slots__` have no per-instance
+`__dict__`.
 """
-from typing import List
+from typing import List, Optional
 from abc import ABC, abstractmethod
 from app.utils import schemas
 
@@ -11,6 +15,8 @@ from app.utils import schemas
 
 
 class NavigationManager(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def initialize_new_task(self, destination: schemas.Location) -> None:
         pass
@@ -56,13 +62,15 @@ class NavigationManager(ABC):
 
 
 class TasksManager(ABC):
+    __slots__ = ()
+
     @property
     @abstractmethod
     def task_state(self) -> schemas.TaskState:
         pass
 
     @abstractmethod
-    def get_new_task(self) -> schemas.Location:
+    def get_new_task(self) -> Optional[schemas.Location]:
         pass
 
     @abstractmethod
@@ -75,6 +83,8 @@ class TasksManager(ABC):
 
 
 class TrackerManager(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def get_current_tracker_status(self) -> schemas.TrackerStatus:
         pass
@@ -88,6 +98,7 @@ class TrackerManager(ABC):
 
 
 class AllowedZoneManager(ABC):
+    __slots__ = ()
 
     @property
     @abstractmethod
@@ -105,6 +116,7 @@ class AllowedZoneManager(ABC):
 
 
 class DestinationTracker(ABC):
+    __slots__ = ()
 
     @property
     @abstractmethod
@@ -131,6 +143,7 @@ class DestinationTracker(ABC):
 
 
 class HeadingDirectionsInterface(ABC):
+    __slots__ = ()
 
     @property
     @abstractmethod
@@ -143,6 +156,7 @@ class HeadingDirectionsInterface(ABC):
 
 
 class LocationService(ABC):
+    __slots__ = ()
 
     @property
     @abstractmethod
@@ -160,6 +174,8 @@ class LocationService(ABC):
 
 
 class MovementManager(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def increase_speed(self):
         pass
@@ -176,6 +192,10 @@ class MovementManager(ABC):
     def move(self):
         pass
 
+    def set_speed_limit(self, speed_limit: Optional[int]):
+        """Speed limit of the current map cell, `None` if unlimited.
+        Ignored unless an implementation applies limits."""
+
 
 # --- Other ---
 
@@ -186,3 +206,24 @@ class MessageSender(ABC):
     @abstractmethod
     def send_message(self, message):
         pass
+
+    def send_keyed_message(self, key, message) -> None:
+        """Send message of the source identified by `key`, e.g. a vehicle.
+        Senders may use the key to coalesce messages of the same source"""
+        self.send_message(message=message)
+
+    def send_messages(self, messages: List[str]) -> List[str]:
+        """Send a burst of messages, in order. Senders may batch them.
+
+        Returns messages that were not accepted and can be resent, in
+        order. If it raises, any of the messages may have been sent.
+        """
+        for message in messages:
+            self.send_message(message=message)
+        return []
+
+    def close(self) -> None:
+        """Release resources and send pending messages, if any"""
+
+    async def wait_for_capacity(self) -> None:
+        """Wait until the sender can accept a message without blocking"""
@@ -1,15 +1,52 @@
+from typing import FrozenSet, Hashable, Iterable, Optional, Tuple
+import numpy as np
 from app.core.interfaces import LocationService
+from app.core.spatial import SpatialGridIndex
 from app.utils import schemas
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Layers of a map grid, `uint8` values per cell:
+# - blocked: non-zero cells are impassable
+# - road: non-zero cells are roads, informational
+# - speed_limit: max speed in the cell, 0 for no limit
+GRID_LAYERS = ('blocked', 'road', 'speed_limit')
+
+
+def create_grid_file(path: str, map_size: schemas.MapSize) -> np.memmap:
+    """Creates a zero filled grid file for the map size, returns it
+    mapped for writing.
+
+    The grid has a cell per location of the allowed zone, bounds
+    included, shape is (layers, x_size + 1, y_size + 1).
+    """
+    return np.lib.format.open_memmap(
+        path, mode='w+', dtype=np.uint8,
+        shape=(len(GRID_LAYERS), map_size.x_size + 1, map_size.y_size + 1))
+
+
+def load_grid(path: str) -> np.memmap:
+    """Maps a grid file read-only.
+
+    Pages are loaded on access and shared through the page cache by all
+    processes mapping the file, the grid is never copied.
+    """
+    return np.load(path, mmap_mode='r')
+
 
 class NavigationMap:
     """
     Class maintains a navigation map.
 
     It is a singleton to guarantee all vehciles locations are consistant.
+
+    Cells within the map size, bounds included, form the allowed zone.
+    Blocked cells are impassable for route planning. `version` changes
+    whenever cells passability changes, so routes can be invalidated.
+
+    The map optionally has a grid of cell layers (see `GRID_LAYERS`),
+    usually memory-mapped with `load_grid`. Cells are read in place.
     """
     _instance = None
 
@@ -26,10 +63,25 @@ class NavigationMap:
 
     def __init__(
             self,
-            map_size: schemas.MapSize
+            map_size: schemas.MapSize,
+            blocked_cells: Iterable[Tuple[int, int]] = (),
+            grid: Optional[np.ndarray] = None,
             ) -> None:
         self._x_size = map_size.x_size
         self._y_size = map_size.y_size
+        self._blocked_cells: FrozenSet[Tuple[int, int]] = frozenset(
+            (x, y) for x, y in blocked_cells)
+        expected_shape = (len(GRID_LAYERS), self._x_size + 1,
+                          self._y_size + 1)
+        if grid is not None and grid.shape != expected_shape:
+            raise ValueError(f"Expected grid of shape {expected_shape} for "
+                             f"the map size, got {grid.shape}")
+        self._grid: Optional[np.ndarray] = grid
+        # views of the grid, not copies
+        self._blocked_layer = self.layer('blocked')
+        self._speed_limit_layer = self.layer('speed_limit')
+        # the singleton is reinitialized on every instantiation
+        self.version: int = getattr(self, 'version', 0) + 1
 
     @property
     def x_size(self):
@@ -49,18 +101,64 @@ class NavigationMap:
         raise AttributeError(f"Can't redefine `y_size` to {value} "
                              "as it is an immutable property of Map")
 
+    @property
+    def blocked_cells(self) -> FrozenSet[Tuple[int, int]]:
+        return self._blocked_cells
+
+    def block_cells(self, cells: Iterable[Tuple[int, int]]) -> None:
+        """Makes cells impassable"""
+        self._blocked_cells = self._blocked_cells.union(
+            (x, y) for x, y in cells)
+        self.version += 1
+
+    @property
+    def grid(self) -> Optional[np.ndarray]:
+        return self._grid
+
+    def layer(self, name: str) -> Optional[np.ndarray]:
+        """Grid layer indexed by x and y, `None` without a grid"""
+        if self._grid is None:
+            return None
+        # a plain array view, indexing `np.memmap` is slower
+        return np.asarray(self._grid[GRID_LAYERS.index(name)])
+
+    def in_zone(self, x: int, y: int) -> bool:
+        return 0 <= x <= self._x_size and 0 <= y <= self._y_size
+
+    def is_passable(self, x: int, y: int) -> bool:
+        if not self.in_zone(x, y) or (x, y) in self._blocked_cells:
+            return False
+        return self._blocked_layer is None or not self._blocked_layer[x, y]
+
+    def speed_limit(self, x: int, y: int) -> Optional[int]:
+        """Max speed in the cell, `None` if not limited"""
+        if self._speed_limit_layer is None or not self.in_zone(x, y):
+            return None
+        return int(self._speed_limit_layer[x, y]) or None
+
 
 class BasicLocationService(LocationService):
     """Class responsible for tracking vehicle location and maintaining
     nevigatin map.
     """
+    __slots__ = ('_nav_map', '_current_location', 'spatial_index',
+                 'index_key')
+
     def __init__(
             self,
             nav_map: NavigationMap,
             current_location: schemas.Location = schemas.Location(x=1, y=1),
+            spatial_index: Optional[SpatialGridIndex] = None,
+            index_key: Optional[Hashable] = None,
             ) -> None:
         self.nav_map: NavigationMap = nav_map
         self._current_location: schemas.Location = current_location
+        # shared fleet index, the vehicle is kept under `index_key`
+        self.spatial_index = spatial_index
+        self.index_key = index_key
+        if spatial_index is not None:
+            spatial_index.insert(index_key, current_location.x,
+                                 current_location.y)
 
     @property
     def nav_map(self):
@@ -77,11 +175,13 @@ class BasicLocationService(LocationService):
     @current_location.setter
     def current_location(self, location: schemas.Location):
         self._current_location = location
+        if self.spatial_index is not None:
+            self.spatial_index.move(self.index_key, location.x, location.y)
 
     def override_current_location(self, location: schemas.Location) -> None:
         """Helper method to redefine location of a vehicle"""
         self.current_location = location
-        logger.warning("Location overriden to %s", str(location))
+        logger.warning("Location overriden to %s", location)
 
     def update_location(self, shift: schemas.Shift) -> None:
         """Updates a vehicle location given vehicle shift"""
@@ -90,4 +190,4 @@ class BasicLocationService(LocationService):
             y=self.current_location.y + shift.y
         )
         self.current_location = new_location
-        logger.info("Vehicle moved to %s", self.current_location)
+        logger.debug("Vehicle moved to %s", self.current_location)
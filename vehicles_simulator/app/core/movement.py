@@ -1,5 +1,6 @@
 """Contains implementation of BasicMovementManager"""
 import random
+from typing import Optional
 from decouple import config
 from app.core.interfaces import MovementManager
 from app.utils import schemas
@@ -15,8 +16,6 @@ SPEED_CHANGE_STEP = config('SPEED_CHANGE_STEP', cast=int)
 RANDOM_SEED = config('RANDOM_SEED', cast=int)
 TURN_DISTANCE_THRESHOLD = config('TURN_DISTANCE_THRESHOLD', cast=int)
 
-random.seed(RANDOM_SEED)
-
 
 class BasicMovementManager(MovementManager):
     """
@@ -33,7 +32,7 @@ class BasicMovementManager(MovementManager):
 
         A turn is allowed if both following conditions are met:
         1. Speed equals or less than a defined threshold.
-        2. Distance until next turn is equal to 0.
+        2. Distance until next turn is reached, equals or less than 0.
         This intends to make simulation closer to real world conditions.
 
     - Speed change:
@@ -42,6 +41,10 @@ class BasicMovementManager(MovementManager):
         or decrease the speed is implemented in the 
         `_decide_speed_change` method.
     """
+    __slots__ = ('max_speed', 'current_speed', 'heading_direction',
+                 'can_turn', 'distance_until_turn_allowed', 'shift', 'rng',
+                 'speed_limit')
+
     def __init__(
             self,
             heading_direction: schemas.Direction = schemas.Direction.UP,
@@ -49,6 +52,7 @@ class BasicMovementManager(MovementManager):
             current_speed: int = 0,
             distance_until_turn_allowed: int = 0,
             can_turn: bool = True,
+            rng: Optional[random.Random] = None,
             ) -> None:
 
         self.max_speed: int = max_speed
@@ -57,11 +61,19 @@ class BasicMovementManager(MovementManager):
         self.can_turn: bool = can_turn
         self.distance_until_turn_allowed: int = distance_until_turn_allowed
         self.shift: schemas.Shift
+        self.rng: random.Random = rng or random.Random()
+        # limit of the current map cell, set by the navigation manager
+        self.speed_limit: Optional[int] = None
 
     def increase_speed(self) -> None:
-        """Increases vehicle speed by 1 if within max_speed limit"""
-        self.current_speed = min(self.current_speed + SPEED_CHANGE_STEP,
-                                 self.max_speed)
+        """Increases vehicle speed by 1 if within max_speed limit and the
+        speed limit, if any. Above the speed limit the speed is decreased
+        by 1 instead, as on a regular slowdown."""
+        max_speed = self.max_speed if self.speed_limit is None \
+            else min(self.max_speed, self.speed_limit)
+        self.current_speed = min(
+            self.current_speed + SPEED_CHANGE_STEP,
+            max(max_speed, self.current_speed - SPEED_CHANGE_STEP))
         logger.debug("Increased speed to %s", self.current_speed)
 
     def decrease_speed(self) -> None:
@@ -69,6 +81,11 @@ class BasicMovementManager(MovementManager):
         self.current_speed = max(self.current_speed - SPEED_CHANGE_STEP, 1)
         logger.debug("Decreased speed to %s", self.current_speed)
 
+    def set_speed_limit(self, speed_limit: Optional[int]) -> None:
+        """Sets speed limit of the current map cell, `None` if
+        unlimited"""
+        self.speed_limit = speed_limit
+
     def turn(self, direction: schemas.Direction) -> None:
         """Try to make a turn or report why can't otherwise"""
         if self.can_turn:
@@ -135,16 +152,16 @@ class BasicMovementManager(MovementManager):
 
         Both conditions a required be met:
         1. Speed equals or less than threshold
-        2. Distance until turn allowed is 0
+        2. Distance until turn allowed is 0, or passed on the last move
         """
         self.can_turn = all([
             self.current_speed <= TURN_SPEED_THRESHOLD,
-            self.distance_until_turn_allowed == 0])
+            self.distance_until_turn_allowed <= 0])
 
     def _define_distance_until_turn(self) -> int:
         """Simulate retrieveing distance until next turn.
 
         Currently, for sample purpose, simulation formula is applied.
         """
-        return int(random.randint(1, TURN_DISTANCE_BASE) ** 0.5) \
+        return int(self.rng.randint(1, TURN_DISTANCE_BASE) ** 0.5) \
             + TURN_DISTANCE_OFFSET
@@ -9,6 +9,7 @@ from app.core.heading import HeadingDirectionManager
 from app.core.interfaces import (
     AllowedZoneManager,
     DestinationTracker,
+    HeadingDirectionsInterface,
     LocationService,
     MovementManager,
     NavigationManager,
@@ -19,12 +20,17 @@ from app.utils.logger import get_logger
 
 DESTINATION_REACHED_THRESHOLD = config('DESTINATION_REACHED_THRESHOLD',
                                        cast=int)
+# destination until the first task, immutable, shared by all trackers
+NO_DESTINATION = schemas.Location(x=0, y=0)
 
 logger = get_logger(__name__)
 
 
 class BasicNavigationManager(NavigationManager):
     """Manages communication and track state related to navigation"""
+    __slots__ = ('allowed_zone_manager', 'destination_tracker',
+                 'heading_selector', 'location_service', 'movement_manager')
+
     def __init__(
             self,
             allowed_zone_manager: AllowedZoneManager,
@@ -89,6 +95,9 @@ class BasicNavigationManager(NavigationManager):
                          self.current_speed, self.distance_until_turn_allowed)
             self.heading_selector.update_heading_direction()
             self.movement_manager.turn(self.heading_selector.heading_direction)
+        location = self.current_location
+        self.movement_manager.set_speed_limit(
+            self.location_service.nav_map.speed_limit(location.x, location.y))
         movement_shift = self.movement_manager.move()
         self.update_location(movement_shift)
         self._update_statuses()
@@ -114,7 +123,8 @@ class BasicNavigationManager(NavigationManager):
         self.allowed_zone_manager.update_state()
 
 
-class BasicDestinationTracker(DestinationTracker):
+class BasicDestinationTracker(DestinationTracker,
+                              HeadingDirectionsInterface):
     """Class responsible for tracking destination.
 
     Keeps track destination related telemetry:
@@ -130,6 +140,10 @@ class BasicDestinationTracker(DestinationTracker):
     the destination from extrnal call. 
     No validations or destination definition applied.
     """
+    __slots__ = ('_destination', '_destination_reached',
+                 '_destination_reached_threshold', '_distance_to_destination',
+                 'heading_directions', 'location_service')
+
     def __init__(
             self,
             location_service: LocationService,
@@ -137,7 +151,7 @@ class BasicDestinationTracker(DestinationTracker):
                 DESTINATION_REACHED_THRESHOLD,
             ):
 
-        self.destination: schemas.Location = schemas.Location(x=0, y=0)
+        self.destination: schemas.Location = NO_DESTINATION
         self.destination_reached: bool = False
         self.destination_reached_threshold: int = destination_reached_threshold
         self.distance_to_destination: int = math.inf
@@ -199,6 +213,12 @@ class BasicDestinationTracker(DestinationTracker):
             heading_directions.append(schemas.Direction.DOWN)
         return heading_directions
 
+    def update_heading_directions(self) -> None:
+        """Updates heading directions towards the destination. Allows to
+        register the tracker as a heading directions provider.
+        """
+        self.heading_directions = self.get_heading_directions()
+
     def update_distance_to_destination(self) -> None:
         """Calculates distance to destination and updates corresponding
         property.
@@ -230,7 +250,7 @@ class BasicDestinationTracker(DestinationTracker):
         ])
 
         self.destination_reached = reached
-        logger.debug("Destination reached: %s", str(self.destination_reached))
+        logger.debug("Destination reached: %s", self.destination_reached)
 
 
 class BasicAllowedZoneManager(AllowedZoneManager):
@@ -240,6 +260,8 @@ class BasicAllowedZoneManager(AllowedZoneManager):
     Maintains boolean `out of zone` indicator property and a list of
     violated borders.
     """
+    __slots__ = ('location_service', '_out_of_zone', '_zone_borders_breached')
+
     def __init__(
             self,
             location_service: LocationService
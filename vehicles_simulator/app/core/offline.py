@@ -0,0 +1,241 @@
+"""
+Store-and-forward buffering of tracking messages while a tracker is
+OFFLINE.
+
+Every vehicle has an `OfflineBuffer` keeping up to
+`OFFLINE_BUFFER_SIZE` messages in memory. When it is full, further
+messages are spilled to the `SpillStore` shared by the process, if
+`OFFLINE_SPILL_DIR` is set, otherwise the oldest buffered message is
+dropped.
+
+The spill store appends messages to memory-mapped segment files of
+`OFFLINE_SPILL_SEGMENT_BYTES`, up to `OFFLINE_SPILL_MAX_BYTES` in
+total, new messages are dropped when it is full. A segment file is
+removed once all its messages are replayed.
+
+On reconnect the tracker replays buffered messages, oldest first, with
+`MessageSender.send_messages`, and removes them from the buffer only
+once sent. Messages the sender did not accept stay buffered, ahead of
+later messages. Messages are stored serialized, so they keep their
+original `created_time`.
+
+Buffers and the spill store are used from the event loop thread, they
+are not thread-safe.
+"""
+from collections import deque
+import mmap
+import os
+from typing import Deque, Dict, List, Optional, Tuple
+from decouple import config
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+OFFLINE_BUFFER_SIZE = config('OFFLINE_BUFFER_SIZE', cast=int, default=1000)
+# empty disables spilling to disk
+OFFLINE_SPILL_DIR = config('OFFLINE_SPILL_DIR', default='')
+OFFLINE_SPILL_SEGMENT_BYTES = config('OFFLINE_SPILL_SEGMENT_BYTES', cast=int,
+                                     default=1024 * 1024)
+OFFLINE_SPILL_MAX_BYTES = config('OFFLINE_SPILL_MAX_BYTES', cast=int,
+                                 default=256 * 1024 * 1024)
+
+# segment, offset and length of a spilled message
+SpillLocation = Tuple[int, int, int]
+
+logger = get_logger(__name__)
+buffer_bytes_gauge = metrics.gauge('offline_buffer_bytes',
+                                   "Bytes of offline messages kept in memory")
+spill_bytes_gauge = metrics.gauge('offline_spill_bytes',
+                                  "Bytes of spill segment files on disk")
+spilled_bytes_counter = metrics.counter('offline_spilled_bytes_total',
+                                        "Bytes of offline messages spilled")
+dropped_messages_counter = metrics.counter(
+    'offline_messages_dropped_total',
+    "Offline messages dropped, buffer and spill store full")
+
+
+class SpillStore:
+    """Append-only memory-mapped segment files of spilled messages"""
+    def __init__(
+            self,
+            directory: str = OFFLINE_SPILL_DIR,
+            segment_bytes: int = OFFLINE_SPILL_SEGMENT_BYTES,
+            max_bytes: int = OFFLINE_SPILL_MAX_BYTES,
+            ) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self._segments: Dict[int, mmap.mmap] = {}
+        self._live_messages: Dict[int, int] = {}
+        self._active_segment: Optional[int] = None
+        self._offset: int = 0
+        self._next_segment: int = 0
+
+        # counters
+        self.bytes_spilled: int = 0
+        self.messages_spilled: int = 0
+
+    @property
+    def size_bytes(self) -> int:
+        """Bytes of segment files on disk"""
+        return len(self._segments) * self.segment_bytes
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            'segments': len(self._segments),
+            'size_bytes': self.size_bytes,
+            'bytes_spilled': self.bytes_spilled,
+            'messages_spilled': self.messages_spilled,
+        }
+
+    def append(self, data: bytes) -> Optional[SpillLocation]:
+        """Appends data to the active segment, `None` if the store is
+        full"""
+        if len(data) > self.segment_bytes:
+            return None
+        segment = self._active_segment
+        if segment is None \
+                or self._offset + len(data) > self.segment_bytes:
+            if self.size_bytes + self.segment_bytes > self.max_bytes:
+                return None
+            segment = self._open_segment()
+        self._segments[segment][self._offset:self._offset + len(data)] = data
+        location = (segment, self._offset, len(data))
+        self._offset += len(data)
+        self._live_messages[segment] += 1
+        self.bytes_spilled += len(data)
+        self.messages_spilled += 1
+        spilled_bytes_counter.inc(len(data))
+        return location
+
+    def read(self, location: SpillLocation) -> bytes:
+        segment, offset, length = location
+        return self._segments[segment][offset:offset + length]
+
+    def release(self, location: SpillLocation) -> None:
+        """Marks spilled data as replayed, removes the segment if all its
+        data is replayed and it is not appended to anymore"""
+        segment = location[0]
+        self._live_messages[segment] -= 1
+        if not self._live_messages[segment] \
+                and segment != self._active_segment:
+            self._remove_segment(segment)
+
+    def close(self) -> None:
+        """Removes all segments"""
+        for segment in list(self._segments):
+            self._remove_segment(segment)
+        self._active_segment = None
+        logger.info("Spill store closed: %s", self.stats)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory,
+                            f"{os.getpid()}-{segment:08d}.spill")
+
+    def _open_segment(self) -> int:
+        previous = self._active_segment
+        segment = self._next_segment
+        self._next_segment += 1
+        with open(self._segment_path(segment), 'w+b') as segment_file:
+            segment_file.truncate(self.segment_bytes)
+            self._segments[segment] = mmap.mmap(segment_file.fileno(),
+                                                self.segment_bytes)
+        self._live_messages[segment] = 0
+        self._active_segment = segment
+        self._offset = 0
+        spill_bytes_gauge.inc(self.segment_bytes)
+        if previous is not None and not self._live_messages[previous]:
+            self._remove_segment(previous)
+        return segment
+
+    def _remove_segment(self, segment: int) -> None:
+        self._segments.pop(segment).close()
+        del self._live_messages[segment]
+        os.remove(self._segment_path(segment))
+        spill_bytes_gauge.dec(self.segment_bytes)
+
+
+class OfflineBuffer:
+    """Bounded buffer of a vehicle messages, spilled messages follow the
+    messages kept in memory.
+
+    Queues are allocated on the first buffered message and released when
+    drained, so trackers that are online take no buffer memory.
+    """
+    __slots__ = ('max_messages', 'spill_store', '_messages', '_spilled',
+                 'memory_bytes', 'messages_dropped')
+
+    def __init__(
+            self,
+            max_messages: int = OFFLINE_BUFFER_SIZE,
+            spill_store: Optional[SpillStore] = None,
+            ) -> None:
+        self.max_messages = max_messages
+        self.spill_store = spill_store
+        self._messages: Optional[Deque[str]] = None
+        self._spilled: Optional[Deque[SpillLocation]] = None
+
+        # counters
+        self.memory_bytes: int = 0
+        self.messages_dropped: int = 0
+
+    def __len__(self) -> int:
+        return len(self._messages or ()) + len(self._spilled or ())
+
+    def append(self, message: str) -> None:
+        """Buffers message, spills it if the memory buffer is full"""
+        if not self._spilled \
+                and len(self._messages or ()) < self.max_messages:
+            self._keep(message)
+        elif self.spill_store is not None:
+            location = self.spill_store.append(message.encode('utf-8'))
+            if location is None:
+                self._drop()
+                return
+            if self._spilled is None:
+                self._spilled = deque()
+            self._spilled.append(location)
+        elif self._messages:
+            dropped = self._messages.popleft()
+            self.memory_bytes -= len(dropped)
+            buffer_bytes_gauge.dec(len(dropped))
+            self._drop()
+            self._keep(message)
+        else:
+            self._drop()
+
+    def peek(self) -> List[str]:
+        """Returns buffered messages, oldest first, keeps them buffered"""
+        messages = list(self._messages or ())
+        if self._spilled and self.spill_store is not None:
+            messages.extend(self.spill_store.read(location).decode('utf-8')
+                            for location in self._spilled)
+        return messages
+
+    def clear(self) -> None:
+        """Removes buffered messages, releases spilled ones"""
+        self._messages = None
+        buffer_bytes_gauge.dec(self.memory_bytes)
+        self.memory_bytes = 0
+        if self._spilled and self.spill_store is not None:
+            for location in self._spilled:
+                self.spill_store.release(location)
+        self._spilled = None
+
+    def drain(self) -> List[str]:
+        """Removes and returns buffered messages, oldest first"""
+        messages = self.peek()
+        self.clear()
+        return messages
+
+    def _keep(self, message: str) -> None:
+        if self._messages is None:
+            self._messages = deque()
+        self._messages.append(message)
+        self.memory_bytes += len(message)
+        buffer_bytes_gauge.inc(len(message))
+
+    def _drop(self) -> None:
+        self.messages_dropped += 1
+        dropped_messages_counter.inc()
@@ -0,0 +1,229 @@
+"""
+Implements route planning over the navigation map.
+
+`RoutePlanner` finds shortest 4-connected grid routes with A* over
+cells of the allowed zone, avoiding blocked cells of the
+`NavigationMap`. A route ends at the first cell where the destination
+is reached, within `DESTINATION_REACHED_THRESHOLD` on both axes, so
+vehicles do not drive around the destination cell itself.
+
+Computed routes, and the absence of a route, are kept in a fleet-wide
+LRU `RouteCache` keyed on origin and destination cells. Every cell of a
+route starts a shortest route to the same destination, so a route is
+cached for each of its cells, as an offset into the shared route.
+Routes prefer straight legs, so vehicles driving straight segments
+stay on them. Cached routes are dropped when the map `version` changes.
+
+`RouteHeadingProvider` suggests the direction of the first step of the
+route from the current location to the destination. It is registered
+as a heading provider of the `HeadingDirectionManager` when
+`ROUTE_PLANNING_ENABLED` is set, with weight `ROUTE_PROVIDER_WEIGHT`.
+A vehicle out of the zone has no route, the provider suggests nothing
+and other providers lead it back.
+"""
+import heapq
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+from decouple import config
+from app.core.interfaces import (
+    DestinationTracker,
+    HeadingDirectionsInterface,
+    LocationService,
+)
+from app.core.location import NavigationMap
+from app.core.navigation import DESTINATION_REACHED_THRESHOLD
+from app.utils import schemas
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+
+ROUTE_PLANNING_ENABLED = config('ROUTE_PLANNING_ENABLED', cast=bool,
+                                default=False)
+ROUTE_PROVIDER_WEIGHT = config('ROUTE_PROVIDER_WEIGHT', cast=float,
+                               default=50)
+ROUTE_CACHE_SIZE = config('ROUTE_CACHE_SIZE', cast=int, default=10_000)
+
+Cell = Tuple[int, int]
+Route = Tuple[Cell, ...]
+
+STEPS = (
+    ((1, 0), schemas.Direction.RIGHT),
+    ((-1, 0), schemas.Direction.LEFT),
+    ((0, 1), schemas.Direction.UP),
+    ((0, -1), schemas.Direction.DOWN),
+)
+STEP_DIRECTIONS = dict(STEPS)
+
+logger = get_logger(__name__)
+cache_requests_counters = {
+    result: metrics.counter('route_cache_requests_total',
+                            "Route cache lookups", result=result)
+    for result in ('hit', 'miss')
+}
+planning_timer = metrics.histogram('route_planning_seconds',
+                                   "Duration of A* route searches")
+
+
+class RouteCache:
+    """Least recently used routes, by origin and destination cells"""
+    def __init__(self, maxsize: int = ROUTE_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._routes: OrderedDict = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def get(self, key: Hashable):
+        """Cached value, `KeyError` if not cached"""
+        try:
+            route = self._routes[key]
+        except KeyError:
+            self.misses += 1
+            cache_requests_counters['miss'].inc()
+            raise
+        self._routes.move_to_end(key)
+        self.hits += 1
+        cache_requests_counters['hit'].inc()
+        return route
+
+    def put(self, key: Hashable, value) -> None:
+        self._routes[key] = value
+        self._routes.move_to_end(key)
+        if len(self._routes) > self.maxsize:
+            self._routes.popitem(last=False)
+
+    def clear(self) -> None:
+        self._routes.clear()
+
+
+class RoutePlanner:
+    """Plans grid routes with A*, caches them"""
+    def __init__(
+            self,
+            nav_map: NavigationMap,
+            cache: RouteCache,
+            destination_reached_threshold: int = (
+                DESTINATION_REACHED_THRESHOLD),
+            ) -> None:
+        self.nav_map = nav_map
+        self.cache = cache
+        self.destination_reached_threshold = destination_reached_threshold
+        self._map_version = nav_map.version
+
+    def route(self, origin: Cell, destination: Cell) -> Optional[Route]:
+        """Cells from origin to where destination is reached, both
+        included, `None` if there is no route"""
+        if self.nav_map.version != self._map_version:
+            self.cache.clear()
+            self._map_version = self.nav_map.version
+        try:
+            route, start = self.cache.get((origin, destination))
+        except KeyError:
+            pass
+        else:
+            return route[start:] if route is not None else None
+        with planning_timer.time():
+            route = self.find_route(origin, destination)
+        if route is None:
+            self.cache.put((origin, destination), (None, 0))
+            return None
+        for start, cell in enumerate(route):
+            self.cache.put((cell, destination), (route, start))
+        return route
+
+    def find_route(self, origin: Cell, destination: Cell
+                   ) -> Optional[Route]:
+        """A* search with the manhattan distance to the destination area
+        as the heuristic.
+
+        Among cells of equal estimated cost the one closer to the
+        destination area is expanded first, then one reached without a
+        turn. A blocked destination is reached at the nearest passable
+        cell of its area, `None` if none of them can be reached.
+        """
+        is_passable = self.nav_map.is_passable
+        if not is_passable(*origin):
+            return None
+        dest_x, dest_y = destination
+        threshold = self.destination_reached_threshold
+
+        def heuristic(x: int, y: int) -> int:
+            return max(abs(dest_x - x) - threshold, 0) \
+                + max(abs(dest_y - y) - threshold, 0)
+
+        distance = heuristic(*origin)
+        # (estimated cost, distance, turn, cell, step into the cell)
+        frontier: List[Tuple[int, int, bool, Cell, Optional[Cell]]] = \
+            [(distance, distance, False, origin, None)]
+        costs = {origin: 0}
+        previous: Dict[Cell, Optional[Cell]] = {origin: None}
+        while frontier:
+            _, distance, _, cell, step = heapq.heappop(frontier)
+            if distance == 0:
+                return self._reconstruct(previous, cell)
+            cost = costs[cell] + 1
+            for next_step, _ in STEPS:
+                x, y = cell[0] + next_step[0], cell[1] + next_step[1]
+                neighbour = (x, y)
+                if cost >= costs.get(neighbour, cost + 1) \
+                        or not is_passable(x, y):
+                    continue
+                costs[neighbour] = cost
+                previous[neighbour] = cell
+                distance = heuristic(x, y)
+                heapq.heappush(frontier, (cost + distance, distance,
+                                          next_step != step, neighbour,
+                                          next_step))
+        return None
+
+    @staticmethod
+    def _reconstruct(previous: dict, cell: Cell) -> Route:
+        route: List[Cell] = []
+        while cell is not None:
+            route.append(cell)
+            cell = previous[cell]
+        return tuple(reversed(route))
+
+
+class RouteHeadingProvider(HeadingDirectionsInterface):
+    """Suggests the next direction of the planned route to destination"""
+    __slots__ = ('location_service', 'destination_tracker', 'planner',
+                 '_heading_directions')
+
+    def __init__(
+            self,
+            location_service: LocationService,
+            destination_tracker: DestinationTracker,
+            planner: RoutePlanner,
+            ) -> None:
+        self.location_service = location_service
+        self.destination_tracker = destination_tracker
+        self.planner = planner
+        self._heading_directions: List[schemas.Direction] = []
+
+    @property
+    def heading_directions(self) -> List[schemas.Direction]:
+        return self._heading_directions
+
+    def update_heading_directions(self) -> None:
+        location = self.location_service.current_location
+        destination = self.destination_tracker.destination
+        route = self.planner.route((location.x, location.y),
+                                   (destination.x, destination.y))
+        if route is None or len(route) < 2:
+            self._heading_directions = []
+            return
+        (x, y), (next_x, next_y) = route[0], route[1]
+        self._heading_directions = [STEP_DIRECTIONS[(next_x - x,
+                                                     next_y - y)]]
+        logger.debug("Route of %s steps, heading %s", len(route) - 1,
+                     self._heading_directions[0].value)
+
+
+route_cache = RouteCache()
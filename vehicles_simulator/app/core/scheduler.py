@@ -0,0 +1,161 @@
+"""
+Implements the VehicleScheduler class.
+
+The scheduler runs vehicle execution steps at a per-vehicle reporting
+interval using a constant number of coroutines, regardless of the fleet
+size:
+
+- due times of all vehicles are kept in a heap;
+- a single dispatcher coroutine pops vehicles that are due and puts them
+  into a queue;
+- a fixed pool of worker coroutines runs execution steps of queued
+  vehicles and schedules their next step.
+
+Next due time is counted from the previous due time, so a vehicle keeps
+its rate when steps are dispatched late. A vehicle that is behind by
+more than one interval skips the missed steps instead of bursting.
+"""
+import asyncio
+import heapq
+import random
+import time
+from typing import Dict, List, Optional, Sequence
+from app.core.interfaces import MessageSender
+from app.core.vehicle import Vehicle
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class VehicleScheduler:
+    """Runs execution steps of vehicles with a fixed pool of workers"""
+    def __init__(
+            self,
+            vehicles: Sequence[Vehicle],
+            intervals: Sequence[float],
+            workers: int = 10,
+            rounds: Optional[int] = None,
+            message_sender: Optional[MessageSender] = None,
+            resolution: float = 0.01,
+            rng: Optional[random.Random] = None,
+            ) -> None:
+        if len(intervals) != len(vehicles):
+            raise ValueError(f"Expected an interval per vehicle, got "
+                             f"{len(intervals)} for {len(vehicles)} vehicles")
+        if any(interval <= 0 for interval in intervals):
+            raise ValueError("Expected all intervals to be positive")
+        self.vehicles = vehicles
+        self.intervals = intervals
+        self.workers = workers
+        self.rounds = rounds
+        self.message_sender = message_sender
+        self.resolution = resolution
+        self.rng: random.Random = rng or random.Random()
+
+        self._due: List[tuple] = []  # heap of (due time, vehicle index)
+        self._remaining_rounds: List[Optional[int]] = \
+            [rounds] * len(vehicles)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._dispatched: int = 0  # queued or running steps
+
+        # counters
+        self.steps: int = 0
+        self.failed_steps: int = 0
+        self.skipped_steps: int = 0
+        self.elapsed: float = 0.0
+
+    @property
+    def target_rate(self) -> float:
+        """Steps per second the fleet is scheduled to make"""
+        return sum(1 / interval for interval in self.intervals)
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """Achieved rate against target rate"""
+        achieved_rate = self.steps / self.elapsed if self.elapsed else 0.0
+        return {
+            'steps': self.steps,
+            'failed_steps': self.failed_steps,
+            'skipped_steps': self.skipped_steps,
+            'elapsed_sec': round(self.elapsed, 3),
+            'target_steps_per_sec': round(self.target_rate, 1),
+            'achieved_steps_per_sec': round(achieved_rate, 1),
+        }
+
+    async def run(self, duration: Optional[float] = None) -> None:
+        """Runs vehicles until all rounds are done or duration expires"""
+        start = time.monotonic()
+        # spread first steps over an interval to avoid a burst at start
+        first_due = [
+            (start + self.rng.uniform(0, interval), index)
+            for index, interval in enumerate(self.intervals)]
+        # vehicles without rounds to run make no step, as in loop mode
+        self._due = [
+            (due_time, index) for due_time, index in first_due
+            if (remaining := self._remaining_rounds[index]) is None
+            or remaining > 0]
+        heapq.heapify(self._due)
+        stop_time = start + duration if duration is not None else None
+
+        workers = [asyncio.create_task(self._worker())
+                   for _ in range(self.workers)]
+        try:
+            await self._dispatch(stop_time)
+            await self._queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.elapsed = time.monotonic() - start
+        logger.info("Scheduler stats: %s", self.stats)
+
+    async def _dispatch(self, stop_time: Optional[float]) -> None:
+        """Moves due vehicles from the heap to the workers queue"""
+        while self._due or self._dispatched:
+            now = time.monotonic()
+            if stop_time is not None and now >= stop_time:
+                return
+            while self._due and self._due[0][0] <= now:
+                due_time, index = heapq.heappop(self._due)
+                self._queue.put_nowait((due_time, index))
+                self._dispatched += 1
+            next_due = self._due[0][0] if self._due else now \
+                + self.resolution
+            await asyncio.sleep(min(max(next_due - now, 0),
+                                    self.resolution))
+
+    async def _worker(self) -> None:
+        """Runs execution steps of queued vehicles"""
+        while True:
+            due_time, index = await self._queue.get()
+            try:
+                if self.message_sender is not None:
+                    await self.message_sender.wait_for_capacity()
+                self.vehicles[index].run_execution_step()
+                self.steps += 1
+            except Exception:  # pylint: disable=broad-exception-caught
+                self.failed_steps += 1
+                logger.exception("Execution step of vehicle %s failed",
+                                 index)
+            finally:
+                self._schedule_next(due_time, index)
+                self._dispatched -= 1
+                self._queue.task_done()
+
+    def _schedule_next(self, due_time: float, index: int) -> None:
+        """Pushes the next step of a vehicle to the heap"""
+        remaining = self._remaining_rounds[index]
+        if remaining is not None:
+            remaining -= 1
+            self._remaining_rounds[index] = remaining
+            if remaining <= 0:
+                return
+
+        interval = self.intervals[index]
+        next_due = due_time + interval
+        now = time.monotonic()
+        if next_due < now:
+            missed = int((now - next_due) // interval) + 1
+            self.skipped_steps += missed
+            next_due += missed * interval
+        heapq.heappush(self._due, (next_due, index))
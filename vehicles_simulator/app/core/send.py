@@ -1,49 +1,176 @@
-"""Implements class responsible for sending data to endpoint"""
-import boto3
-from botocore.exceptions import ClientError
-from botocore.config import Config
+"""Implements class responsible for sending data to endpoint.
+
+`boto3` is imported, and SQS clients are created and queues resolved,
+on the first send, so importing the module and creating senders for a
+fleet stays cheap.
+"""
+import asyncio
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import functools
+import itertools
+import threading
+import time
+from typing import (
+    Deque,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 from decouple import config
 
 from app.core.interfaces import MessageSender
+from app.core.sinks import TRACKING_SINK, create_sink
 from app.utils.logger import get_logger
+from app.utils.metrics import metrics
 
+AWS_REGION = config('AWS_REGION', default=None)
 TRACKING_SQS_URL = config('TRACKING_SQS_URL')
 TRACKING_SQS_QUEUE_NAME = config('TRACKING_SQS_QUEUE_NAME')
+SQS_MAX_POOL_CONNECTIONS = config('SQS_MAX_POOL_CONNECTIONS', cast=int,
+                                  default=50)
+SEND_BATCH_MAX_AGE_SEC = config('SEND_BATCH_MAX_AGE_SEC', cast=float,
+                                default=1.0)
+SEND_BATCH_MAX_RETRIES = config('SEND_BATCH_MAX_RETRIES', cast=int,
+                                default=3)
+SEND_MAX_IN_FLIGHT = config('SEND_MAX_IN_FLIGHT', cast=int, default=1000)
+SQS_MAX_ATTEMPTS = config('SQS_MAX_ATTEMPTS', cast=int, default=5)
+# 0 disables the outbound queue
+OUTBOUND_QUEUE_SIZE = config('OUTBOUND_QUEUE_SIZE', cast=int, default=0)
+OUTBOUND_QUEUE_POLICY = config('OUTBOUND_QUEUE_POLICY', default='block')
+OUTBOUND_QUEUE_POLICIES = ('block', 'drop_oldest', 'coalesce')
+
+# shortest wait between expired buffer checks of the flusher thread
+FLUSHER_MIN_INTERVAL_SEC = 0.01
+
+# AWS SQS `SendMessageBatch` limits
+SQS_MAX_BATCH_SIZE = 10
+SQS_MAX_BATCH_BYTES = 256 * 1024
 
 logger = get_logger(__name__)
-boto_config = Config(
-    retries={
-        'max_attempts': 5,
-        'mode': 'standard'
-    },
-    connect_timeout=1,
-    read_timeout=1
-)
+request_timers = {
+    operation: metrics.histogram('sqs_request_seconds',
+                                 "Duration of SQS requests",
+                                 operation=operation)
+    for operation in ('send_message', 'send_message_batch')
+}
+messages_sent_counter = metrics.counter('sqs_messages_sent_total',
+                                        "Messages accepted by SQS")
+send_errors_counter = metrics.counter('sqs_send_errors_total',
+                                      "Failed SQS send requests")
+in_flight_gauge = metrics.gauge('sender_in_flight',
+                                "Messages handed off, not yet sent")
+queue_depth_gauge = metrics.gauge('outbound_queue_depth',
+                                  "Messages in the outbound queue")
+queue_dropped_counters = {
+    reason: metrics.counter('outbound_queue_dropped_total',
+                            "Messages dropped from the outbound queue",
+                            reason=reason)
+    for reason in ('drop_oldest', 'coalesce')
+}
+
+
+def create_boto_config():
+    """Client config of SQS senders"""
+    # pylint: disable=import-outside-toplevel
+    from botocore.config import Config
+    return Config(
+        retries={
+            # unlike `max_attempts`, includes the initial request
+            'total_max_attempts': SQS_MAX_ATTEMPTS,
+            'mode': 'standard'
+        },
+        connect_timeout=1,
+        read_timeout=1,
+        max_pool_connections=SQS_MAX_POOL_CONNECTIONS,
+        tcp_keepalive=True,
+    )
+
+
+def split_batches(
+        messages: List[str],
+        max_batch_size: int = SQS_MAX_BATCH_SIZE,
+        max_batch_bytes: int = SQS_MAX_BATCH_BYTES,
+        ) -> Iterator[List[str]]:
+    """Splits messages, in order, into batches within the size limits"""
+    batch: List[str] = []
+    batch_bytes = 0
+    for message in messages:
+        message_bytes = len(message.encode('utf-8'))
+        if message_bytes > max_batch_bytes:
+            raise ValueError(f"Message of {message_bytes} bytes exceeds "
+                             f"batch limit of {max_batch_bytes} bytes")
+        if len(batch) >= max_batch_size \
+                or batch_bytes + message_bytes > max_batch_bytes:
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(message)
+        batch_bytes += message_bytes
+    if batch:
+        yield batch
 
 
 class SQSMessageSender(MessageSender):
-    """Implements sending data to AWS SQS"""
+    """Implements sending data to AWS SQS.
+
+    A client and queue url can be passed to reuse ones that are already
+    set up, otherwise a new client is created and the queue is resolved
+    on first use.
+    """
     def __init__(
             self,
-            endpoint_url: str = None,
-            queue_name: str = None,
+            endpoint_url: Optional[str] = None,
+            queue_name: Optional[str] = None,
+            sqs_client=None,
+            queue_url: Optional[str] = None,
             ):
         self.endpoint_url: str = endpoint_url or TRACKING_SQS_URL
         self.queue_name: str = queue_name or TRACKING_SQS_QUEUE_NAME
-        self.sqs = self._get_sqs_client(endpoint_url=self.endpoint_url)
-        self._create_queue()
-        self.queue_url = self._get_queue_url()
+        self._sqs = sqs_client
+        self._queue_url: Optional[str] = queue_url
+        self._setup_lock = threading.RLock()
+
+    @property
+    def sqs(self):
+        """SQS client, created on first use"""
+        if self._sqs is None:
+            with self._setup_lock:
+                if self._sqs is None:
+                    self._sqs = self._get_sqs_client(
+                        endpoint_url=self.endpoint_url)
+        return self._sqs
+
+    @property
+    def queue_url(self) -> str:
+        """Queue url, the queue is created and resolved on first use"""
+        if self._queue_url is None:
+            with self._setup_lock:
+                if self._queue_url is None:
+                    self._create_queue()
+                    self._queue_url = self._get_queue_url()
+        return self._queue_url
 
     def _get_sqs_client(self, endpoint_url):
         """Initializes client to access AWS SQS service"""
+        # pylint: disable=import-outside-toplevel
+        import boto3
         sqs_client = boto3.client(
             'sqs',
             endpoint_url=endpoint_url,
+            region_name=AWS_REGION,
+            config=create_boto_config(),
         )
         return sqs_client
 
     def _get_queue_url(self):
         """Method to retrieve a queue url given its name"""
+        # pylint: disable=import-outside-toplevel
+        from botocore.exceptions import ClientError
         try:
             response = self.sqs.get_queue_url(QueueName=self.queue_name)
             logger.debug("Queue creation response: %s", response)
@@ -74,8 +201,701 @@ class SQSMessageSender(MessageSender):
 
     def send_message(self, message: str):
         """Sends message to endpoint"""
-        response = self.sqs.send_message(
-                QueueUrl=self.queue_url,
-                MessageBody=message,
-                )
+        try:
+            with request_timers['send_message'].time():
+                response = self.sqs.send_message(
+                        QueueUrl=self.queue_url,
+                        MessageBody=message,
+                        )
+        except Exception:
+            send_errors_counter.inc()
+            raise
+        messages_sent_counter.inc()
         logger.debug("Send message response: %s", response)
+
+    def send_messages(self, messages: List[str]) -> List[str]:
+        """Sends messages with a `send_message_batch` call per batch.
+
+        Returns messages failed not due to sender fault, e.g. throttled,
+        and, once a request fails, messages of the remaining batches.
+        """
+        # pylint: disable=import-outside-toplevel
+        from botocore.exceptions import BotoCoreError, ClientError
+        unsent: List[str] = []
+        batches = list(split_batches(messages))
+        for i, batch in enumerate(batches):
+            try:
+                with request_timers['send_message_batch'].time():
+                    response = self.sqs.send_message_batch(
+                        QueueUrl=self.queue_url,
+                        Entries=[{'Id': str(j), 'MessageBody': message}
+                                 for j, message in enumerate(batch)],
+                    )
+            except (BotoCoreError, ClientError) as e:
+                send_errors_counter.inc()
+                logger.warning("Send message batch failed: %s", e)
+                for remaining in batches[i:]:
+                    unsent.extend(remaining)
+                return unsent
+            messages_sent_counter.inc(len(response.get('Successful', [])))
+            failed = set()
+            for failure in response.get('Failed', []):
+                if failure.get('SenderFault'):
+                    logger.error("Message rejected: %s, %s",
+                                 failure.get('Code'), failure.get('Message'))
+                else:
+                    failed.add(failure['Id'])
+            unsent.extend(message for j, message in enumerate(batch)
+                          if str(j) in failed)
+        return unsent
+
+
+class BatchingMessageSender(SQSMessageSender):
+    """Implements sending data to AWS SQS in batches.
+
+    Messages are buffered and sent with a single `send_message_batch`
+    call once one of the thresholds is hit:
+    - number of buffered messages reaches `max_batch_size`
+    - buffered payload would exceed `max_batch_bytes`
+    - the oldest buffered message is older than `max_batch_age` seconds
+
+    Age is checked on every `send_message` call and, every
+    `max_batch_age` seconds, by a flusher thread started on the first
+    buffered message, so an idle buffer is sent too. Call `close` on
+    shutdown to send remaining messages, sending after `close` raises
+    `RuntimeError`.
+
+    A batch is sent once by the caller. Entries reported as failed, and
+    whole batches failed by a request or transport error, are retried by
+    the flusher thread with exponential backoff, so callers running in
+    the event loop never sleep. The flusher keeps sending expired
+    buffers while retries wait for their backoff. Entries failed due to
+    sender fault are not retried, entries still failing after
+    `max_retries` are counted as failed.
+    """
+    def __init__(
+            self,
+            endpoint_url: Optional[str] = None,
+            queue_name: Optional[str] = None,
+            sqs_client=None,
+            queue_url: Optional[str] = None,
+            max_batch_size: int = SQS_MAX_BATCH_SIZE,
+            max_batch_bytes: int = SQS_MAX_BATCH_BYTES,
+            max_batch_age: float = SEND_BATCH_MAX_AGE_SEC,
+            max_retries: int = SEND_BATCH_MAX_RETRIES,
+            retry_backoff: float = 0.05,
+            ):
+        if not 1 <= max_batch_size <= SQS_MAX_BATCH_SIZE:
+            raise ValueError(f"Expected `max_batch_size` within [1, "
+                             f"{SQS_MAX_BATCH_SIZE}], got {max_batch_size}")
+        if not 1 <= max_batch_bytes <= SQS_MAX_BATCH_BYTES:
+            raise ValueError(f"Expected `max_batch_bytes` within [1, "
+                             f"{SQS_MAX_BATCH_BYTES}], got {max_batch_bytes}")
+        super().__init__(endpoint_url=endpoint_url, queue_name=queue_name,
+                         sqs_client=sqs_client, queue_url=queue_url)
+        self.max_batch_size: int = max_batch_size
+        self.max_batch_bytes: int = max_batch_bytes
+        self.max_batch_age: float = max_batch_age
+        self.max_retries: int = max_retries
+        self.retry_backoff: float = retry_backoff
+
+        self._buffer: List[str] = []
+        self._buffer_bytes: int = 0
+        self._oldest_message_time: Optional[float] = None
+        self._lock = threading.Lock()
+        # due time, attempt and entries of failed sends
+        self._retries: Deque[Tuple[float, int, Dict[str, str]]] = deque()
+        self._flusher: Optional[threading.Thread] = None
+        self._closing: bool = False  # no messages are accepted
+        self._closed = threading.Event()  # flusher stops once retried
+
+        # counters
+        self.batches_sent: int = 0
+        self.entries_sent: int = 0
+        self.entries_retried: int = 0
+        self.entries_failed: int = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Sending counters"""
+        return {
+            'batches_sent': self.batches_sent,
+            'entries_sent': self.entries_sent,
+            'entries_retried': self.entries_retried,
+            'entries_failed': self.entries_failed,
+            'entries_buffered': len(self._buffer),
+        }
+
+    def send_message(self, message: str):
+        """Buffers message, sends a batch if any threshold is hit"""
+        message_bytes = len(message.encode('utf-8'))
+        if message_bytes > self.max_batch_bytes:
+            raise ValueError(f"Message of {message_bytes} bytes exceeds "
+                             f"batch limit of {self.max_batch_bytes} bytes")
+        batches = []
+        with self._lock:
+            self._check_open()
+            self._start_flusher()
+            if self._buffer_bytes + message_bytes > self.max_batch_bytes:
+                batches.append(self._take_buffer())
+            if not self._buffer:
+                self._oldest_message_time = time.monotonic()
+            self._buffer.append(message)
+            self._buffer_bytes += message_bytes
+
+            if len(self._buffer) >= self.max_batch_size \
+                    or self._buffer_expired():
+                batches.append(self._take_buffer())
+        for batch in batches:
+            self._send_batch(batch)
+
+    def send_messages(self, messages: List[str]) -> List[str]:
+        """Sends buffered messages, then messages in full batches.
+
+        Messages of the burst are sent once, not retried: returns
+        messages failed not due to sender fault and, once a request
+        fails, messages of the remaining batches.
+        """
+        with self._lock:
+            self._check_open()
+            self._start_flusher()
+            buffered = self._take_buffer()
+        self._send_batch(buffered)
+        unsent: List[str] = []
+        batches = list(split_batches(messages, self.max_batch_size,
+                                     self.max_batch_bytes))
+        for i, batch in enumerate(batches):
+            failed = self._send_entries(
+                {str(j): message for j, message in enumerate(batch)})
+            if len(failed) == len(batch):
+                for remaining in batches[i:]:
+                    unsent.extend(remaining)
+                break
+            unsent.extend(failed.values())
+        return unsent
+
+    def flush_if_expired(self) -> None:
+        """Sends buffered messages if the oldest one is too old"""
+        with self._lock:
+            batch = self._take_buffer() if self._buffer_expired() else []
+        self._send_batch(batch)
+
+    def flush(self) -> None:
+        """Sends all buffered messages"""
+        with self._lock:
+            batch = self._take_buffer()
+        self._send_batch(batch)
+
+    def close(self) -> None:
+        """Sends all buffered messages and pending retries before
+        shutdown"""
+        with self._lock:
+            self._closing = True
+            batch = self._take_buffer()
+        self._send_batch(batch)
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        logger.info("Batching sender closed: %s", self.stats)
+
+    def _check_open(self) -> None:
+        """Raises if the sender is closed, expects the lock to be held"""
+        if self._closing:
+            raise RuntimeError("Can't send a message, sender is closed")
+
+    def _start_flusher(self) -> None:
+        """Starts the flusher thread, expects the lock to be held"""
+        if self._flusher is None and not self._closed.is_set():
+            self._flusher = threading.Thread(target=self._run_flusher,
+                                             name='batch-flusher',
+                                             daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self) -> None:
+        """Flusher thread, retries failed sends and sends expired
+        buffers, until the sender is closed and no retries are pending"""
+        interval = max(self.max_batch_age, FLUSHER_MIN_INTERVAL_SEC)
+        while True:
+            for _, attempt, entries in self._take_due_retries():
+                self._retry(attempt, entries)
+            self.flush_if_expired()
+            with self._lock:
+                if self._closed.is_set() and not self._retries:
+                    return
+                next_due = min((due for due, _, _ in self._retries),
+                               default=None)
+            timeout = interval if next_due is None \
+                else min(interval, max(next_due - time.monotonic(), 0))
+            if self._closed.is_set():
+                time.sleep(timeout)  # only retries are left to wait for
+            else:
+                self._closed.wait(timeout)
+
+    def _take_due_retries(self) -> List[Tuple[float, int, Dict[str, str]]]:
+        """Removes and returns retries that are due"""
+        now = time.monotonic()
+        with self._lock:
+            due = [retry for retry in self._retries if retry[0] <= now]
+            if due:
+                self._retries = deque(
+                    retry for retry in self._retries if retry[0] > now)
+        return due
+
+    def _buffer_expired(self) -> bool:
+        """Checks if the oldest buffered message exceeds max age"""
+        return self._oldest_message_time is not None and \
+            time.monotonic() - self._oldest_message_time \
+            >= self.max_batch_age
+
+    def _take_buffer(self) -> List[str]:
+        """Returns buffered messages and resets the buffer.
+        Expects the lock to be held by the caller.
+        """
+        messages = self._buffer
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._oldest_message_time = None
+        return messages
+
+    def _send_batch(self, messages: List[str]) -> None:
+        """Sends a batch, schedules retries of failed entries"""
+        if not messages:
+            return
+        pending = self._send_entries(
+            {str(i): message for i, message in enumerate(messages)})
+        self._schedule_retry(pending, attempt=1)
+
+    def _schedule_retry(self, entries: Dict[str, str], attempt: int) -> None:
+        """Queues failed entries for the flusher thread, counts them as
+        failed once out of retries"""
+        if not entries:
+            return
+        with self._lock:
+            if attempt > self.max_retries or self._flusher is None \
+                    or not self._flusher.is_alive():
+                self.entries_failed += len(entries)
+                logger.error("Failed to send %s messages after %s retries",
+                             len(entries), attempt - 1)
+                return
+            due = time.monotonic() + self.retry_backoff * 2 ** (attempt - 1)
+            self._retries.append((due, attempt, entries))
+
+    def _retry(self, attempt: int, entries: Dict[str, str]) -> None:
+        """Resends failed entries that are due, in the flusher thread"""
+        with self._lock:
+            self.entries_retried += len(entries)
+        pending = self._send_entries(entries)
+        self._schedule_retry(pending, attempt=attempt + 1)
+
+    def _send_entries(self, entries: Dict[str, str]) -> Dict[str, str]:
+        """Single `send_message_batch` call.
+
+        Returns entries that failed and can be retried, all of them if
+        the request failed.
+        """
+        # pylint: disable=import-outside-toplevel
+        from botocore.exceptions import BotoCoreError, ClientError
+        try:
+            with request_timers['send_message_batch'].time():
+                response = self.sqs.send_message_batch(
+                    QueueUrl=self.queue_url,
+                    Entries=[{'Id': entry_id, 'MessageBody': message}
+                             for entry_id, message in entries.items()],
+                )
+        except (BotoCoreError, ClientError) as e:
+            send_errors_counter.inc()
+            logger.warning("Send message batch failed: %s", e)
+            return entries
+
+        successful = len(response.get('Successful', []))
+        messages_sent_counter.inc(successful)
+        retryable = {}
+        rejected = 0
+        for failure in response.get('Failed', []):
+            if failure.get('SenderFault'):
+                rejected += 1
+                logger.error("Message rejected: %s, %s",
+                             failure.get('Code'), failure.get('Message'))
+            else:
+                retryable[failure['Id']] = entries[failure['Id']]
+        with self._lock:
+            self.batches_sent += 1
+            self.entries_sent += successful
+            self.entries_failed += rejected
+        return retryable
+
+
+class AsyncMessageSender(MessageSender):
+    """Hands off messages to a blocking sender running in a bounded
+    thread pool, so sending does not block the event loop.
+
+    `send_message` returns immediately. Number of concurrent blocking
+    sends is limited by `max_workers`, number of messages handed off but
+    not yet sent is limited by `max_in_flight`: callers running in the
+    event loop should `await wait_for_capacity()` before handing off.
+    """
+    def __init__(
+            self,
+            sender: MessageSender,
+            max_workers: int = SQS_MAX_POOL_CONNECTIONS,
+            max_in_flight: int = SEND_MAX_IN_FLIGHT,
+            ):
+        self.sender = sender
+        self.max_workers: int = max_workers
+        self.max_in_flight: int = max_in_flight
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='message-sender')
+        self._lock = threading.Lock()
+        self._capacity_waiters: List[tuple] = []
+
+        # counters
+        self.in_flight: int = 0
+        self.messages_sent: int = 0
+        self.messages_failed: int = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Sending counters"""
+        return {
+            'in_flight': self.in_flight,
+            'messages_sent': self.messages_sent,
+            'messages_failed': self.messages_failed,
+        }
+
+    def send_message(self, message: str):
+        """Hands off message to the thread pool"""
+        with self._lock:
+            self.in_flight += 1
+        in_flight_gauge.inc()
+        future = self._executor.submit(self.sender.send_message,
+                                       message=message)
+        future.add_done_callback(self._on_sent)
+
+    def send_messages(self, messages: List[str]) -> List[str]:
+        """Hands off messages to the thread pool as a single burst, sent
+        in order by the wrapped sender. Handed off messages are not
+        returned, messages the wrapped sender does not accept are counted
+        as failed"""
+        if not messages:
+            return []
+        with self._lock:
+            self.in_flight += len(messages)
+        in_flight_gauge.inc(len(messages))
+        future = self._executor.submit(self.sender.send_messages,
+                                       messages=messages)
+        future.add_done_callback(
+            functools.partial(self._on_sent, messages=len(messages)))
+        return []
+
+    async def wait_for_capacity(self) -> None:
+        """Waits until number of in-flight messages is below the limit"""
+        while self.in_flight >= self.max_in_flight:
+            loop = asyncio.get_running_loop()
+            capacity_available = asyncio.Event()
+            with self._lock:
+                if self.in_flight < self.max_in_flight:
+                    return
+                self._capacity_waiters.append((loop, capacity_available))
+            await capacity_available.wait()
+
+    def close(self) -> None:
+        """Waits for in-flight messages and closes wrapped sender"""
+        self._executor.shutdown(wait=True)
+        self.sender.close()
+        logger.info("Async sender closed: %s", self.stats)
+
+    def _on_sent(self, future: Future, messages: int = 1) -> None:
+        """Updates counters, wakes up coroutines waiting for capacity.
+        Called from a worker thread.
+        """
+        error = future.exception()
+        unsent = len(future.result() or ()) if error is None else messages
+        in_flight_gauge.dec(messages)
+        with self._lock:
+            self.in_flight -= messages
+            self.messages_sent += messages - unsent
+            self.messages_failed += unsent
+            waiters = self._capacity_waiters
+            self._capacity_waiters = []
+        if error is not None:
+            logger.error("Failed to send message: %s", error)
+        for loop, capacity_available in waiters:
+            loop.call_soon_threadsafe(capacity_available.set)
+
+
+# marks queue keys of messages that are never coalesced
+_UNKEYED = object()
+
+
+def _item_size(item: Union[str, List[str]]) -> int:
+    """Number of messages of an outbound queue item"""
+    return len(item) if isinstance(item, list) else 1
+
+
+def _in_event_loop() -> bool:
+    """`True` if called from a thread running an event loop"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class QueuedMessageSender(MessageSender):
+    """Sends messages of a bounded outbound queue with a pool of threads
+    running a blocking sender, so sending does not block the event loop.
+
+    The queue policy decides what happens when the queue is full:
+    - `block`: callers wait for room. Callers running in the event loop
+      must `await wait_for_capacity()` before sending, so vehicle loops
+      slow down to the rate the transport keeps up with. Sending to a
+      full queue from an event loop thread raises `RuntimeError` instead
+      of blocking the loop.
+    - `drop_oldest`: the oldest queued message is dropped.
+    - `coalesce`: a queued message is replaced by a later message with
+      the same key, so at most the latest message per vehicle is queued,
+      at the position of the replaced one. If the queue is full of other
+      keys, the oldest message is dropped.
+
+    Messages sent with `send_message` have no key and are never
+    coalesced. A burst of `send_messages` is queued as a single item,
+    never coalesced, and sent with a single `send_messages` call of the
+    wrapped sender. Queue depth, in messages, and dropped messages are
+    exposed as metrics.
+    """
+    def __init__(
+            self,
+            sender: MessageSender,
+            max_size: int = OUTBOUND_QUEUE_SIZE,
+            policy: str = OUTBOUND_QUEUE_POLICY,
+            max_workers: int = SQS_MAX_POOL_CONNECTIONS,
+            ):
+        if policy not in OUTBOUND_QUEUE_POLICIES:
+            raise ValueError(f"Unsupported outbound queue policy {policy}, "
+                             f"expected one of {OUTBOUND_QUEUE_POLICIES}")
+        if max_size < 1:
+            raise ValueError(f"Expected positive `max_size`, got {max_size}")
+        self.sender = sender
+        self.max_size: int = max_size
+        self.policy: str = policy
+        self.max_workers: int = max_workers
+        # queue key is the message key when coalescing, else a private
+        # unique key, never equal to a message key
+        self._queue: OrderedDict = OrderedDict()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._capacity_waiters: List[tuple] = []
+        self._closed: bool = False
+
+        # counters
+        self.messages_sent: int = 0
+        self.messages_failed: int = 0
+        self.messages_dropped: int = 0
+        self.messages_coalesced: int = 0
+
+        self._workers = [
+            threading.Thread(target=self._send_queued,
+                             name=f'outbound-queue-{i}', daemon=True)
+            for i in range(max_workers)]
+        for worker in self._workers:
+            worker.start()
+
+    @property
+    def depth(self) -> int:
+        """Number of queued items, a burst is a single item"""
+        return len(self._queue)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Sending counters"""
+        return {
+            'queued': self.depth,
+            'messages_sent': self.messages_sent,
+            'messages_failed': self.messages_failed,
+            'messages_dropped': self.messages_dropped,
+            'messages_coalesced': self.messages_coalesced,
+        }
+
+    def send_message(self, message: str):
+        """Queues message"""
+        self.send_keyed_message(key=None, message=message)
+
+    def send_keyed_message(self, key: Optional[Hashable], message: str):
+        """Queues message, applies the queue policy if the queue is full"""
+        self._enqueue(key=key, item=message)
+
+    def send_messages(self, messages: List[str]) -> List[str]:
+        """Queues a burst as a single item, sent in order with a single
+        `send_messages` call of the wrapped sender, so it is batched.
+        Queued messages are not returned"""
+        if messages:
+            self._enqueue(key=None, item=list(messages))
+        return []
+
+    def _enqueue(self, key: Optional[Hashable],
+                 item: Union[str, List[str]]) -> None:
+        """Queues a message or a burst, applies the queue policy if the
+        queue is full"""
+        with self._lock:
+            if self.policy == 'coalesce' and key in self._queue:
+                self._queue[key] = item
+                self.messages_coalesced += 1
+                queue_dropped_counters['coalesce'].inc()
+                return
+            while len(self._queue) >= self.max_size:
+                if self._closed:
+                    break
+                if self.policy == 'block':
+                    if _in_event_loop():
+                        raise RuntimeError(
+                            "Can't send a message, outbound queue is full "
+                            "and waiting would block the event loop, "
+                            "await `wait_for_capacity()` before sending")
+                    self._not_full.wait()
+                else:
+                    _, dropped = self._queue.popitem(last=False)
+                    self.messages_dropped += _item_size(dropped)
+                    queue_dropped_counters['drop_oldest'].inc(
+                        _item_size(dropped))
+                    queue_depth_gauge.dec(_item_size(dropped))
+            if self._closed:
+                raise RuntimeError("Can't send a message, sender is closed")
+            queue_key = key if self.policy == 'coalesce' and key is not None \
+                else (_UNKEYED, next(self._sequence))
+            self._queue[queue_key] = item
+            self._not_empty.notify()
+        queue_depth_gauge.inc(_item_size(item))
+
+    async def wait_for_capacity(self) -> None:
+        """Waits until the queue has room, with the `block` policy"""
+        while self.policy == 'block' and len(self._queue) >= self.max_size:
+            loop = asyncio.get_running_loop()
+            capacity_available = asyncio.Event()
+            with self._lock:
+                if len(self._queue) < self.max_size:
+                    return
+                self._capacity_waiters.append((loop, capacity_available))
+            await capacity_available.wait()
+
+    def close(self) -> None:
+        """Sends queued messages and closes wrapped sender"""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+        for worker in self._workers:
+            worker.join()
+        self.sender.close()
+        logger.info("Queued sender closed: %s", self.stats)
+
+    def _send_queued(self) -> None:
+        """Worker thread, sends queued messages oldest first until the
+        sender is closed and the queue is empty"""
+        while True:
+            with self._lock:
+                while not self._queue and not self._closed:
+                    self._not_empty.wait()
+                if not self._queue:
+                    return
+                _, item = self._queue.popitem(last=False)
+                self._not_full.notify()
+                waiters = self._capacity_waiters
+                self._capacity_waiters = []
+            size = _item_size(item)
+            queue_depth_gauge.dec(size)
+            for loop, capacity_available in waiters:
+                loop.call_soon_threadsafe(capacity_available.set)
+            try:
+                if isinstance(item, list):
+                    unsent = len(self.sender.send_messages(messages=item))
+                else:
+                    self.sender.send_message(message=item)
+                    unsent = 0
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                unsent = size
+                logger.error("Failed to send message: %s", e)
+            with self._lock:
+                self.messages_sent += size - unsent
+                self.messages_failed += unsent
+
+
+class MessageSenderRegistry:
+    """Process-wide registry of message senders.
+
+    Creating a sender per vehicle means a client with own connection
+    pool and queue url resolution calls per vehicle. The registry
+    creates a sender once per (endpoint, queue, batching, asynchronous)
+    and returns the same instance to every caller, so all vehicles share
+    a single client, connection pool and resolved queue url.
+
+    Asynchronous senders wrap the blocking sender with
+    `AsyncMessageSender`. With a positive `queue_size` the blocking
+    sender is wrapped with `QueuedMessageSender` instead, with a bounded
+    outbound queue and the `queue_policy`.
+
+    A sink other than `sqs` replaces the SQS sender with a local sink,
+    see `sinks.py`, endpoint, queue and batching are ignored then.
+    """
+    def __init__(self) -> None:
+        self._senders: Dict[tuple, MessageSender] = {}
+        self._lock = threading.Lock()
+
+    def get_sender(
+            self,
+            endpoint_url: Optional[str] = None,
+            queue_name: Optional[str] = None,
+            batching: bool = False,
+            asynchronous: bool = False,
+            sink: str = TRACKING_SINK,
+            queue_size: int = OUTBOUND_QUEUE_SIZE,
+            queue_policy: str = OUTBOUND_QUEUE_POLICY,
+            ) -> MessageSender:
+        """Returns a shared sender, creates it on first call"""
+        endpoint_url = endpoint_url or TRACKING_SQS_URL
+        queue_name = queue_name or TRACKING_SQS_QUEUE_NAME
+        key: tuple
+        if sink != 'sqs':
+            key = (sink, asynchronous, queue_size, queue_policy)
+        else:
+            key = (endpoint_url,
+                   queue_name,
+                   batching,
+                   asynchronous,
+                   queue_size,
+                   queue_policy)
+        with self._lock:
+            if key not in self._senders:
+                sender: MessageSender
+                if sink != 'sqs':
+                    sender = create_sink(sink)
+                elif batching:
+                    sender = BatchingMessageSender(endpoint_url=endpoint_url,
+                                                   queue_name=queue_name)
+                else:
+                    sender = SQSMessageSender(endpoint_url=endpoint_url,
+                                              queue_name=queue_name)
+                if queue_size > 0:
+                    sender = QueuedMessageSender(sender=sender,
+                                                 max_size=queue_size,
+                                                 policy=queue_policy)
+                elif asynchronous:
+                    sender = AsyncMessageSender(sender=sender)
+                self._senders[key] = sender
+                logger.info("Created shared %s for %s",
+                            type(sender).__name__,
+                            sink if sink != 'sqs'
+                            else f"queue {queue_name} at {endpoint_url}")
+            return self._senders[key]
+
+    def close_all(self) -> None:
+        """Closes all registered senders"""
+        with self._lock:
+            senders = list(self._senders.values())
+            self._senders.clear()
+        for sender in senders:
+            sender.close()
+
+
+sender_registry = MessageSenderRegistry()
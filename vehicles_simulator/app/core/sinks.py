@@ -0,0 +1,279 @@
+"""
+Implements local message sinks, alternatives to the SQS sender.
+
+Sinks are selected with `TRACKING_SINK`:
+
+- `sqs` - `SQSMessageSender`, default, see `send.py`
+- `null` - discards messages, counts them
+- `ring` - keeps the last `SINK_RING_BUFFER_SIZE` messages in memory
+- `file` - appends messages to `SINK_FILE_PATH`
+- `unix` - streams messages to a Unix domain socket at `SINK_SOCKET_PATH`
+
+File and socket sinks buffer encoded messages and write them in chunks
+of `SINK_BUFFER_BYTES`, or once the oldest buffered message is older
+than `SINK_FLUSH_INTERVAL_SEC`. Age is checked on every message and, for
+an idle sink, by a flusher thread. The file sink also calls `fsync` on
+such periodic flushes and on close.
+
+Messages are framed according to `SINK_FORMAT`:
+
+- `jsonl` - a message per line, as sent.
+- `binary` - a little-endian `uint32` length followed by the payload.
+  Schema 2.0.0 messages are stored as raw records, without base64,
+  other messages as UTF-8.
+
+Use `read_messages` to read framed messages back.
+"""
+from abc import abstractmethod
+import base64
+import binascii
+import os
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from typing import BinaryIO, Iterator, List, Optional
+from decouple import config
+from app.core.interfaces import MessageSender
+from app.utils.logger import get_logger
+
+TRACKING_SINK = config('TRACKING_SINK', default='sqs')
+SINK_FORMAT = config('SINK_FORMAT', default='jsonl')
+SINK_RING_BUFFER_SIZE = config('SINK_RING_BUFFER_SIZE', cast=int,
+                               default=100_000)
+SINK_FILE_PATH = config('SINK_FILE_PATH', default='tracking.jsonl')
+SINK_SOCKET_PATH = config('SINK_SOCKET_PATH', default='/tmp/tracking.sock')
+SINK_BUFFER_BYTES = config('SINK_BUFFER_BYTES', cast=int, default=1 << 20)
+SINK_FLUSH_INTERVAL_SEC = config('SINK_FLUSH_INTERVAL_SEC', cast=float,
+                                 default=1.0)
+
+SINK_FORMATS = ('jsonl', 'binary')
+# shortest wait between expired buffer checks of the flusher thread
+SINK_FLUSHER_MIN_INTERVAL_SEC = 0.01
+LENGTH_PREFIX = struct.Struct('<I')
+
+logger = get_logger(__name__)
+
+
+class NullSink(MessageSender):
+    """Discards messages, counts them"""
+    def __init__(self) -> None:
+        self.messages_sent: int = 0
+
+    def send_message(self, message: str):
+        self.messages_sent += 1
+
+
+class RingBufferSink(MessageSender):
+    """Keeps the last `size` messages in memory, older are overwritten"""
+    def __init__(self, size: int = SINK_RING_BUFFER_SIZE) -> None:
+        self._messages: deque = deque(maxlen=size)
+        self.messages_sent: int = 0
+
+    @property
+    def messages(self) -> List[str]:
+        """Kept messages, oldest first"""
+        return list(self._messages)
+
+    @property
+    def messages_dropped(self) -> int:
+        return self.messages_sent - len(self._messages)
+
+    def send_message(self, message: str):
+        self._messages.append(message)
+        self.messages_sent += 1
+
+
+def encode_message(message: str, sink_format: str = SINK_FORMAT) -> bytes:
+    """Frames a message to be written by a sink"""
+    if sink_format == 'jsonl':
+        return message.encode() + b'\n'
+    payload = message.encode()
+    if not message.startswith('{'):
+        try:  # schema 2.0.0, base64 encoded binary record
+            payload = base64.b64decode(payload, validate=True)
+        except binascii.Error:
+            pass
+    return LENGTH_PREFIX.pack(len(payload)) + payload
+
+
+def read_messages(stream: BinaryIO, sink_format: str = SINK_FORMAT
+                  ) -> Iterator[str]:
+    """Reads messages framed by `encode_message`, as they were sent"""
+    if sink_format == 'jsonl':
+        for line in stream:
+            yield line.rstrip(b'\n').decode()
+        return
+    while header := stream.read(LENGTH_PREFIX.size):
+        (length,) = LENGTH_PREFIX.unpack(header)
+        payload = stream.read(length)
+        if payload.startswith(b'{'):
+            yield payload.decode()
+        else:
+            yield base64.b64encode(payload).decode('ascii')
+
+
+class BufferedSink(MessageSender):
+    """Buffers framed messages and writes them in large chunks.
+
+    Subclasses implement `_write` and may implement `_sync`, called on
+    periodic flushes and on close. A flusher thread, started on the
+    first message, writes the buffer of an idle sink once it is older
+    than `flush_interval`.
+    """
+    def __init__(
+            self,
+            sink_format: str = SINK_FORMAT,
+            buffer_bytes: int = SINK_BUFFER_BYTES,
+            flush_interval: float = SINK_FLUSH_INTERVAL_SEC,
+            ) -> None:
+        if sink_format not in SINK_FORMATS:
+            raise ValueError(f"Unsupported sink format {sink_format}, "
+                             f"expected one of {SINK_FORMATS}")
+        self.sink_format = sink_format
+        self.buffer_bytes = buffer_bytes
+        self.flush_interval = flush_interval
+        self._buffer = bytearray()
+        self._oldest_message_time: float = 0.0
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+
+        # counters
+        self.messages_sent: int = 0
+        self.bytes_written: int = 0
+        self.writes: int = 0
+        self.syncs: int = 0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'messages_sent': self.messages_sent,
+            'bytes_written': self.bytes_written,
+            'writes': self.writes,
+            'syncs': self.syncs,
+        }
+
+    def send_message(self, message: str):
+        """Buffers message, writes the buffer if full or too old"""
+        data = encode_message(message, self.sink_format)
+        with self._lock:
+            self._start_flusher()
+            if not self._buffer:
+                self._oldest_message_time = time.monotonic()
+            self._buffer += data
+            self.messages_sent += 1
+            if len(self._buffer) >= self.buffer_bytes:
+                self._flush_buffer(sync=False)
+            elif self._buffer_expired():
+                self._flush_buffer(sync=True)
+
+    def flush_if_expired(self) -> None:
+        """Writes buffered messages if the oldest one is too old"""
+        with self._lock:
+            if self._buffer_expired():
+                self._flush_buffer(sync=True)
+
+    def flush(self) -> None:
+        """Writes buffered messages"""
+        with self._lock:
+            self._flush_buffer(sync=True)
+
+    def close(self) -> None:
+        """Writes buffered messages and releases the destination"""
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        self._close()
+        logger.info("%s closed: %s", type(self).__name__, self.stats)
+
+    def _start_flusher(self) -> None:
+        """Starts the flusher thread, expects the lock to be held"""
+        if self._flusher is None and not self._closed.is_set():
+            self._flusher = threading.Thread(target=self._run_flusher,
+                                             name='sink-flusher',
+                                             daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self) -> None:
+        """Flusher thread, writes expired buffers until closed"""
+        interval = max(self.flush_interval, SINK_FLUSHER_MIN_INTERVAL_SEC)
+        while not self._closed.wait(interval):
+            self.flush_if_expired()
+
+    def _buffer_expired(self) -> bool:
+        """Checks if the oldest buffered message exceeds the flush
+        interval, expects the lock to be held"""
+        return bool(self._buffer) and time.monotonic() \
+            - self._oldest_message_time >= self.flush_interval
+
+    def _flush_buffer(self, sync: bool) -> None:
+        """Expects the lock to be held by the caller"""
+        if self._buffer:
+            self._write(bytes(self._buffer))
+            self.bytes_written += len(self._buffer)
+            self.writes += 1
+            self._buffer.clear()
+        if sync:
+            self._sync()
+            self.syncs += 1
+
+    @abstractmethod
+    def _write(self, data: bytes) -> None:
+        pass
+
+    def _sync(self) -> None:
+        pass
+
+    def _close(self) -> None:
+        pass
+
+
+class FileSink(BufferedSink):
+    """Appends framed messages to a file"""
+    def __init__(self, path: str = SINK_FILE_PATH, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.path = path
+        self._file = open(path, 'ab', buffering=0)  # pylint: disable=R1732
+
+    def _write(self, data: bytes) -> None:
+        self._file.write(data)
+
+    def _sync(self) -> None:
+        os.fsync(self._file.fileno())
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class UnixSocketSink(BufferedSink):
+    """Streams framed messages to a Unix domain socket"""
+    def __init__(self, path: str = SINK_SOCKET_PATH, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.path = path
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(path)
+
+    def _write(self, data: bytes) -> None:
+        self._socket.sendall(data)
+
+    def _close(self) -> None:
+        self._socket.close()
+
+
+SINKS = {
+    'null': NullSink,
+    'ring': RingBufferSink,
+    'file': FileSink,
+    'unix': UnixSocketSink,
+}
+
+
+def create_sink(sink: str) -> MessageSender:
+    """Creates a local sink by name"""
+    if sink not in SINKS:
+        raise ValueError(f"Unsupported sink {sink}, expected one of "
+                         f"{['sqs', *SINKS]}")
+    return SINKS[sink]()
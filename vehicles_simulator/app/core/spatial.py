@@ -0,0 +1,174 @@
+"""
+Implements the SpatialGridIndex class.
+
+The index answers "which vehicles are near a point" and "which vehicles
+are inside a rectangle" without scanning the whole fleet. Navigation map
+cells are grouped into square buckets of `cell_size` x `cell_size`
+cells, every bucket keeps the set of vehicles located in it.
+
+The index is updated incrementally by `BasicLocationService`: a vehicle
+is moved between buckets only when its bucket changes, otherwise only
+its stored location is updated.
+
+Queries visit only buckets that can contain a result:
+
+- `range_query` - buckets overlapping the rectangle;
+- `nearest` - rings of buckets around the point, until no unvisited
+  bucket can hold a vehicle closer than the k-th found one.
+
+When there are fewer occupied buckets than buckets to visit, occupied
+buckets are scanned instead, so a sparse fleet on a large map is cheap
+to query too.
+"""
+import heapq
+import math
+from typing import Dict, Hashable, Iterator, List, Set, Tuple
+from decouple import config
+
+SPATIAL_INDEX_CELL_SIZE = config('SPATIAL_INDEX_CELL_SIZE', cast=int,
+                                 default=5)
+
+Cell = Tuple[int, int]
+
+
+class SpatialGridIndex:
+    """Uniform grid index of vehicle locations, keyed by vehicle"""
+    def __init__(self, cell_size: int = SPATIAL_INDEX_CELL_SIZE) -> None:
+        if cell_size < 1:
+            raise ValueError(f"Expected positive `cell_size`, got "
+                             f"{cell_size}")
+        self.cell_size = cell_size
+        self._buckets: Dict[Cell, Set[Hashable]] = {}
+        self._cells: Dict[Hashable, Cell] = {}
+        self._locations: Dict[Hashable, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._locations
+
+    def location(self, key: Hashable) -> Tuple[int, int]:
+        """Indexed location of a vehicle"""
+        return self._locations[key]
+
+    def _cell(self, x: int, y: int) -> Cell:
+        return (x // self.cell_size, y // self.cell_size)
+
+    def insert(self, key: Hashable, x: int, y: int) -> None:
+        """Adds a vehicle, or moves it if already indexed"""
+        if key in self._locations:
+            self.move(key, x, y)
+            return
+        cell = self._cell(x, y)
+        self._buckets.setdefault(cell, set()).add(key)
+        self._cells[key] = cell
+        self._locations[key] = (x, y)
+
+    def move(self, key: Hashable, x: int, y: int) -> None:
+        """Updates location of an indexed vehicle"""
+        cell = (x // self.cell_size, y // self.cell_size)
+        previous_cell = self._cells[key]
+        if cell != previous_cell:
+            bucket = self._buckets[previous_cell]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[previous_cell]
+            self._buckets.setdefault(cell, set()).add(key)
+            self._cells[key] = cell
+        self._locations[key] = (x, y)
+
+    def remove(self, key: Hashable) -> None:
+        """Removes a vehicle from the index"""
+        cell = self._cells.pop(key)
+        del self._locations[key]
+        bucket = self._buckets[cell]
+        bucket.discard(key)
+        if not bucket:
+            del self._buckets[cell]
+
+    def range_query(self, x_min: int, y_min: int, x_max: int, y_max: int
+                    ) -> List[Hashable]:
+        """Vehicles located inside the rectangle, bounds included"""
+        (cx_min, cy_min), (cx_max, cy_max) = \
+            self._cell(x_min, y_min), self._cell(x_max, y_max)
+        qty_cells = (cx_max - cx_min + 1) * (cy_max - cy_min + 1)
+        if qty_cells > len(self._buckets):
+            cells = [cell for cell in self._buckets
+                     if cx_min <= cell[0] <= cx_max
+                     and cy_min <= cell[1] <= cy_max]
+        else:
+            cells = [(cx, cy) for cx in range(cx_min, cx_max + 1)
+                     for cy in range(cy_min, cy_max + 1)]
+
+        found = []
+        locations = self._locations
+        for cell in cells:
+            for key in self._buckets.get(cell, ()):
+                x, y = locations[key]
+                if x_min <= x <= x_max and y_min <= y <= y_max:
+                    found.append(key)
+        return found
+
+    def nearest(self, x: int, y: int, k: int = 1
+                ) -> List[Tuple[float, Hashable]]:
+        """Up to `k` nearest vehicles with their euclidean distances,
+        nearest first"""
+        if k < 1 or not self._locations:
+            return []
+        cx, cy = self._cell(x, y)
+        best: List[Tuple[float, int, Hashable]] = []  # max-heap by distance
+        locations = self._locations
+        visited = 0
+        ring = 0
+        while True:
+            for cell in self._ring_cells(cx, cy, ring):
+                bucket = self._buckets.get(cell)
+                if not bucket:
+                    continue
+                visited += len(bucket)
+                for key in bucket:
+                    key_x, key_y = locations[key]
+                    distance = math.hypot(key_x - x, key_y - y)
+                    entry = (-distance, id(key), key)
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, entry)
+            if visited == len(locations):
+                break
+            if len(best) == k \
+                    and -best[0][0] <= self._ring_clearance(x, y, ring):
+                break
+            ring += 1
+        return [(-distance, key)
+                for distance, _, key in sorted(best, reverse=True)]
+
+    def _ring_cells(self, cx: int, cy: int, ring: int) -> Iterator[Cell]:
+        """Buckets at Chebyshev distance `ring` from the bucket"""
+        if ring == 0:
+            yield (cx, cy)
+            return
+        if 8 * ring > len(self._buckets):
+            for cell in list(self._buckets):
+                if max(abs(cell[0] - cx), abs(cell[1] - cy)) == ring:
+                    yield cell
+            return
+        for i in range(-ring, ring + 1):
+            yield (cx + i, cy - ring)
+            yield (cx + i, cy + ring)
+        for i in range(-ring + 1, ring):
+            yield (cx - ring, cy + i)
+            yield (cx + ring, cy + i)
+
+    def _ring_clearance(self, x: int, y: int, ring: int) -> float:
+        """Lower bound of the distance from the point to any location in
+        buckets beyond the ring"""
+        cx, cy = self._cell(x, y)
+        size = self.cell_size
+        return min(
+            x - ((cx - ring) * size - 1),
+            (cx + ring + 1) * size - x,
+            y - ((cy - ring) * size - 1),
+            (cy + ring + 1) * size - y,
+        )
@@ -1,9 +1,10 @@
-"""Contains implementation of the BasicTaskManager class"""
+"""Contains implementation of the BasicTaskManager and
+DispatchedTasksManager classes"""
 import random
-from random import randrange
-from typing import Union
+from typing import Hashable, Optional, Union
 from decouple import config
 
+from app.core.dispatcher import TaskDispatcher
 from app.core.interfaces import TasksManager
 from app.utils import schemas
 from app.utils.logger import get_logger
@@ -13,9 +14,6 @@ logger = get_logger(__name__)
 
 NAVIGATION_MAP_X_SIZE = config('NAVIGATION_MAP_X_SIZE')
 NAVIGATION_MAP_Y_SIZE = config('NAVIGATION_MAP_Y_SIZE')
-RANDOM_SEED = config('RANDOM_SEED', cast=int)
-
-random.seed(RANDOM_SEED)
 
 
 class BasicTasksManager(TasksManager):
@@ -23,12 +21,19 @@ class BasicTasksManager(TasksManager):
 
     Simulates retrieval from external source.
     """
-
-    def __init__(self, fail_get_task_probability: float = 0.95) -> None:
+    __slots__ = ('_task_state', 'current_task', 'fail_get_task_probability',
+                 'rng')
+
+    def __init__(
+            self,
+            fail_get_task_probability: float = 0.95,
+            rng: Optional[random.Random] = None,
+            ) -> None:
         self.task_state: schemas.TaskState = schemas.TaskState.IDLE
         self.current_task: Union[schemas.Location, None] = None
         # to simulate no pendding tasks received
         self.fail_get_task_probability: float = fail_get_task_probability
+        self.rng: random.Random = rng or random.Random()
 
     @property
     def task_state(self) -> schemas.TaskState:
@@ -38,7 +43,7 @@ class BasicTasksManager(TasksManager):
     def task_state(self, state: schemas.TaskState):
         self._task_state = state
 
-    def get_new_task(self) -> Union[schemas.MapSize, None]:
+    def get_new_task(self) -> Union[schemas.Location, None]:
         """Mimic recieving a task from outer source"""
 
         task_nav_map = schemas.MapSize(
@@ -62,12 +67,30 @@ class BasicTasksManager(TasksManager):
 
     def _generate_random_location(self, task_nav_map) -> schemas.Location:
         """Simulates receiving a new task"""
-        x = randrange(start=0, stop=task_nav_map.x_size)
-        y = randrange(start=0, stop=task_nav_map.y_size)
+        x = self.rng.randrange(start=0, stop=task_nav_map.x_size)
+        y = self.rng.randrange(start=0, stop=task_nav_map.y_size)
 
         return schemas.Location(x=x, y=y)
 
     def _fail_to_get_task(self) -> bool:
         """Defines if a task is received based on predefine probability.
         """
-        return random.random() < self.fail_get_task_probability
+        return self.rng.random() < self.fail_get_task_probability
+
+
+class DispatchedTasksManager(BasicTasksManager):
+    """Gets tasks assigned by the fleet `TaskDispatcher`"""
+    __slots__ = ('dispatcher', 'vehicle_key')
+
+    def __init__(
+            self,
+            dispatcher: TaskDispatcher,
+            vehicle_key: Hashable,
+            ) -> None:
+        super().__init__(fail_get_task_probability=0.0)
+        self.dispatcher = dispatcher
+        self.vehicle_key = vehicle_key
+
+    def get_new_task(self) -> Union[schemas.Location, None]:
+        """Task assigned by the dispatcher, if any"""
+        return self.dispatcher.request_task(self.vehicle_key)
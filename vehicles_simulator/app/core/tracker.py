@@ -1,16 +1,108 @@
-"""Contains implementation of BasicTrackerManager class."""
-from datetime import datetime, timezone
-from typing import Optional
+"""
+Contains implementation of BasicTrackerManager class.
+
+Tracking data is collected once per execution step, by `update`, and
+serialized to the wire message in a single pass, without pydantic
+validation: all values come from vehicle state that is valid by
+construction. Set `TRACKING_VALIDATE_MESSAGES` to validate tracking data
+and every message against its schema, for debugging.
+
+With `TRACKING_REPORTING=dead_reckoning` a message is sent only when the
+vehicle state diverges from its last sent message, see
+`common/telemetry/dead_reckoning.py`, instead of on every step.
+
+While the tracker is OFFLINE messages are kept in its `OfflineBuffer`,
+see `offline.py`, and replayed as a burst, with their original
+`created_time`, before the first message sent after reconnecting.
+"""
+import base64
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+import math
+from typing import Any, Dict, Optional, Tuple
 import random
 from uuid import uuid4, UUID
+from decouple import config
 from app.core.interfaces import (
     TrackerManager,
     TasksManager,
     NavigationManager,
     MessageSender,
     )
+from app.core.offline import OfflineBuffer
 from app.utils import schemas
-from common.schemas.sqs_messages import VehicleTrackingMessageV1_0_0
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+from common.telemetry.dead_reckoning import predict_location
+from common.schemas.sqs_messages import (
+    VehicleTrackingMessageV1_0_0,
+    VehicleTrackingMessageV2_0_0,
+    dump_tracking_message_json,
+    encode_v2,
+)
+
+# `1.0.0` - JSON, `2.0.0` - compact binary
+TRACKING_SCHEMA_VERSION = config('TRACKING_SCHEMA_VERSION', default='1.0.0')
+TRACKING_MESSAGE_SCHEMAS = {
+    '1.0.0': VehicleTrackingMessageV1_0_0,
+    '2.0.0': VehicleTrackingMessageV2_0_0,
+}
+TRACKING_VALIDATE_MESSAGES = config('TRACKING_VALIDATE_MESSAGES', cast=bool,
+                                    default=False)
+# `every_step` or `dead_reckoning`
+TRACKING_REPORTING = config('TRACKING_REPORTING', default='every_step')
+TRACKING_REPORTINGS = ('every_step', 'dead_reckoning')
+TRACKING_SPEED_THRESHOLD = config('TRACKING_SPEED_THRESHOLD', cast=int,
+                                  default=2)
+TRACKING_POSITION_THRESHOLD = config('TRACKING_POSITION_THRESHOLD',
+                                     cast=float, default=3.0)
+TRACKING_HEARTBEAT_SEC = config('TRACKING_HEARTBEAT_SEC', cast=float,
+                                default=30.0)
+
+logger = get_logger(__name__)
+stage_timers = {
+    stage: metrics.histogram('vehicle_stage_seconds',
+                             "Duration of vehicle execution step stages",
+                             stage=stage)
+    for stage in ('serialization', 'send')
+}
+REPORT_REASONS = ('first', 'task_state', 'heading', 'speed', 'position',
+                  'heartbeat')
+report_counters = {
+    reason: metrics.counter('tracking_reports_total',
+                            "Tracking messages sent with dead reckoning "
+                            "reporting, by reason", reason=reason)
+    for reason in REPORT_REASONS
+}
+suppressed_reports_counter = metrics.counter(
+    'tracking_reports_suppressed_total',
+    "Tracking messages not sent with dead reckoning reporting")
+offline_messages_counter = metrics.counter(
+    'offline_messages_total', "Tracking messages generated while offline")
+lost_messages_counter = metrics.counter(
+    'offline_messages_lost_total',
+    "Tracking messages generated while offline without a buffer")
+replayed_messages_counter = metrics.counter(
+    'offline_messages_replayed_total',
+    "Buffered tracking messages replayed after reconnecting")
+replay_timer = metrics.histogram('offline_replay_seconds',
+                                 "Duration of buffered messages replays")
+
+
+@lru_cache(maxsize=None)
+def get_heartbeat(heartbeat_sec: float) -> timedelta:
+    """Heartbeat interval shared by trackers with the same setting"""
+    return timedelta(seconds=heartbeat_sec)
+
+
+@lru_cache(maxsize=None)
+def get_statuses_population(
+        statuses_probs: Tuple[Tuple[schemas.TrackerStatus, float], ...]
+        ) -> Tuple[Tuple[schemas.TrackerStatus, ...], Tuple[float, ...]]:
+    """Statuses and their weights, shared by trackers with the same
+    statuses probabilities"""
+    return (tuple(status for status, _ in statuses_probs),
+            tuple(probability for _, probability in statuses_probs))
 
 
 class BasicTrackerManager(TrackerManager):
@@ -21,24 +113,68 @@ class BasicTrackerManager(TrackerManager):
     Kepps track of telemetry values.
     Simulates connection loss.
     Sends telemetry to endpoint.
+    Buffers telemetry while offline, in `offline_buffer` if passed,
+    replays it once online. Without a buffer it is lost.
+
+    With the `dead_reckoning` reporting, telemetry is sent only if task
+    state or heading direction changed, speed changed by more than
+    `speed_threshold`, location is off the location predicted from the
+    last sent telemetry by more than `position_threshold`, or nothing
+    was sent for `heartbeat_sec`.
     """
+    __slots__ = ('statuses_probs', 'current_status', 'vehicle_id', 'rng',
+                 'schema_version', 'validate_messages', 'reporting',
+                 'speed_threshold', 'position_threshold', 'heartbeat',
+                 '_last_report', '_steps_since_report', 'offline_buffer',
+                 'statuses_values', 'statuses_weights', '_tracking_data',
+                 '_tracking_fields', 'tasks_manager', 'navigation_manager',
+                 'message_sender')
+
     def __init__(
             self,
-            statuses_probs: dict[schemas.TrackerStatus: float],
+            statuses_probs: Dict[schemas.TrackerStatus, float],
             tasks_manager: TasksManager,
             navigation_manager: NavigationManager,
             message_sender: MessageSender,
             vehicle_id: Optional[UUID] = None,
             current_status: schemas.TrackerStatus =
                 schemas.TrackerStatus.ONLINE,
+            rng: Optional[random.Random] = None,
+            schema_version: str = TRACKING_SCHEMA_VERSION,
+            validate_messages: bool = TRACKING_VALIDATE_MESSAGES,
+            reporting: str = TRACKING_REPORTING,
+            speed_threshold: int = TRACKING_SPEED_THRESHOLD,
+            position_threshold: float = TRACKING_POSITION_THRESHOLD,
+            heartbeat_sec: float = TRACKING_HEARTBEAT_SEC,
+            offline_buffer: Optional[OfflineBuffer] = None,
             ) -> None:
+        if schema_version not in TRACKING_MESSAGE_SCHEMAS:
+            raise ValueError(f"Unsupported tracking schema version "
+                             f"{schema_version}, expected one of "
+                             f"{list(TRACKING_MESSAGE_SCHEMAS)}")
+        if reporting not in TRACKING_REPORTINGS:
+            raise ValueError(f"Unsupported tracking reporting {reporting}, "
+                             f"expected one of {TRACKING_REPORTINGS}")
         self.statuses_probs = statuses_probs
         self.current_status = current_status
         self.vehicle_id = vehicle_id or uuid4()  # assign if not passed
+        self.rng: random.Random = rng or random.Random()
+        self.schema_version = schema_version
+        self.validate_messages = validate_messages
+        self.reporting = reporting
+        self.speed_threshold = speed_threshold
+        self.position_threshold = position_threshold
+        self.heartbeat = get_heartbeat(heartbeat_sec)
+        # tracking fields of the last sent message
+        self._last_report: Optional[dict] = None
+        self._steps_since_report: int = 0
+        self.offline_buffer = offline_buffer
 
-        self.statuses_values = list(statuses_probs.keys())
-        self.statuses_weights = statuses_probs.values()
-        self.tracking_data = None  # placeholder
+        self.statuses_values, self.statuses_weights = \
+            get_statuses_population(tuple(statuses_probs.items()))
+        # collected tracking data, model is built from fields on demand
+        self._tracking_data: Optional[schemas.TrackingData] = None
+        self._tracking_fields: Optional[Dict[str, Any]] = None
 
         # dependencies
         self.tasks_manager = tasks_manager
@@ -46,20 +182,25 @@ class BasicTrackerManager(TrackerManager):
         self.message_sender = message_sender
 
     @property
-    def tracking_data(self):
+    def tracking_data(self) -> Optional[schemas.TrackingData]:
+        """Collected tracking data, model is built on first access"""
+        if self._tracking_data is None and self._tracking_fields is not None:
+            self._tracking_data = schemas.TrackingData.model_construct(
+                **self._tracking_fields)
         return self._tracking_data
 
     @tracking_data.setter
-    def tracking_data(self, value):
+    def tracking_data(self, value: Optional[schemas.TrackingData]):
         self._tracking_data = value
+        self._tracking_fields = dict(value) if value is not None else None
 
     def _generate_status(self) -> schemas.TrackerStatus:
         """Simulate ocassional loss of connection with tracker"""
-        generated_status = random.choices(
+        generated_status = self.rng.choices(
             population=self.statuses_values,
             weights=self.statuses_weights,
             k=1
-        )
+        )[0]
 
         return generated_status
 
@@ -75,16 +216,34 @@ class BasicTrackerManager(TrackerManager):
 
     def collect_tracking_data(self) -> None:
         """Main function to collect all traking metrics"""
-        self.tracking_data = schemas.TrackingData(
-            task_state=self._get_task_state(),
-            vehicle_location=self._get_vehicle_location(),
-            destination=self._get_destination(),
-            vehicle_speed=self._get_vehicle_speed(),
-            heading_direction=self._get_heading_direction(),
-            distance_to_destination=self._get_distance_to_destination(),
-            out_of_zone_status=self._get_out_of_zone_status(),
-            created_time=self._get_current_time(),
-        )
+        self._collect_tracking_fields()
+
+    def _collect_tracking_fields(self) -> Dict[str, Any]:
+        """Helper method to collect tracking metrics, returns their
+        fields"""
+        fields: Dict[str, Any] = {
+            'task_state': self._get_task_state(),
+            'vehicle_location': self._get_vehicle_location(),
+            'destination': self._get_destination(),
+            'vehicle_speed': self._get_vehicle_speed(),
+            'heading_direction': self._get_heading_direction(),
+            'distance_to_destination': self._get_distance_to_destination(),
+            'out_of_zone_status': self._get_out_of_zone_status(),
+            'created_time': self._get_current_time(),
+        }
+        if self.validate_messages:
+            self.tracking_data = schemas.TrackingData(**fields)
+        else:
+            self._tracking_data = None
+            self._tracking_fields = fields
+        return fields
+
+    def _get_tracking_fields(self) -> Dict[str, Any]:
+        """Helper method to get fields of collected tracking data,
+        collects them if none are collected yet"""
+        if self._tracking_fields is None:
+            return self._collect_tracking_fields()
+        return self._tracking_fields
 
     def _get_task_state(self) -> str:
         """Helper method to get task manager state"""
@@ -115,29 +274,143 @@ class BasicTrackerManager(TrackerManager):
         return self.navigation_manager.out_of_zone_status
 
     def _get_current_time(self) -> datetime:
-        """Helper method to get current time"""
-        return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        """Helper method to get current time, milliseconds precision"""
+        current_time = datetime.now(timezone.utc)
+        return current_time.replace(
+            microsecond=current_time.microsecond // 1000 * 1000)
 
     def send_tracking_data(self) -> None:
         """High level method that orchestrate sending telemetry to the
-        endpoint.
+        endpoint. Sends tracking data collected by the last `update`.
+        With the `dead_reckoning` reporting, sends it only if a report
+        is due. Buffers it while offline, replays buffered messages
+        first once online.
         """
-        tracking_message = self._generate_tracking_message()
-        self._send_message(message=tracking_message)
+        if self.reporting == 'dead_reckoning':
+            reason = self._get_report_reason()
+            if reason is None:
+                suppressed_reports_counter.inc()
+                return
+            report_counters[reason].inc()
+        with stage_timers['serialization'].time():
+            tracking_message = self._generate_tracking_message()
+        if self.current_status == schemas.TrackerStatus.OFFLINE:
+            self._buffer_message(message=tracking_message)
+            return
+        if self.offline_buffer is not None and len(self.offline_buffer) \
+                and not self._replay_buffered_messages(self.offline_buffer):
+            # keeps the order of messages behind the unsent backlog
+            self.offline_buffer.append(tracking_message)
+            return
+        with stage_timers['send'].time():
+            self._send_message(message=tracking_message)
+
+    def _buffer_message(self, message: str) -> None:
+        """Helper method to keep message until reconnected"""
+        offline_messages_counter.inc()
+        if self.offline_buffer is None:
+            lost_messages_counter.inc()
+            return
+        self.offline_buffer.append(message)
+
+    def _replay_buffered_messages(self, offline_buffer: OfflineBuffer
+                                  ) -> bool:
+        """Helper method to send buffered messages as a burst. Messages
+        are removed from the buffer once sent, unsent ones stay buffered.
+        Returns `True` if the whole backlog was sent"""
+        messages = offline_buffer.peek()
+        with replay_timer.time():
+            try:
+                unsent = self.message_sender.send_messages(messages=messages)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.error("Failed to replay %s buffered messages, kept "
+                             "buffered: %s", len(messages), e)
+                return False
+        offline_buffer.clear()
+        for message in unsent:
+            offline_buffer.append(message)
+        replayed_messages_counter.inc(len(messages) - len(unsent))
+        return not unsent
 
-    def _generate_tracking_message(self) -> None:
+    def _get_report_reason(self) -> Optional[str]:
+        """Why collected tracking data is to be reported, `None` if it is
+        close enough to the last report. Tracking data is recorded as the
+        last report if it is to be reported."""
+        data = self._get_tracking_fields()
+        last = self._last_report
+        self._steps_since_report += 1
+        if last is None:
+            reason = 'first'
+        elif data['task_state'] != last['task_state']:
+            reason = 'task_state'
+        elif data['heading_direction'] != last['heading_direction']:
+            reason = 'heading'
+        elif abs(data['vehicle_speed'] - last['vehicle_speed']) \
+                > self.speed_threshold:
+            reason = 'speed'
+        elif self._get_prediction_error(data, last) \
+                > self.position_threshold:
+            reason = 'position'
+        elif data['created_time'] - last['created_time'] >= self.heartbeat:
+            reason = 'heartbeat'
+        else:
+            return None
+        self._last_report = data
+        self._steps_since_report = 0
+        return reason
+
+    def _get_prediction_error(self, data: dict, last: dict) -> float:
+        """Distance between the location and the location predicted from
+        the last report"""
+        last_location = last['vehicle_location']
+        predicted_x, predicted_y = predict_location(
+            {'x': last_location.x, 'y': last_location.y},
+            last['heading_direction'], last['vehicle_speed'],
+            self._steps_since_report)
+        location = data['vehicle_location']
+        return math.hypot(location.x - predicted_x, location.y - predicted_y)
+
+    def _generate_tracking_message(self) -> str:
         """Helper method to prepare message to be sent to the endpoint.
-        Validates message to match schema."""
-        self.collect_tracking_data()
-        message_data = VehicleTrackingMessageV1_0_0(
-            **self.tracking_data.model_dump(),
-            schema_version="1.0.0",
+        Validates message to match schema in debug mode only."""
+        data = self._get_tracking_fields()
+        if self.validate_messages:
+            return self._generate_validated_tracking_message()
+
+        location = data['vehicle_location']
+        destination = data['destination']
+        fields = {
+            'schema_version': self.schema_version,
+            'vehicle_id': self.vehicle_id,
+            'task_state': data['task_state'],
+            'vehicle_location': {'x': location.x, 'y': location.y},
+            'destination': {'x': destination.x, 'y': destination.y},
+            'vehicle_speed': data['vehicle_speed'],
+            'distance_to_destination': data['distance_to_destination'],
+            'heading_direction': data['heading_direction'],
+            'out_of_zone_status': data['out_of_zone_status'],
+            'created_time': data['created_time'],
+        }
+        if self.schema_version == '2.0.0':
+            return base64.b64encode(encode_v2(fields)).decode('ascii')
+        return dump_tracking_message_json(fields)
+
+    def _generate_validated_tracking_message(self) -> str:
+        """Helper method to prepare message, validated against schema"""
+        tracking_data = schemas.TrackingData.model_construct(
+            **self._get_tracking_fields())
+        schema = TRACKING_MESSAGE_SCHEMAS[self.schema_version]
+        message_data = schema(
+            **tracking_data.model_dump(),
+            schema_version=self.schema_version,
             vehicle_id=self.vehicle_id
         )
 
-        message_json = message_data.model_dump_json()
-        return message_json
+        if self.schema_version == '2.0.0':
+            return message_data.to_wire()
+        return message_data.model_dump_json()
 
     def _send_message(self, message):
         """Helpor method that performs method sending"""
-        self.message_sender.send_message(message=message)
+        self.message_sender.send_keyed_message(key=self.vehicle_id,
+                                               message=message)
@@ -2,8 +2,6 @@
 Module responsible for instantination of a vehicle and orchestration
 of submodules
 """
-import random
-from decouple import config
 from app.core.interfaces import (
     TrackerManager,
     TasksManager,
@@ -11,17 +9,26 @@ from app.core.interfaces import (
     )
 from app.utils import schemas
 from app.utils.logger import get_logger
+from app.utils.metrics import metrics
 
 
-RANDOM_SEED = int(config('RANDOM_SEED'))
-random.seed(RANDOM_SEED)
 logger = get_logger(__name__)
+step_counter = metrics.counter('vehicle_steps_total',
+                               "Vehicle execution steps")
+stage_timers = {
+    stage: metrics.histogram('vehicle_stage_seconds',
+                             "Duration of vehicle execution step stages",
+                             stage=stage)
+    for stage in ('task', 'navigation', 'tracking')
+}
 
 
 class Vehicle:
     """Vehicle instance class. Implements vehicle high level logic, defined
     in `run_execution_step` method.
     """
+    __slots__ = ('navigation_manager', 'tasks_manager', 'tracker_manager')
+
     def __init__(
             self,
             navigation_manager: NavigationManager,
@@ -33,6 +40,10 @@ class Vehicle:
         self.tasks_manager = tasks_manager
         self.tracker_manager = tracker_manager
 
+    @property
+    def vehicle_id(self):
+        return self.tracker_manager.vehicle_id
+
     def get_current_location(self):
         """Method to get vehicle current location"""
         return self.navigation_manager.current_location
@@ -47,39 +58,47 @@ class Vehicle:
 
     def run_execution_step(self):
         """Main vehicle execution logic"""
+        step_counter.inc()
 
         # if task_state is idle, try to get a new task
         if self.tasks_manager.task_state == schemas.TaskState.IDLE:
-            logger.debug("In %s mode. Trying to get new task",
-                         schemas.TaskState.IDLE.value)
-            new_task = self.tasks_manager.get_new_task()
-            if new_task is None:
-                logger.debug("Failed to get new task")
-            else:
-                logger.debug("Succesfully received a new task %s", new_task)
-                self.tasks_manager.initialize_new_task(new_task)
-                self.navigation_manager.initialize_new_task(
-                    destination=new_task)
-                logger.debug("Succesfully set a new task: %s",
-                             self.navigation_manager.destination)
+            with stage_timers['task'].time():
+                self._get_new_task()
             return
 
-        # if task in progress then make move
-        if self.tasks_manager.task_state == schemas.TaskState.IN_PROGRESS:
-            logger.debug("Initializing movement")
-            self.navigation_manager.move_to_destination()
+        with stage_timers['navigation'].time():
+            # if task in progress then make move
+            if self.tasks_manager.task_state == \
+                    schemas.TaskState.IN_PROGRESS:
+                logger.debug("Initializing movement")
+                self.navigation_manager.move_to_destination()
 
-        if self.navigation_manager.destination_reached:
-            self.tasks_manager.destination_reached()
+            if self.navigation_manager.destination_reached:
+                self.tasks_manager.destination_reached()
 
-        # if reached destination then make tasks manager to react
-        if self.navigation_manager.destination_reached:
-            logger.debug("Reached destination")
-            self.tasks_manager.destination_reached()
+            # if reached destination then make tasks manager to react
+            if self.navigation_manager.destination_reached:
+                logger.debug("Reached destination")
+                self.tasks_manager.destination_reached()
 
-        logger.debug(
-            "Current distance: %s",
-            self.navigation_manager.distance_to_destination)
+            logger.debug(
+                "Current distance: %s",
+                self.navigation_manager.distance_to_destination)
 
-        self.tracker_manager.update()
+        with stage_timers['tracking'].time():
+            self.tracker_manager.update()
         self.tracker_manager.send_tracking_data()
+
+    def _get_new_task(self):
+        """Tries to get a new task and set it as destination"""
+        logger.debug("In %s mode. Trying to get new task",
+                     schemas.TaskState.IDLE.value)
+        new_task = self.tasks_manager.get_new_task()
+        if new_task is None:
+            logger.debug("Failed to get new task")
+            return
+        logger.debug("Succesfully received a new task %s", new_task)
+        self.tasks_manager.initialize_new_task(new_task)
+        self.navigation_manager.initialize_new_task(destination=new_task)
+        logger.debug("Succesfully set a new task: %s",
+                     self.navigation_manager.destination)
@@ -1,19 +1,54 @@
-from app.core.location import NavigationMap, BasicLocationService
+import gc
+from typing import List, Optional
+from app.core.dispatcher import TASK_SOURCE, TaskDispatcher
+from app.core.interfaces import MessageSender, TasksManager
+from app.core.location import NavigationMap, BasicLocationService, load_grid
 from app.core.movement import BasicMovementManager
+from app.core.offline import (
+    OFFLINE_BUFFER_SIZE,
+    OFFLINE_SPILL_DIR,
+    OfflineBuffer,
+    SpillStore,
+)
+from app.core.routing import (
+    ROUTE_PLANNING_ENABLED,
+    ROUTE_PROVIDER_WEIGHT,
+    RouteHeadingProvider,
+    RoutePlanner,
+    route_cache,
+)
+from app.core.spatial import SpatialGridIndex
 from app.core.navigation import (
     BasicDestinationTracker,
     BasicAllowedZoneManager,
     HeadingDirectionManager,
     BasicNavigationManager,
     )
-from app.core.task import BasicTasksManager
+from app.core.task import BasicTasksManager, DispatchedTasksManager
 from app.core.tracker import BasicTrackerManager
 from app.core.vehicle import Vehicle
 from app.utils import schemas
-from app.core.send import SQSMessageSender
+from app.utils.rng import create_vehicle_rng, derive_vehicle_id
+from app.core.send import sender_registry
 from decouple import config
 
+RANDOM_SEED = config('RANDOM_SEED', cast=int)
 TRACKING_SQS_URL = config('TRACKING_SQS_URL')
+TRACKING_SEND_BATCHING = config('TRACKING_SEND_BATCHING', cast=bool,
+                                default=False)
+TRACKING_SEND_ASYNC = config('TRACKING_SEND_ASYNC', cast=bool, default=False)
+NAVIGATION_MAP_X_SIZE = config('NAVIGATION_MAP_X_SIZE', cast=int)
+NAVIGATION_MAP_Y_SIZE = config('NAVIGATION_MAP_Y_SIZE', cast=int)
+NAVIGATION_MAP_GRID_PATH = config('NAVIGATION_MAP_GRID_PATH', default='')
+SPATIAL_INDEX_ENABLED = config('SPATIAL_INDEX_ENABLED', cast=bool,
+                               default=False)
+
+# immutable, shared by all vehicles
+DEFAULT_INITIAL_LOCATION = schemas.Location(x=1, y=1)
+TRACKER_STATUSES_PROBABILITIES = {
+    schemas.TrackerStatus.ONLINE: .8,
+    schemas.TrackerStatus.OFFLINE: .2,
+}
 
 
 class BasicVehicleFactory:
@@ -21,38 +56,155 @@ class BasicVehicleFactory:
         self,
         map_singleton: NavigationMap,
         default_max_speed=5,
-        default_task_fail_prob=0.0
+        default_task_fail_prob=0.0,
+        message_sender: Optional[MessageSender] = None,
+        root_seed: int = RANDOM_SEED,
+        spatial_index: Optional[SpatialGridIndex] = None,
+        task_dispatcher: Optional[TaskDispatcher] = None,
+        route_planner: Optional[RoutePlanner] = None,
+        offline_buffer_size: int = OFFLINE_BUFFER_SIZE,
+        offline_spill_store: Optional[SpillStore] = None,
     ):
         self.map_singleton = map_singleton
+        # created vehicles are indexed by id, if an index is passed
+        self.spatial_index = spatial_index
+        # vehicles get tasks from the dispatcher, if passed
+        if task_dispatcher is not None \
+                and task_dispatcher.spatial_index is not spatial_index:
+            raise ValueError("Task dispatcher must use the factory spatial "
+                             "index")
+        self.task_dispatcher = task_dispatcher
+        # vehicles follow planned routes, if a planner is passed
+        self.route_planner = route_planner
+        # trackers buffer messages while offline, spilled to the shared
+        # store once their buffer is full, if a store is passed
+        self.offline_buffer_size = offline_buffer_size
+        self.offline_spill_store = offline_spill_store
         self.default_max_speed = default_max_speed
         self.default_task_fail_prob = default_task_fail_prob
+        # shared by all vehicles, resolved on first vehicle creation
+        self.message_sender = message_sender
+        # vehicles ids and generators are derived from root seed and index
+        self.root_seed = root_seed
+        self.next_vehicle_index = 0
+
+    def get_message_sender(self) -> MessageSender:
+        """Returns the sender shared by all created vehicles"""
+        if self.message_sender is None:
+            self.message_sender = sender_registry.get_sender(
+                endpoint_url=TRACKING_SQS_URL,
+                batching=TRACKING_SEND_BATCHING,
+                asynchronous=TRACKING_SEND_ASYNC,
+            )
+        return self.message_sender
 
     def create_vehicle(
             self,
             max_speed=None,
             initial_location=None,
-            task_fail_prob=None
+            task_fail_prob=None,
+            message_sender: Optional[MessageSender] = None,
+            vehicle_index: Optional[int] = None,
             ):
-        """Fectory method to instantiate a vehicle"""
+        """Fectory method to instantiate a vehicle.
 
+        Vehicle id and random generator are derived from the root seed
+        and vehicle index. Vehicles are indexed sequentially if the index
+        is not passed.
+        """
+        if vehicle_index is None:
+            vehicle_index = self.next_vehicle_index
+        return self.create_fleet(
+            qty=1,
+            max_speed=max_speed,
+            initial_location=initial_location,
+            task_fail_prob=task_fail_prob,
+            message_sender=message_sender,
+            first_vehicle_index=vehicle_index,
+        )[0]
+
+    def create_fleet(
+            self,
+            qty: int,
+            max_speed=None,
+            initial_location=None,
+            task_fail_prob=None,
+            message_sender: Optional[MessageSender] = None,
+            first_vehicle_index: Optional[int] = None,
+            ) -> List[Vehicle]:
+        """Fectory method to instantiate `qty` vehicles with consecutive
+        indices, the same vehicles as `create_vehicle` calls with these
+        indices.
+
+        Vehicles are wired one by one, the fleet only saves the overhead
+        around it. Defaults and the message sender are resolved once per
+        fleet.
+        Immutable components, the map, initial location and tracker
+        statuses probabilities, are shared by all vehicles of the fleet.
+        Cyclic garbage collection is paused while the fleet is built, its
+        passes would repeatedly traverse the new long-lived objects.
+        """
         # Set defaults if not provided
         param_initial_location = initial_location if initial_location \
-                                 else schemas.Location(x=1, y=1)
+                                 else DEFAULT_INITIAL_LOCATION
         param_max_speed = max_speed if max_speed else self.default_max_speed
         param_task_fail_prob = task_fail_prob if task_fail_prob \
                                               else self.default_task_fail_prob
+        message_sender = message_sender or self.get_message_sender()
+
+        if first_vehicle_index is None:
+            first_vehicle_index = self.next_vehicle_index
+        self.next_vehicle_index = first_vehicle_index + qty
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return [
+                self._build_vehicle(
+                    vehicle_index=vehicle_index,
+                    max_speed=param_max_speed,
+                    initial_location=param_initial_location,
+                    task_fail_prob=param_task_fail_prob,
+                    message_sender=message_sender,
+                )
+                for vehicle_index in range(first_vehicle_index,
+                                           first_vehicle_index + qty)
+            ]
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _build_vehicle(
+            self,
+            vehicle_index: int,
+            max_speed: int,
+            initial_location: schemas.Location,
+            task_fail_prob: float,
+            message_sender: MessageSender,
+            ) -> Vehicle:
+        """Wires components of a vehicle, defaults resolved by caller"""
+        vehicle_id = derive_vehicle_id(self.root_seed, vehicle_index)
+        rng = create_vehicle_rng(self.root_seed, vehicle_id)
 
         # tasks
-        tasks_manager = BasicTasksManager(
-            fail_get_task_probability=param_task_fail_prob
-        )
+        tasks_manager: TasksManager
+        if self.task_dispatcher is not None:
+            tasks_manager = DispatchedTasksManager(
+                dispatcher=self.task_dispatcher,
+                vehicle_key=vehicle_id,
+            )
+        else:
+            tasks_manager = BasicTasksManager(
+                fail_get_task_probability=task_fail_prob,
+                rng=rng,
+            )
 
         # navigation
-        nav_map = self.map_singleton
-        initial_location = schemas.Location(x=1, y=1)
         location_service = BasicLocationService(
-            nav_map=nav_map,
-            current_location=param_initial_location)
+            nav_map=self.map_singleton,
+            current_location=initial_location,
+            spatial_index=self.spatial_index,
+            index_key=vehicle_id,
+        )
 
         destination_tracker = BasicDestinationTracker(
             location_service=location_service,
@@ -61,14 +213,25 @@ class BasicVehicleFactory:
             location_service=location_service
         )
 
-        heading_selector = HeadingDirectionManager()
+        heading_selector = HeadingDirectionManager(rng=rng)
         heading_selector.register_heading_provider(
             provider=destination_tracker,
             provider_name="Destination",
             provider_weight=10
         )
+        if self.route_planner is not None:
+            heading_selector.register_heading_provider(
+                provider=RouteHeadingProvider(
+                    location_service=location_service,
+                    destination_tracker=destination_tracker,
+                    planner=self.route_planner,
+                ),
+                provider_name="Route",
+                provider_weight=ROUTE_PROVIDER_WEIGHT,
+            )
         movement_manager = BasicMovementManager(
-            max_speed=param_max_speed
+            max_speed=max_speed,
+            rng=rng,
         )
 
         navigation_manager = BasicNavigationManager(
@@ -80,40 +243,69 @@ class BasicVehicleFactory:
         )
 
         # tracker
-        statuses_probabilities = {
-            schemas.TrackerStatus.ONLINE: .8,
-            schemas.TrackerStatus.OFFLINE: .2,
-        }
-        sqs_url = TRACKING_SQS_URL
-        message_sender = SQSMessageSender(endpoint_url=sqs_url)
         tracker_manager = BasicTrackerManager(
-            statuses_probs=statuses_probabilities,
+            statuses_probs=TRACKER_STATUSES_PROBABILITIES,
             tasks_manager=tasks_manager,
             navigation_manager=navigation_manager,
-            message_sender=message_sender
+            message_sender=message_sender,
+            vehicle_id=vehicle_id,
+            rng=rng,
+            offline_buffer=OfflineBuffer(
+                max_messages=self.offline_buffer_size,
+                spill_store=self.offline_spill_store,
+            ),
         )
 
-        created_vehicle = Vehicle(
+        return Vehicle(
             tracker_manager=tracker_manager,
             tasks_manager=tasks_manager,
             navigation_manager=navigation_manager,
             )
 
-        return created_vehicle
-
 
-singleton_map = NavigationMap(map_size=schemas.MapSize(x_size=100, y_size=100))
-vehicle_factory = BasicVehicleFactory(map_singleton=singleton_map)
+singleton_map = NavigationMap(
+    map_size=schemas.MapSize(x_size=NAVIGATION_MAP_X_SIZE,
+                             y_size=NAVIGATION_MAP_Y_SIZE),
+    grid=load_grid(NAVIGATION_MAP_GRID_PATH)
+    if NAVIGATION_MAP_GRID_PATH else None,
+)
+fleet_index = SpatialGridIndex() \
+    if SPATIAL_INDEX_ENABLED or TASK_SOURCE == 'dispatcher' else None
+task_dispatcher = TaskDispatcher(spatial_index=fleet_index) \
+    if fleet_index is not None and TASK_SOURCE == 'dispatcher' else None
+route_planner = RoutePlanner(nav_map=singleton_map, cache=route_cache) \
+    if ROUTE_PLANNING_ENABLED else None
+offline_spill_store = SpillStore() if OFFLINE_SPILL_DIR else None
+vehicle_factory = BasicVehicleFactory(map_singleton=singleton_map,
+                                      spatial_index=fleet_index,
+                                      task_dispatcher=task_dispatcher,
+                                      route_planner=route_planner,
+                                      offline_spill_store=offline_spill_store)
 
 
 def create_vehicle(
         max_speed=None,
-        initial_location=schemas.Location(x=1, y=1),
-        task_fail_prob=None
+        initial_location=DEFAULT_INITIAL_LOCATION,
+        task_fail_prob=None,
+        vehicle_index=None,
         ):
     """Exposed method to create vehicles"""
     return vehicle_factory.create_vehicle(
         max_speed=max_speed,
         initial_location=initial_location,
-        task_fail_prob=task_fail_prob
+        task_fail_prob=task_fail_prob,
+        vehicle_index=vehicle_index,
     )
+
+
+def create_fleet(qty, first_vehicle_index=None):
+    """Exposed method to create vehicles with consecutive indices"""
+    return vehicle_factory.create_fleet(
+        qty=qty,
+        first_vehicle_index=first_vehicle_index,
+    )
+
+
+def get_message_sender():
+    """Exposed method to get the sender shared by created vehicles"""
+    return vehicle_factory.get_message_sender()
@@ -1,9 +1,43 @@
-"""Module responsible for logging """
+"""
+Module responsible for logging.
+
+Two modes are available, selected with `LOGGING_MODE`:
+
+- `sync` - every logger writes records to stderr with its own handler,
+  in the thread that logs.
+- `queue` - loggers put records to an in-memory queue, a single listener
+  thread formats and writes them. Logging thread only merges the message
+  with its arguments.
+
+Records below `WARNING` can be sampled and rate limited per logger with
+`LOGGING_SAMPLING` and `LOGGING_RATE_LIMIT`: comma separated
+`<logger name prefix>=<value>` pairs, e.g.
+`app.core.location=0.01,app.core.movement=0.1`. A logger gets the value
+of the longest matching prefix.
+"""
+import atexit
 import logging
-from decouple import config
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+from decouple import config, Csv
 
 
 logging_level = config('LOGGING_LEVEL')
+LOGGING_MODE = config('LOGGING_MODE', default='sync')  # `sync` or `queue`
+# fraction of records kept, per logger name prefix
+LOGGING_SAMPLING = config('LOGGING_SAMPLING', cast=Csv(), default='')
+# records per second kept, per logger name prefix
+LOGGING_RATE_LIMIT = config('LOGGING_RATE_LIMIT', cast=Csv(), default='')
+
+LOG_FORMAT = '%(levelname)-8s - %(asctime)s - %(name)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_queue_handler: Optional[QueueHandler] = None
+_queue_listener: Optional[QueueListener] = None
+_queue_lock = threading.Lock()
 
 
 def get_logger(name):
@@ -11,15 +45,138 @@ def get_logger(name):
     logger = logging.getLogger(name)
 
     if not logger.hasHandlers():
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging_level)
-        formatter = logging.Formatter(
-            '%(levelname)-8s - %(asctime)s - %(name)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S')
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        if LOGGING_MODE == 'queue':
+            logger.addHandler(_get_queue_handler())
+        else:
+            logger.addHandler(_create_stream_handler())
+        _add_filters(logger)
 
     if logger.level == logging.NOTSET:
         logger.setLevel(logging_level)
 
     return logger
+
+
+def stop_logging() -> None:
+    """Writes records pending in the queue and stops the listener thread.
+
+    Registered to run at exit, call explicitly in processes that exit
+    without running exit handlers, e.g. multiprocessing workers.
+    """
+    global _queue_listener  # pylint: disable=global-statement
+    with _queue_lock:
+        if _queue_listener is not None:
+            _queue_listener.stop()
+            _queue_listener = None
+
+
+class DeferredFormatQueueHandler(QueueHandler):
+    """Queue handler that leaves formatting to the listener thread.
+
+    Only the message is merged with its arguments before queueing, so
+    later changes of the arguments do not affect the record. The record
+    is changed in place, it is the only handler of app loggers.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps every n-th record below `WARNING`, n given by a rate"""
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.every = max(round(1 / rate), 1) if rate > 0 else 0
+        self.seen = 0
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        self.seen += 1
+        if self.every and self.seen % self.every == 0:
+            return True
+        self.dropped += 1
+        return False
+
+
+class RateLimitFilter(logging.Filter):
+    """Keeps up to a number of records below `WARNING` per second.
+
+    Token bucket, burst is limited to one second worth of records.
+    Approximate when several threads log to the same logger.
+    """
+    def __init__(self, per_second: float) -> None:
+        super().__init__()
+        self.per_second = per_second
+        self.tokens = per_second
+        self.updated = time.monotonic()
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.tokens + (now - self.updated)
+                          * self.per_second, self.per_second)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.dropped += 1
+        return False
+
+
+def _create_stream_handler() -> logging.Handler:
+    """Handler writing formatted records to stderr"""
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging_level)
+    formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+    console_handler.setFormatter(formatter)
+    return console_handler
+
+
+def _get_queue_handler() -> QueueHandler:
+    """Queue handler shared by all loggers, starts the listener thread
+    on first use"""
+    global _queue_handler, _queue_listener  # pylint: disable=global-statement
+    with _queue_lock:
+        if _queue_handler is None:
+            _queue_handler = DeferredFormatQueueHandler(queue.SimpleQueue())
+            atexit.register(stop_logging)
+        if _queue_listener is None:
+            _queue_listener = QueueListener(
+                _queue_handler.queue, _create_stream_handler(),
+                respect_handler_level=True)
+            _queue_listener.start()
+    return _queue_handler
+
+
+def _add_filters(logger: logging.Logger) -> None:
+    """Adds sampling and rate limit filters configured for the logger"""
+    rate = _match_logger_value(logger.name,
+                               _parse_logger_values(LOGGING_SAMPLING))
+    if rate is not None and rate < 1:
+        logger.addFilter(SamplingFilter(rate))
+    per_second = _match_logger_value(logger.name,
+                                     _parse_logger_values(LOGGING_RATE_LIMIT))
+    if per_second is not None:
+        logger.addFilter(RateLimitFilter(per_second))
+
+
+def _parse_logger_values(pairs) -> Dict[str, float]:
+    """Parses `<logger name prefix>=<value>` pairs"""
+    values = {}
+    for pair in pairs:
+        prefix, _, value = pair.partition('=')
+        values[prefix.strip()] = float(value)
+    return values
+
+
+def _match_logger_value(name: str, values: Dict[str, float]
+                        ) -> Optional[float]:
+    """Value of the longest prefix matching the logger name"""
+    matches = [prefix for prefix in values
+               if name == prefix or name.startswith(prefix + '.')]
+    return values[max(matches, key=len)] if matches else None
@@ -0,0 +1,341 @@
+"""
+Module responsible for simulator metrics.
+
+Counters, gauges and histograms are kept in a `MetricsRegistry` and
+exposed in Prometheus text format by a local HTTP endpoint
+(`start_metrics_server`) and as a periodic stats log line
+(`log_stats_periodically`).
+
+Metrics are disabled by default, `METRICS_ENABLED` turns them on. A
+disabled registry hands out no-op metrics, so instrumented code pays
+a method call per update only.
+"""
+import asyncio
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from decouple import config
+from app.utils.logger import get_logger
+
+METRICS_ENABLED = config('METRICS_ENABLED', cast=bool, default=False)
+METRICS_HOST = config('METRICS_HOST', default='127.0.0.1')
+METRICS_PORT = config('METRICS_PORT', cast=int, default=9100)
+METRICS_LOG_INTERVAL_SEC = config('METRICS_LOG_INTERVAL_SEC', cast=float,
+                                  default=10)
+EVENT_LOOP_LAG_INTERVAL_SEC = config('EVENT_LOOP_LAG_INTERVAL_SEC',
+                                     cast=float, default=0.1)
+
+# seconds, from 10 microseconds to 10 seconds
+DEFAULT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01,
+                   0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+logger = get_logger(__name__)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    """Monotonically increasing value"""
+    def __init__(self) -> None:
+        self.value: float = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """Value that goes up and down, or is read from a function"""
+    def __init__(self, function: Optional[Callable[[], float]] = None
+                 ) -> None:
+        self._value: float = 0
+        self._function = function
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> float:
+        return self._function() if self._function else self._value
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value -= amount
+
+
+class Histogram:
+    """Distribution of observed values over fixed buckets"""
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.bucket_counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count: int = 0
+        self.sum: float = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.bucket_counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def time(self) -> '_Timer':
+        """Context manager observing the duration of its block"""
+        return _Timer(self)
+
+
+class _Timer:
+    """Observes elapsed seconds of a block to a histogram"""
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: Histogram) -> None:
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self) -> '_Timer':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class _NullMetric:
+    """Metric of a disabled registry, ignores updates"""
+    value = 0
+    count = 0
+    sum = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def time(self) -> '_NullMetric':
+        return self
+
+    def __enter__(self) -> '_NullMetric':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+NULL_METRIC = _NullMetric()
+
+
+class _Family:
+    """Metrics of the same name, type and help, one per set of labels"""
+    def __init__(self, metric_type: str, help_text: str) -> None:
+        self.metric_type = metric_type
+        self.help_text = help_text
+        # metrics of the family type
+        self.children: Dict[Labels, Any] = {}
+
+
+class MetricsRegistry:
+    """Creates metrics and renders them.
+
+    Metrics are identified by name and labels, requesting the same name
+    and labels again returns the same metric.
+    """
+    def __init__(self, enabled: bool = METRICS_ENABLED) -> None:
+        self.enabled = enabled
+        self._families: Dict[str, _Family] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, **labels: str) -> Counter:
+        return self._get(name, 'counter', help_text, labels, Counter)
+
+    def gauge(self, name: str, help_text: str,
+              function: Optional[Callable[[], float]] = None,
+              **labels: str) -> Gauge:
+        return self._get(name, 'gauge', help_text, labels,
+                         lambda: Gauge(function))
+
+    def histogram(self, name: str, help_text: str,
+                  buckets: Sequence[float] = DEFAULT_BUCKETS,
+                  **labels: str) -> Histogram:
+        return self._get(name, 'histogram', help_text, labels,
+                         lambda: Histogram(buckets))
+
+    def _get(self, name, metric_type, help_text, labels, create):
+        if not self.enabled:
+            return NULL_METRIC
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.setdefault(
+                name, _Family(metric_type, help_text))
+            if family.metric_type != metric_type:
+                raise ValueError(f"Metric {name} is a {family.metric_type}, "
+                                 f"not a {metric_type}")
+            if key not in family.children:
+                family.children[key] = create()
+            return family.children[key]
+
+    def render(self) -> str:
+        """Metrics in Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            families = [(name, family, list(family.children.items()))
+                        for name, family in sorted(self._families.items())]
+        for name, family, children in families:
+            lines.append(f"# HELP {name} {family.help_text}")
+            lines.append(f"# TYPE {name} {family.metric_type}")
+            for labels, metric in children:
+                if family.metric_type == 'histogram':
+                    lines.extend(_render_histogram(name, labels, metric))
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} "
+                                 f"{_format_value(metric.value)}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict[str, Tuple[str, float, float]]:
+        """Current values by metric name with labels: type and value,
+        histograms with count and sum"""
+        values = {}
+        with self._lock:
+            families = [(name, family, list(family.children.items()))
+                        for name, family in self._families.items()]
+        for name, family, children in families:
+            for labels, metric in children:
+                key = f"{name}{_format_labels(labels)}"
+                if family.metric_type == 'histogram':
+                    values[key] = (family.metric_type, metric.count,
+                                   metric.sum)
+                else:
+                    values[key] = (family.metric_type, metric.value, 0.0)
+        return values
+
+
+def _format_labels(labels: Labels, extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in labels]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _render_histogram(name: str, labels: Labels,
+                      histogram: Histogram) -> List[str]:
+    lines = []
+    cumulative = 0
+    bounds = [repr(bound) for bound in histogram.buckets] + ['+Inf']
+    for bound, bucket_count in zip(bounds, histogram.bucket_counts):
+        cumulative += bucket_count
+        bound_label = 'le="' + bound + '"'
+        lines.append(f"{name}_bucket{_format_labels(labels, bound_label)} "
+                     f"{cumulative}")
+    lines.append(f"{name}_sum{_format_labels(labels)} "
+                 f"{_format_value(histogram.sum)}")
+    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+    return lines
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Serves registry metrics at `/metrics`"""
+    def do_GET(self):  # pylint: disable=invalid-name
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        payload = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        pass
+
+
+class _MetricsHTTPServer(ThreadingHTTPServer):
+    """HTTP server of the metrics of a registry"""
+    daemon_threads = True
+
+    def __init__(self, server_address, registry: MetricsRegistry) -> None:
+        super().__init__(server_address, _MetricsRequestHandler)
+        self.registry = registry
+
+
+def start_metrics_server(
+        registry: MetricsRegistry,
+        host: str = METRICS_HOST,
+        port: int = METRICS_PORT,
+        ) -> ThreadingHTTPServer:
+    """Serves metrics from a daemon thread, call `shutdown` to stop"""
+    server = _MetricsHTTPServer((host, port), registry)
+    threading.Thread(target=server.serve_forever, daemon=True,
+                     name='metrics-server').start()
+    logger.info("Serving metrics at http://%s:%s/metrics",
+                *server.server_address[:2])
+    return server
+
+
+async def monitor_event_loop_lag(
+        gauge: Gauge,
+        interval: float = EVENT_LOOP_LAG_INTERVAL_SEC,
+        ) -> None:
+    """Sets gauge to the delay of a periodic wake up, in seconds"""
+    while True:
+        start = time.monotonic()
+        await asyncio.sleep(interval)
+        gauge.set(max(time.monotonic() - start - interval, 0.0))
+
+
+def format_stats(current: Dict[str, Tuple[str, float, float]],
+                 previous: Dict[str, Tuple[str, float, float]],
+                 elapsed: float) -> str:
+    """One line summary: counters as rate per second, gauges as value,
+    histograms as count and mean milliseconds over the period, if any
+    values were observed"""
+    parts = []
+    for key, (metric_type, value, total) in sorted(current.items()):
+        _, previous_value, previous_total = previous.get(
+            key, (metric_type, 0, 0.0))
+        if metric_type == 'counter':
+            parts.append(f"{key}={(value - previous_value) / elapsed:.1f}/s")
+        elif metric_type == 'gauge':
+            parts.append(f"{key}={value:g}")
+        elif value > previous_value:
+            count = value - previous_value
+            mean = (total - previous_total) / count * 1000
+            parts.append(f"{key}={count}x{mean:.3f}ms")
+    return ' '.join(parts)
+
+
+async def log_stats_periodically(
+        registry: MetricsRegistry,
+        interval: float = METRICS_LOG_INTERVAL_SEC,
+        ) -> None:
+    """Logs a stats line every interval"""
+    previous = registry.snapshot()
+    previous_time = time.monotonic()
+    while True:
+        await asyncio.sleep(interval)
+        current = registry.snapshot()
+        now = time.monotonic()
+        logger.info("Stats: %s",
+                    format_stats(current, previous, now - previous_time))
+        previous, previous_time = current, now
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,21 @@
+"""
+Per-vehicle random number generators.
+
+Each vehicle owns an independent generator derived from a root seed and
+the vehicle id, so a vehicle trajectory does not depend on other
+vehicles and on execution order. Runs split into shards, batched or
+replayed produce identical trajectories for the same root seed.
+"""
+import random
+from uuid import UUID
+
+
+def derive_vehicle_id(root_seed: int, vehicle_index: int) -> UUID:
+    """Deterministic vehicle id given root seed and vehicle index"""
+    seeded = random.Random(f"{root_seed}:vehicle:{vehicle_index}")
+    return UUID(int=seeded.getrandbits(128), version=4)
+
+
+def create_vehicle_rng(root_seed: int, vehicle_id: UUID) -> random.Random:
+    """Independent generator of a vehicle"""
+    return random.Random(f"{root_seed}:{vehicle_id}")
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta, timezone
+from common.storage.tracking_table import (
+    format_partition_key,
+    format_sort_key,
+    get_latest_state,
+    iterate_buckets,
+    query_track,
+)
+
+START_TIME = datetime(2024, 1, 1, 22, 30, tzinfo=timezone.utc)
+
+
+class StubTable:
+    """Returns items of a partition in pages of `page_size`"""
+    def __init__(self, items, page_size=2):
+        self.items = items
+        self.page_size = page_size
+        self.queries = []
+
+    def query(self, KeyConditionExpression, ExclusiveStartKey=None):
+        partition_condition, _ = \
+            KeyConditionExpression.get_expression()['values']
+        partition_key = partition_condition.get_expression()['values'][1]
+        self.queries.append(partition_key)
+        items = [item for item in self.items if item['pk'] == partition_key]
+        start = ExclusiveStartKey or 0
+        response = {'Items': items[start:start + self.page_size]}
+        if start + self.page_size < len(items):
+            response['LastEvaluatedKey'] = start + self.page_size
+        return response
+
+    def get_item(self, Key):
+        for item in self.items:
+            if item['pk'] == Key['pk'] and item['sk'] == Key['sk']:
+                return {'Item': item}
+        return {}
+
+
+def test_sort_key_is_fixed_width_utc():
+    created_time = datetime(2024, 1, 1, 2, 0, 5, 7000,
+                            tzinfo=timezone(timedelta(hours=2)))
+
+    assert format_sort_key(created_time) == '2024-01-01T00:00:05.007Z'
+
+
+def test_buckets_cover_time_range():
+    end = START_TIME + timedelta(hours=2)
+
+    assert list(iterate_buckets(START_TIME, end, 'hour')) \
+        == ['2024-01-01T22', '2024-01-01T23', '2024-01-02T00']
+    assert list(iterate_buckets(START_TIME, end, 'day')) \
+        == ['2024-01-01', '2024-01-02']
+    assert list(iterate_buckets(START_TIME, end, 'none')) == [None]
+
+
+def test_reversed_time_range_is_empty():
+    end = START_TIME - timedelta(days=1)
+    table = StubTable([{'pk': 'v', 'sk': '0'}])
+
+    for bucket in ('day', 'hour', 'none'):
+        assert list(iterate_buckets(START_TIME, end, bucket)) == []
+        assert query_track(table, 'v', START_TIME, end, bucket=bucket) == []
+    assert table.queries == []
+
+
+def test_buckets_include_bucket_of_range_end():
+    end = START_TIME + timedelta(hours=24, minutes=-1)
+
+    assert list(iterate_buckets(START_TIME, end, 'day')) \
+        == ['2024-01-01', '2024-01-02']
+
+
+def test_query_track_queries_every_bucket_and_page():
+    items = [{'pk': format_partition_key('v', bucket), 'sk': str(i)}
+             for i, bucket in enumerate(
+                 ['2024-01-01', '2024-01-01', '2024-01-01', '2024-01-02'])]
+    table = StubTable(items)
+
+    track = query_track(table, 'v', START_TIME,
+                        START_TIME + timedelta(hours=2), bucket='day')
+
+    assert track == items
+    assert table.queries == ['v#2024-01-01', 'v#2024-01-01', 'v#2024-01-02']
+
+
+def test_get_latest_state():
+    latest = {'pk': 'v', 'sk': 'LATEST', 'task_state': 'Idle'}
+    table = StubTable([{'pk': 'v', 'sk': '2024'}, latest])
+
+    assert get_latest_state(table, 'v') == latest
+    assert get_latest_state(table, 'other') is None
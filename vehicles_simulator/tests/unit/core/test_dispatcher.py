@@ -0,0 +1,81 @@
+import pytest
+from app.core.dispatcher import TaskDispatcher
+from app.core.sinks import NullSink
+from app.core.spatial import SpatialGridIndex
+from app.core.vehicle_factory import BasicVehicleFactory, singleton_map
+from app.utils import schemas
+from app.utils.schemas import TaskState
+
+
+def create_dispatcher(vehicles, strategy='greedy'):
+    index = SpatialGridIndex(cell_size=5)
+    for key, (x, y) in vehicles.items():
+        index.insert(key, x, y)
+    dispatcher = TaskDispatcher(spatial_index=index, strategy=strategy)
+    for key in vehicles:
+        assert dispatcher.request_task(key) is None
+    return dispatcher
+
+
+@pytest.mark.parametrize("strategy", ['fifo', 'greedy'])
+def test_dispatch_assigns_nearest_idle_vehicle(strategy):
+    dispatcher = create_dispatcher({'a': (0, 0), 'b': (50, 50)}, strategy)
+    dispatcher.submit(schemas.Location(x=48, y=50))
+
+    assert dispatcher.dispatch() == 1
+
+    assert dispatcher.request_task('b') == schemas.Location(x=48, y=50)
+    assert dispatcher.request_task('a') is None
+    assert dispatcher.travel_distance == 2
+
+
+def test_greedy_assigns_shortest_pairs_first():
+    # fifo gives the first task the nearest vehicle `b`, then `a` travels
+    # 3 cells to the second task, greedy gives `b` the task at its location
+    vehicles = {'a': (0, 0), 'b': (3, 0)}
+    tasks = [schemas.Location(x=2, y=0), schemas.Location(x=3, y=0)]
+    distances = {}
+    for strategy in ('fifo', 'greedy'):
+        dispatcher = create_dispatcher(vehicles, strategy)
+        for task in tasks:
+            dispatcher.submit(task)
+        dispatcher.dispatch()
+        distances[strategy] = dispatcher.travel_distance
+
+    assert distances == {'fifo': 1 + 3, 'greedy': 0 + 2}
+
+
+def test_unassigned_tasks_keep_order():
+    dispatcher = create_dispatcher({'a': (0, 0)})
+    tasks = [schemas.Location(x=i, y=i) for i in range(3)]
+    for task in tasks:
+        dispatcher.submit(task)
+
+    assert dispatcher.dispatch() == 1
+
+    assert dispatcher.request_task('a') == tasks[0]
+    assert list(dispatcher.pending) == tasks[1:]
+    assert dispatcher.dispatch() == 0  # `a` is busy
+
+
+def test_vehicles_get_dispatched_tasks():
+    index = SpatialGridIndex()
+    dispatcher = TaskDispatcher(spatial_index=index)
+    factory = BasicVehicleFactory(
+        map_singleton=singleton_map,
+        message_sender=NullSink(),
+        spatial_index=index,
+        task_dispatcher=dispatcher,
+    )
+    vehicle = factory.create_vehicle(
+        initial_location=schemas.Location(x=10, y=10))
+
+    vehicle.run_execution_step()
+    assert vehicle.get_current_task_status() == TaskState.IDLE
+    dispatcher.submit(schemas.Location(x=20, y=10))
+    dispatcher.dispatch()
+    vehicle.run_execution_step()
+
+    assert vehicle.get_current_task_status() == TaskState.IN_PROGRESS
+    assert vehicle.navigation_manager.destination == \
+        schemas.Location(x=20, y=10)
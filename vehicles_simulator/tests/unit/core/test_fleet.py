@@ -0,0 +1,84 @@
+import numpy as np
+from app.core.fleet import FleetEngine, TASK_IDLE, TASK_IN_PROGRESS, UP
+from app.core.location import GRID_LAYERS, NavigationMap
+from app.utils.schemas import Location, MapSize
+
+
+def create_engine(size=10, **kwargs):
+    nav_map = NavigationMap(map_size=MapSize(x_size=100, y_size=100))
+    return FleetEngine(size=size, nav_map=nav_map, seed=1, **kwargs)
+
+
+def test_fleet_engine_initial_state():
+    engine = create_engine()
+
+    assert (engine.location == [1, 1]).all(), (
+        f"Expected all vehicles at (1, 1), got {engine.location}")
+    assert (engine.task_state == TASK_IDLE).all(), (
+        "Expected all vehicles to be idle")
+    assert (engine.heading == UP).all(), (
+        "Expected all vehicles to head up")
+
+
+def test_fleet_engine_assigns_tasks_without_moving():
+    engine = create_engine()
+    engine.tick()
+
+    assert (engine.task_state == TASK_IN_PROGRESS).all(), (
+        f"Expected all vehicles to get a task, got {engine.task_state}")
+    assert (engine.location == [1, 1]).all(), (
+        "Expected vehicles not to move on the tick a task is received")
+
+
+def test_fleet_engine_no_task_on_failure():
+    engine = create_engine(task_fail_prob=1.0)
+    engine.run(5)
+
+    assert (engine.task_state == TASK_IDLE).all(), (
+        "Expected no vehicle to get a task")
+
+
+def test_fleet_engine_movement_rules():
+    engine = create_engine(max_speed=3)
+    engine.run(30)
+
+    assert (engine.speed >= 0).all() and (engine.speed <= 3).all(), (
+        f"Expected speed within [0, 3], got {engine.speed}")
+    steps = np.abs(engine.location - [1, 1]).sum(axis=1)
+    assert (steps <= 3 * 29).all(), (
+        "Expected vehicles not to exceed max speed")
+
+
+def test_fleet_engine_destination_reached_becomes_idle():
+    engine = create_engine(size=1, initial_location=Location(x=50, y=50))
+    engine.tick()
+    engine.destination[0] = [50, 50]
+    engine.tick()
+
+    assert engine.destination_reached[0], (
+        "Expected destination to be reached")
+    assert engine.task_state[0] == TASK_IDLE, (
+        "Expected vehicle to be idle after reaching destination")
+
+
+def test_fleet_engine_tracking_data():
+    engine = create_engine(size=2)
+    engine.run(3)
+    tracking_data = engine.tracking_data(1)
+
+    assert tracking_data.vehicle_location == Location(
+        x=int(engine.location[1, 0]), y=int(engine.location[1, 1]))
+    assert tracking_data.task_state == 'In progress'
+
+
+def test_fleet_engine_speed_limits():
+    grid = np.zeros((len(GRID_LAYERS), 101, 101), dtype=np.uint8)
+    grid[GRID_LAYERS.index('speed_limit')] = 1
+    nav_map = NavigationMap(map_size=MapSize(x_size=100, y_size=100),
+                            grid=grid)
+    engine = FleetEngine(size=10, nav_map=nav_map, seed=1, max_speed=3)
+    engine.run(30)
+    NavigationMap(map_size=MapSize(x_size=100, y_size=100))
+
+    assert (engine.speed <= 1).all(), (
+        f"Expected speed within the speed limit, got {engine.speed}")
@@ -0,0 +1,89 @@
+import random
+from itertools import combinations
+import pytest
+from app.core.heading import (
+    DIRECTIONS,
+    MAX_COMPILED_PROVIDERS,
+    HeadingDirectionManager,
+    select_heading_directions,
+)
+from app.utils.schemas import Direction
+
+SUGGESTIONS = [list(directions) for size in range(3)
+               for directions in combinations(DIRECTIONS, size)]
+
+
+class StubProvider:
+    """Heading provider cycling over a list of suggestions"""
+    def __init__(self, suggestions, rng):
+        self.suggestions = suggestions
+        self.rng = rng
+        self.heading_directions = []
+
+    def update_heading_directions(self):
+        self.heading_directions = self.rng.choice(self.suggestions)
+
+
+def create_manager(weights, seed):
+    manager = HeadingDirectionManager(rng=random.Random(seed))
+    for i, weight in enumerate(weights):
+        manager.register_heading_provider(
+            provider=StubProvider(SUGGESTIONS, random.Random(seed + i)),
+            provider_name=f"provider {i}",
+            provider_weight=weight)
+    return manager
+
+
+def reference_direction(manager):
+    """Decision as made before compiling policies"""
+    probabilities = manager._calculate_heading_probabilities()
+    return manager.rng.choices(population=list(probabilities),
+                               weights=list(probabilities.values()),
+                               k=1)[0]
+
+
+@pytest.mark.parametrize("weights", [(), (10,), (10, 0.5), (3, 7, 2),
+                                     (3, 7, 2, 0.5, 4)])
+def test_compiled_policy_matches_reference(weights):
+    compiled = create_manager(weights, seed=1)
+    reference = create_manager(weights, seed=1)
+
+    for _ in range(2_000):
+        compiled.update_heading_direction()
+        assert compiled.heading_direction == reference_direction(reference)
+
+
+def test_batched_selection_matches_single_decisions():
+    weights = [(10,), (10, 0.5)]
+    batched = [create_manager(weights[i % 2], seed=i) for i in range(50)]
+    single = [create_manager(weights[i % 2], seed=i) for i in range(50)]
+
+    for _ in range(20):
+        select_heading_directions(batched)
+        for manager in single:
+            manager.update_heading_direction()
+        assert [manager.heading_direction for manager in batched] == \
+            [manager.heading_direction for manager in single]
+
+
+def test_managers_share_compiled_policy():
+    first, second = create_manager((10,), 0), create_manager((10,), 1)
+
+    assert first.policy is second.policy
+    assert len(first.policy.rows) == 16
+    assert first.heading_direction == Direction.UP
+
+
+def test_policy_compiles_rows_on_lookup_above_max_providers():
+    weights = (2,) * (MAX_COMPILED_PROVIDERS + 1)
+    batched = [create_manager(weights, seed=i) for i in range(20)]
+    single = [create_manager(weights, seed=i) for i in range(20)]
+    assert batched[0].policy.rows == {}
+
+    select_heading_directions(batched)
+    for manager in single:
+        manager.update_heading_direction()
+
+    assert [manager.heading_direction for manager in batched] == \
+        [manager.heading_direction for manager in single]
+    assert 0 < len(batched[0].policy.rows) <= 20
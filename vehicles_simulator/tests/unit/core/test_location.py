@@ -1,4 +1,12 @@
-from app.core.location import NavigationMap
+import numpy as np
+import pytest
+from app.core.location import (
+    GRID_LAYERS,
+    NavigationMap,
+    create_grid_file,
+    load_grid,
+)
+from app.core.movement import BasicMovementManager
 from app.utils.schemas import MapSize
 
 
@@ -17,3 +25,63 @@ def test_instantiate_navigation_map():
     assert nav_map.y_size == 1, (
         f"Exepected map instance y_size value to be 1, got {nav_map.x_size}"
     )
+
+
+@pytest.fixture
+def grid_path(tmp_path):
+    path = str(tmp_path / 'grid.npy')
+    grid = create_grid_file(path, MapSize(x_size=4, y_size=3))
+    grid[GRID_LAYERS.index('blocked'), 2, 1] = 1
+    grid[GRID_LAYERS.index('speed_limit'), 1, 1] = 2
+    grid.flush()
+    yield path
+    # the map is a singleton, restore it for other tests
+    NavigationMap(map_size=MapSize(x_size=100, y_size=100))
+
+
+def test_navigation_map_reads_memory_mapped_grid(grid_path):
+    nav_map = NavigationMap(map_size=MapSize(x_size=4, y_size=3),
+                            grid=load_grid(grid_path))
+
+    assert isinstance(nav_map.grid, np.memmap)
+    assert not nav_map.grid.flags.writeable
+    assert np.shares_memory(nav_map.layer('blocked'), nav_map.grid)
+    assert not nav_map.is_passable(2, 1)
+    assert nav_map.is_passable(1, 1) and nav_map.is_passable(4, 3)
+    assert not nav_map.is_passable(5, 3)
+    assert nav_map.speed_limit(1, 1) == 2
+    assert nav_map.speed_limit(0, 0) is None
+    assert nav_map.speed_limit(-1, 0) is None
+
+
+def test_navigation_map_rejects_grid_of_other_size(grid_path):
+    with pytest.raises(ValueError):
+        NavigationMap(map_size=MapSize(x_size=3, y_size=3),
+                      grid=load_grid(grid_path))
+
+
+def test_speed_limit_caps_speed_increase():
+    movement_manager = BasicMovementManager(
+        current_speed=1, max_speed=5, distance_until_turn_allowed=100)
+    movement_manager.set_speed_limit(2)
+
+    movement_manager.move()
+    movement_manager.move()
+
+    assert movement_manager.current_speed == 2
+    movement_manager.set_speed_limit(None)
+    movement_manager.move()
+    assert movement_manager.current_speed == 3
+
+
+def test_speed_limit_slows_down_by_speed_change_step():
+    movement_manager = BasicMovementManager(
+        current_speed=4, max_speed=5, distance_until_turn_allowed=100)
+    movement_manager.set_speed_limit(2)
+
+    speeds = []
+    for _ in range(3):
+        movement_manager.move()
+        speeds.append(movement_manager.current_speed)
+
+    assert speeds == [3, 2, 2]
@@ -0,0 +1,19 @@
+from app.core import movement
+from app.core.movement import BasicMovementManager
+
+
+def test_turn_allowed_after_passing_turn_point(monkeypatch):
+    monkeypatch.setattr(movement, 'TURN_SPEED_THRESHOLD', 1)
+    # the turn point is reached at speed 2 and passed at speed 1
+    movement_manager = BasicMovementManager(
+        current_speed=3, distance_until_turn_allowed=2, can_turn=False)
+
+    movement_manager.move()
+
+    assert movement_manager.current_speed == 2
+    assert movement_manager.distance_until_turn_allowed == 0
+    assert not movement_manager.can_turn
+    movement_manager.move()
+    assert movement_manager.current_speed == 1
+    assert movement_manager.distance_until_turn_allowed == -1
+    assert movement_manager.can_turn
@@ -0,0 +1,52 @@
+import os
+from app.core.offline import OfflineBuffer, SpillStore
+
+
+def test_buffer_drains_oldest_first():
+    buffer = OfflineBuffer(max_messages=3)
+    for message in ('a', 'bb', 'c'):
+        buffer.append(message)
+
+    assert len(buffer) == 3
+    assert buffer.memory_bytes == 4
+    assert buffer.drain() == ['a', 'bb', 'c']
+    assert len(buffer) == 0
+    assert buffer.memory_bytes == 0
+
+
+def test_buffer_without_spill_drops_oldest():
+    buffer = OfflineBuffer(max_messages=2)
+    for message in ('a', 'b', 'c'):
+        buffer.append(message)
+
+    assert buffer.drain() == ['b', 'c']
+    assert buffer.messages_dropped == 1
+
+
+def test_buffer_spills_when_full(tmp_path):
+    store = SpillStore(directory=str(tmp_path), segment_bytes=4,
+                       max_bytes=1024)
+    buffer = OfflineBuffer(max_messages=2, spill_store=store)
+    for message in ('a', 'b', 'cc', 'dd', 'ee'):
+        buffer.append(message)
+
+    assert buffer.memory_bytes == 2
+    assert store.stats['bytes_spilled'] == 6
+    assert len(os.listdir(tmp_path)) == 2, (
+        "Expected messages not fitting the active segment in a new one")
+    assert buffer.drain() == ['a', 'b', 'cc', 'dd', 'ee']
+    assert len(os.listdir(tmp_path)) == 1, (
+        "Expected replayed segments removed, but the active one")
+    store.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_buffer_drops_newest_when_spill_store_full(tmp_path):
+    store = SpillStore(directory=str(tmp_path), segment_bytes=2, max_bytes=2)
+    buffer = OfflineBuffer(max_messages=1, spill_store=store)
+    for message in ('a', 'bb', 'c'):
+        buffer.append(message)
+
+    assert buffer.messages_dropped == 1
+    assert buffer.drain() == ['a', 'bb']
+    store.close()
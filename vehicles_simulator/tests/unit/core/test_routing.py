@@ -0,0 +1,103 @@
+import pytest
+from app.core.location import BasicLocationService, NavigationMap
+from app.core.navigation import BasicDestinationTracker
+from app.core.routing import RouteCache, RouteHeadingProvider, RoutePlanner
+from app.utils.schemas import Direction, Location, MapSize
+
+
+@pytest.fixture
+def nav_map():
+    yield NavigationMap(map_size=MapSize(x_size=20, y_size=20))
+    # the map is a singleton, restore it for other tests
+    NavigationMap(map_size=MapSize(x_size=100, y_size=100))
+
+
+def assert_valid_route(route, nav_map):
+    for (x, y), (next_x, next_y) in zip(route, route[1:]):
+        assert abs(next_x - x) + abs(next_y - y) == 1
+        assert nav_map.is_passable(next_x, next_y)
+
+
+def test_route_is_shortest_to_destination_area(nav_map):
+    planner = RoutePlanner(nav_map, RouteCache(),
+                           destination_reached_threshold=2)
+
+    route = planner.route((0, 0), (10, 5))
+
+    assert route[0] == (0, 0)
+    assert route[-1] == (8, 3)
+    assert len(route) - 1 == 8 + 3
+    assert_valid_route(route, nav_map)
+
+
+def test_route_avoids_blocked_cells(nav_map):
+    # wall at x = 5 with a gap at y = 15
+    nav_map.block_cells((5, y) for y in range(21) if y != 15)
+    planner = RoutePlanner(nav_map, RouteCache(),
+                           destination_reached_threshold=0)
+
+    route = planner.route((0, 0), (10, 0))
+
+    assert (5, 15) in route
+    assert len(route) - 1 == 10 + 2 * 15
+    assert_valid_route(route, nav_map)
+    assert planner.route((0, 0), (5, 0)) is None
+    assert planner.route((-1, 0), (10, 0)) is None
+
+
+def test_route_to_blocked_destination_ends_in_its_area(nav_map):
+    nav_map.block_cells([(10, 5), (9, 5), (10, 4), (9, 6)])
+    planner = RoutePlanner(nav_map, RouteCache(),
+                           destination_reached_threshold=1)
+
+    route = planner.route((0, 5), (10, 5))
+
+    assert route[-1] == (9, 4)
+    assert len(route) - 1 == 9 + 1
+    assert_valid_route(route, nav_map)
+    nav_map.block_cells([(9, 4), (10, 6), (11, 4), (11, 5), (11, 6)])
+    assert planner.route((0, 5), (10, 5)) is None
+
+
+def test_route_cache_serves_route_suffixes(nav_map):
+    cache = RouteCache()
+    planner = RoutePlanner(nav_map, cache, destination_reached_threshold=0)
+
+    route = planner.route((0, 0), (10, 10))
+    assert planner.route(route[5], (10, 10)) == route[5:]
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    nav_map.block_cells([(19, 19)])
+    planner.route(route[5], (10, 10))
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_route_cache_evicts_least_recently_used():
+    cache = RouteCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+
+    with pytest.raises(KeyError):
+        cache.get('b')
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+
+def test_route_heading_provider_suggests_next_step(nav_map):
+    location_service = BasicLocationService(
+        nav_map=nav_map, current_location=Location(x=10, y=10))
+    destination_tracker = BasicDestinationTracker(
+        location_service=location_service, destination_reached_threshold=1)
+    destination_tracker.destination = Location(x=10, y=2)
+    provider = RouteHeadingProvider(
+        location_service=location_service,
+        destination_tracker=destination_tracker,
+        planner=RoutePlanner(nav_map, RouteCache(),
+                             destination_reached_threshold=1))
+
+    provider.update_heading_directions()
+    assert provider.heading_directions == [Direction.DOWN]
+    location_service.override_current_location(Location(x=25, y=10))
+    provider.update_heading_directions()
+    assert provider.heading_directions == []
@@ -0,0 +1,47 @@
+import asyncio
+import pytest
+from app.core.scheduler import VehicleScheduler
+
+
+class CountingVehicle:
+    def __init__(self):
+        self.steps = 0
+
+    def run_execution_step(self):
+        self.steps += 1
+
+
+def test_scheduler_runs_all_rounds():
+    vehicles = [CountingVehicle() for _ in range(50)]
+    scheduler = VehicleScheduler(
+        vehicles=vehicles, intervals=[0.01] * 50, workers=2, rounds=3)
+    asyncio.run(scheduler.run())
+
+    assert all(vehicle.steps == 3 for vehicle in vehicles), (
+        f"Expected 3 steps per vehicle, got "
+        f"{[vehicle.steps for vehicle in vehicles]}")
+    assert scheduler.stats['steps'] == 150
+
+
+def test_scheduler_runs_no_step_without_rounds():
+    vehicles = [CountingVehicle() for _ in range(3)]
+    scheduler = VehicleScheduler(
+        vehicles=vehicles, intervals=[0.01] * 3, workers=1, rounds=0)
+    asyncio.run(scheduler.run(duration=0.5))
+
+    assert [vehicle.steps for vehicle in vehicles] == [0, 0, 0]
+
+
+def test_scheduler_keeps_vehicle_rate():
+    vehicles = [CountingVehicle(), CountingVehicle()]
+    scheduler = VehicleScheduler(
+        vehicles=vehicles, intervals=[0.02, 0.1], workers=1)
+    asyncio.run(scheduler.run(duration=0.5))
+
+    assert vehicles[0].steps > vehicles[1].steps, (
+        "Expected the vehicle with a shorter interval to make more steps")
+
+
+def test_scheduler_rejects_missing_intervals():
+    with pytest.raises(ValueError):
+        VehicleScheduler(vehicles=[CountingVehicle()], intervals=[])
@@ -0,0 +1,397 @@
+import asyncio
+import threading
+import time
+import pytest
+from botocore.exceptions import EndpointConnectionError
+from app.core import send
+from app.core.interfaces import MessageSender
+from app.core.send import (
+    AsyncMessageSender,
+    BatchingMessageSender,
+    MessageSenderRegistry,
+    QueuedMessageSender,
+    split_batches,
+)
+
+
+class StubSQSClient:
+    """Records batches, fails entries with given ids once, fails
+    `transport_errors` requests with a connection error"""
+    def __init__(self, fail_ids=(), sender_fault=False, transport_errors=0):
+        self.batches = []
+        self.fail_ids = set(fail_ids)
+        self.sender_fault = sender_fault
+        self.transport_errors = transport_errors
+
+    def create_queue(self, QueueName):
+        return {'QueueUrl': f'http://stub/{QueueName}'}
+
+    def get_queue_url(self, QueueName):
+        return {'QueueUrl': f'http://stub/{QueueName}'}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        if self.transport_errors:
+            self.transport_errors -= 1
+            raise EndpointConnectionError(endpoint_url=QueueUrl)
+        self.batches.append([entry['MessageBody'] for entry in Entries])
+        failed = [entry for entry in Entries if entry['Id'] in self.fail_ids]
+        if not self.sender_fault:
+            self.fail_ids.clear()
+        return {
+            'Successful': [{'Id': entry['Id']} for entry in Entries
+                           if entry not in failed],
+            'Failed': [{'Id': entry['Id'], 'SenderFault': self.sender_fault,
+                        'Code': 'Stub'} for entry in failed],
+        }
+
+
+@pytest.fixture(name="sqs_client")
+def sqs_client_fixture(monkeypatch):
+    client = StubSQSClient()
+    monkeypatch.setattr(send.SQSMessageSender, '_get_sqs_client',
+                        lambda self, endpoint_url: client)
+    return client
+
+
+def test_batching_sender_flushes_on_size(sqs_client):
+    sender = BatchingMessageSender(max_batch_size=3, max_batch_age=60)
+    for i in range(7):
+        sender.send_message(str(i))
+
+    assert sqs_client.batches == [['0', '1', '2'], ['3', '4', '5']]
+    sender.close()
+    assert sqs_client.batches[-1] == ['6'], (
+        "Expected remaining messages to be sent on close")
+    assert sender.stats['batches_sent'] == 3
+    assert sender.stats['entries_sent'] == 7
+
+
+def test_batching_sender_flushes_on_bytes(sqs_client):
+    sender = BatchingMessageSender(max_batch_bytes=10, max_batch_age=60)
+    for message in ['aaaa', 'bbbb', 'cccc']:
+        sender.send_message(message)
+
+    assert sqs_client.batches == [['aaaa', 'bbbb']]
+
+
+def test_batching_sender_flushes_on_age(sqs_client):
+    sender = BatchingMessageSender(max_batch_age=0)
+    sender.send_message('a')
+
+    assert sqs_client.batches == [['a']]
+
+
+def test_batching_sender_retries_only_failed_entries(sqs_client):
+    sqs_client.fail_ids = {'1'}
+    sender = BatchingMessageSender(max_batch_size=3, retry_backoff=0)
+    for message in ['a', 'b', 'c']:
+        sender.send_message(message)
+    sender.close()
+
+    assert sqs_client.batches == [['a', 'b', 'c'], ['b']]
+    assert sender.stats['entries_sent'] == 3
+    assert sender.stats['entries_retried'] == 1
+    assert sender.stats['entries_failed'] == 0
+
+
+def test_batching_sender_retries_batch_on_transport_error(sqs_client):
+    sqs_client.transport_errors = 1
+    sender = BatchingMessageSender(max_batch_size=2, retry_backoff=0)
+    sender.send_message('a')
+    sender.send_message('b')
+    sender.close()
+
+    assert sqs_client.batches == [['a', 'b']]
+    assert sender.stats['entries_retried'] == 2
+
+
+def test_batching_sender_counts_entries_failing_after_retries(sqs_client):
+    sqs_client.transport_errors = 10
+    sender = BatchingMessageSender(max_batch_size=2, max_retries=2,
+                                   retry_backoff=0)
+    sender.send_message('a')
+    sender.send_message('b')  # does not raise
+    sender.close()
+
+    assert sqs_client.batches == []
+    assert sender.stats['entries_failed'] == 2
+
+
+def test_batching_sender_flushes_idle_buffer(sqs_client):
+    sender = BatchingMessageSender(max_batch_age=0.05)
+    sender.send_message('a')
+    assert sqs_client.batches == []
+
+    deadline = time.monotonic() + 2
+    while not sqs_client.batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sqs_client.batches == [['a']], (
+        "Expected the flusher to send the buffer once max age passed")
+    sender.close()
+
+
+def test_batching_sender_flushes_expired_buffer_during_backoff(sqs_client):
+    sqs_client.transport_errors = 1
+    sender = BatchingMessageSender(max_batch_size=2, max_batch_age=0.05,
+                                   retry_backoff=1.0)
+    sender.send_message('a')
+    sender.send_message('b')  # fails, retried after a second
+    sender.send_message('c')
+
+    deadline = time.monotonic() + 0.5
+    while not sqs_client.batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sqs_client.batches == [['c']], (
+        "Expected the expired buffer sent before the retry is due")
+    sender.close()
+    assert sqs_client.batches == [['c'], ['a', 'b']]
+
+
+def test_batching_sender_rejects_messages_after_close(sqs_client):
+    sender = BatchingMessageSender()
+    sender.send_message('a')
+    sender.close()
+
+    with pytest.raises(RuntimeError):
+        sender.send_message('b')
+    assert sqs_client.batches == [['a']]
+
+
+def test_batching_sender_does_not_retry_sender_fault(sqs_client):
+    sqs_client.fail_ids = {'0'}
+    sqs_client.sender_fault = True
+    sender = BatchingMessageSender(max_batch_size=2, retry_backoff=0)
+    for message in ['a', 'b']:
+        sender.send_message(message)
+
+    assert len(sqs_client.batches) == 1
+    assert sender.stats['entries_failed'] == 1
+
+
+def test_sender_sets_up_queue_on_first_send(sqs_client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(sqs_client, 'get_queue_url',
+                        lambda QueueName: calls.append(QueueName)
+                        or {'QueueUrl': f'http://stub/{QueueName}'})
+    sender = BatchingMessageSender(max_batch_size=1)
+    assert calls == [], "Expected no SQS calls before the first send"
+
+    sender.send_message('a')
+    sender.send_message('b')
+    assert len(calls) == 1
+    assert sqs_client.batches == [['a'], ['b']]
+
+
+def test_batching_sender_sends_burst_in_full_batches(sqs_client):
+    sender = BatchingMessageSender(max_batch_size=3, max_batch_age=60)
+    sender.send_message('a')
+    sender.send_messages([str(i) for i in range(7)])
+
+    assert sqs_client.batches == [['a'], ['0', '1', '2'], ['3', '4', '5'],
+                                  ['6']], (
+        "Expected buffered messages sent first, then the burst in order")
+
+
+def test_split_batches_respects_bytes_limit():
+    batches = list(split_batches(['aa', 'bb', 'c', 'dd'], max_batch_size=10,
+                                 max_batch_bytes=4))
+
+    assert batches == [['aa', 'bb'], ['c', 'dd']]
+    with pytest.raises(ValueError):
+        list(split_batches(['aaaaa'], max_batch_bytes=4))
+
+
+def test_batching_sender_rejects_invalid_batch_size(sqs_client):
+    with pytest.raises(ValueError):
+        BatchingMessageSender(max_batch_size=11)
+
+
+def test_registry_shares_sender(sqs_client):
+    registry = MessageSenderRegistry()
+    sender = registry.get_sender(endpoint_url='http://stub')
+
+    assert registry.get_sender(endpoint_url='http://stub') is sender, (
+        "Expected the same sender instance for the same queue")
+    assert registry.get_sender(endpoint_url='http://other') is not sender
+
+
+def test_registry_close_all_flushes_senders(sqs_client):
+    registry = MessageSenderRegistry()
+    sender = registry.get_sender(batching=True)
+    sender.send_message('a')
+    registry.close_all()
+
+    assert sqs_client.batches == [['a']]
+
+
+class RecordingSender(MessageSender):
+    def __init__(self, release=None):
+        self.messages = []
+        self.release = release
+
+    def send_message(self, message):
+        if self.release is not None:
+            self.release.wait()
+        self.messages.append(message)
+
+
+def test_async_sender_hands_off_messages():
+    recorder = RecordingSender()
+    sender = AsyncMessageSender(sender=recorder, max_workers=2)
+    for i in range(5):
+        sender.send_message(str(i))
+    sender.close()
+
+    assert sorted(recorder.messages) == ['0', '1', '2', '3', '4']
+    assert sender.stats['messages_sent'] == 5
+    assert sender.stats['in_flight'] == 0
+
+
+def test_async_sender_hands_off_burst_in_order():
+    recorder = RecordingSender()
+    sender = AsyncMessageSender(sender=recorder, max_workers=2)
+    sender.send_messages([str(i) for i in range(5)])
+    sender.close()
+
+    assert recorder.messages == ['0', '1', '2', '3', '4']
+    assert sender.stats['messages_sent'] == 5
+    assert sender.stats['in_flight'] == 0
+
+
+def test_async_sender_waits_for_capacity():
+    release = threading.Event()
+    sender = AsyncMessageSender(sender=RecordingSender(release=release),
+                                max_workers=1, max_in_flight=1)
+    sender.send_message('a')
+
+    async def wait_for_capacity():
+        asyncio.get_running_loop().call_later(0.05, release.set)
+        await asyncio.wait_for(sender.wait_for_capacity(), timeout=1)
+
+    asyncio.run(wait_for_capacity())
+    assert sender.in_flight == 0, (
+        "Expected capacity to be available after the message is sent")
+    sender.close()
+
+
+def wait_until(condition, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out waiting"
+        time.sleep(0.001)
+
+
+def create_stalled_queue(policy):
+    """Queue of 2 messages, its single worker holds message `a` until
+    `release` is set"""
+    release = threading.Event()
+    recorder = RecordingSender(release=release)
+    sender = QueuedMessageSender(sender=recorder, max_size=2,
+                                 policy=policy, max_workers=1)
+    sender.send_keyed_message(key=1, message='a')
+    wait_until(lambda: sender.depth == 0)
+    return sender, recorder, release
+
+
+def test_queued_sender_drops_oldest():
+    sender, recorder, release = create_stalled_queue('drop_oldest')
+    for message in ('b', 'c', 'd'):
+        sender.send_keyed_message(key=1, message=message)
+    release.set()
+    sender.close()
+
+    assert recorder.messages == ['a', 'c', 'd']
+    assert sender.stats['messages_dropped'] == 1
+    assert sender.stats['messages_sent'] == 3
+
+
+def test_queued_sender_coalesces_messages_per_key():
+    sender, recorder, release = create_stalled_queue('coalesce')
+    sender.send_keyed_message(key=1, message='b')
+    sender.send_keyed_message(key=2, message='c')
+    sender.send_keyed_message(key=1, message='d')
+    sender.send_message('e')  # no key, the oldest message is dropped
+    release.set()
+    sender.close()
+
+    assert recorder.messages == ['a', 'c', 'e']
+    assert sender.stats['messages_coalesced'] == 1
+    assert sender.stats['messages_dropped'] == 1
+
+
+def test_queued_sender_never_coalesces_unkeyed_messages():
+    sender, recorder, release = create_stalled_queue('coalesce')
+    sender.send_message('b')
+    sender.send_keyed_message(key=0, message='c')
+    release.set()
+    sender.close()
+
+    assert recorder.messages == ['a', 'b', 'c']
+    assert sender.stats['messages_coalesced'] == 0
+
+
+def test_queued_sender_blocks_until_capacity():
+    sender, recorder, release = create_stalled_queue('block')
+    sender.send_message('b')
+    sender.send_message('c')
+
+    async def wait_for_capacity():
+        asyncio.get_running_loop().call_later(0.05, release.set)
+        await asyncio.wait_for(sender.wait_for_capacity(), timeout=1)
+
+    asyncio.run(wait_for_capacity())
+    assert sender.depth < 2
+    sender.send_message('d')
+    sender.close()
+    assert recorder.messages == ['a', 'b', 'c', 'd']
+
+
+def test_queued_sender_never_blocks_event_loop():
+    sender, recorder, release = create_stalled_queue('block')
+    sender.send_message('b')
+    sender.send_message('c')
+
+    async def send_to_full_queue():
+        sender.send_message('d')
+
+    with pytest.raises(RuntimeError, match='wait_for_capacity'):
+        asyncio.run(send_to_full_queue())
+    release.set()
+    sender.close()
+    assert recorder.messages == ['a', 'b', 'c']
+
+
+def test_queued_sender_rejects_unknown_policy():
+    with pytest.raises(ValueError):
+        QueuedMessageSender(sender=RecordingSender(), max_size=1,
+                            policy='unknown')
+
+
+def test_sqs_sender_returns_messages_not_accepted(sqs_client):
+    sqs_client.fail_ids = {'1'}
+    sender = send.SQSMessageSender()
+
+    assert sender.send_messages(['a', 'b', 'c']) == ['b'], (
+        "Expected throttled messages returned to be resent")
+    sqs_client.transport_errors = 1
+    assert sender.send_messages(['d']) == ['d']
+
+
+class BurstRecordingSender(RecordingSender):
+    def __init__(self):
+        super().__init__()
+        self.bursts = []
+
+    def send_messages(self, messages):
+        self.bursts.append(messages)
+        return []
+
+
+def test_queued_sender_sends_burst_as_single_item():
+    recorder = BurstRecordingSender()
+    sender = QueuedMessageSender(sender=recorder, max_size=1, max_workers=1)
+    sender.send_messages([str(i) for i in range(5)])
+    sender.close()
+
+    assert recorder.bursts == [['0', '1', '2', '3', '4']]
+    assert sender.stats['messages_sent'] == 5
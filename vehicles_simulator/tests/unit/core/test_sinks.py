@@ -0,0 +1,117 @@
+import socket
+import threading
+import time
+import pytest
+from app.core.send import MessageSenderRegistry
+from app.core.sinks import (
+    FileSink,
+    NullSink,
+    RingBufferSink,
+    UnixSocketSink,
+    read_messages,
+)
+
+MESSAGES = [
+    '{"schema_version":"1.0.0","vehicle_id":"a"}',
+    # schema 2.0.0 record
+    'AoDAOS42s0josrp7foR6rqcwe7RPoQEAAAECAfv/yAABAAIAAwB7AAAA',
+]
+
+
+def test_ring_buffer_sink_keeps_last_messages():
+    sink = RingBufferSink(size=3)
+
+    for i in range(5):
+        sink.send_message(str(i))
+
+    assert sink.messages == ['2', '3', '4']
+    assert sink.messages_dropped == 2
+
+
+@pytest.mark.parametrize("sink_format", ['jsonl', 'binary'])
+def test_file_sink_round_trip(tmp_path, sink_format):
+    path = tmp_path / 'tracking.out'
+    sink = FileSink(path=str(path), sink_format=sink_format,
+                    buffer_bytes=1 << 20, flush_interval=60)
+
+    for message in MESSAGES:
+        sink.send_message(message)
+    assert sink.writes == 0, "Expected messages to be buffered"
+    sink.close()
+
+    with open(path, 'rb') as file:
+        assert list(read_messages(file, sink_format)) == MESSAGES
+    assert sink.syncs == 1
+
+
+def test_binary_format_stores_raw_records(tmp_path):
+    jsonl_sink = FileSink(path=str(tmp_path / 'a'), sink_format='jsonl')
+    binary_sink = FileSink(path=str(tmp_path / 'b'), sink_format='binary')
+
+    jsonl_sink.send_message(MESSAGES[1])
+    binary_sink.send_message(MESSAGES[1])
+    jsonl_sink.close()
+    binary_sink.close()
+
+    assert binary_sink.bytes_written < jsonl_sink.bytes_written
+
+
+def test_file_sink_writes_full_buffer(tmp_path):
+    sink = FileSink(path=str(tmp_path / 'tracking.jsonl'),
+                    sink_format='jsonl', buffer_bytes=100, flush_interval=60)
+
+    for _ in range(10):
+        sink.send_message(MESSAGES[0])
+
+    assert sink.writes == 3  # every 3 messages of 44 bytes
+    assert sink.syncs == 0
+    sink.close()
+
+
+def test_file_sink_flushes_idle_buffer(tmp_path):
+    path = tmp_path / 'tracking.jsonl'
+    sink = FileSink(path=str(path), sink_format='jsonl', flush_interval=0.05)
+    sink.send_message(MESSAGES[0])
+    assert sink.writes == 0
+
+    deadline = time.monotonic() + 2
+    while not sink.syncs and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sink.syncs == 1, (
+        "Expected the flusher to write the buffer once the interval passed")
+    assert sink.writes == 1
+    assert path.read_bytes() == MESSAGES[0].encode() + b'\n'
+    sink.close()
+
+
+def test_unix_socket_sink_streams_messages(tmp_path):
+    path = str(tmp_path / 'tracking.sock')
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+    received = []
+
+    def receive():
+        connection, _ = server.accept()
+        with connection, connection.makefile('rb') as stream:
+            received.extend(read_messages(stream, 'jsonl'))
+
+    receiver = threading.Thread(target=receive)
+    receiver.start()
+    sink = UnixSocketSink(path=path, sink_format='jsonl')
+    for message in MESSAGES:
+        sink.send_message(message)
+    sink.close()
+    receiver.join(timeout=5)
+    server.close()
+
+    assert received == MESSAGES
+
+
+def test_registry_creates_local_sink():
+    registry = MessageSenderRegistry()
+
+    sender = registry.get_sender(sink='null', batching=True)
+
+    assert isinstance(sender, NullSink)
+    assert registry.get_sender(sink='null') is sender
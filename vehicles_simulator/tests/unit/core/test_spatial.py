@@ -0,0 +1,76 @@
+import math
+import random
+import pytest
+from app.core.location import BasicLocationService
+from app.core.spatial import SpatialGridIndex
+from app.utils import schemas
+
+
+def create_index(qty: int, cell_size: int, seed: int = 0):
+    rng = random.Random(seed)
+    index = SpatialGridIndex(cell_size=cell_size)
+    locations = {}
+    for key in range(qty):
+        locations[key] = (rng.randint(-20, 120), rng.randint(-20, 120))
+        index.insert(key, *locations[key])
+    return index, locations
+
+
+@pytest.mark.parametrize("qty", [1, 50, 2_000])
+@pytest.mark.parametrize("cell_size", [1, 5, 50])
+def test_nearest_matches_brute_force(qty, cell_size):
+    index, locations = create_index(qty, cell_size)
+    rng = random.Random(1)
+
+    for _ in range(20):
+        x, y = rng.randint(-50, 150), rng.randint(-50, 150)
+        expected = sorted(math.hypot(lx - x, ly - y)
+                          for lx, ly in locations.values())[:10]
+
+        found = index.nearest(x, y, k=10)
+
+        assert [distance for distance, _ in found] == expected
+        for distance, key in found:
+            lx, ly = locations[key]
+            assert distance == math.hypot(lx - x, ly - y)
+
+
+@pytest.mark.parametrize("cell_size", [1, 7])
+def test_range_query_matches_brute_force(cell_size):
+    index, locations = create_index(1_000, cell_size)
+
+    found = index.range_query(10, -5, 40, 33)
+
+    expected = {key for key, (x, y) in locations.items()
+                if 10 <= x <= 40 and -5 <= y <= 33}
+    assert sorted(found) == sorted(expected)
+
+
+def test_move_and_remove_update_buckets():
+    index = SpatialGridIndex(cell_size=10)
+    index.insert('a', 1, 1)
+
+    index.move('a', 5, 5)  # same bucket
+    assert index.location('a') == (5, 5)
+    index.move('a', 55, 5)
+
+    assert index.range_query(0, 0, 9, 9) == []
+    assert index.range_query(50, 0, 59, 9) == ['a']
+    index.remove('a')
+    assert 'a' not in index
+    assert index.nearest(0, 0) == []
+
+
+def test_location_service_updates_index():
+    index = SpatialGridIndex(cell_size=5)
+    service = BasicLocationService(
+        nav_map=None,
+        current_location=schemas.Location(x=1, y=1),
+        spatial_index=index,
+        index_key='vehicle',
+    )
+
+    service.update_location(schemas.Shift(x=10, y=-3))
+    assert index.location('vehicle') == (11, -2)
+    service.override_current_location(schemas.Location(x=40, y=40))
+    assert index.nearest(41, 41) == [(math.sqrt(2), 'vehicle')]
@@ -0,0 +1,239 @@
+from datetime import datetime, timedelta, timezone
+import json
+import pytest
+from app.core.interfaces import MessageSender
+from app.core.tracker import BasicTrackerManager
+from app.core.vehicle_factory import BasicVehicleFactory, singleton_map
+from app.utils.schemas import Location, TrackerStatus
+from common.schemas.sqs_messages import (
+    V2_LAYOUT,
+    VehicleTrackingMessageV2_0_0,
+    decode_tracking_message,
+)
+from common.telemetry.dead_reckoning import (
+    interpolate_track,
+    predict_location,
+    predict_location_at,
+)
+
+
+class RecordingSender(MessageSender):
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, message):
+        self.messages.append(message)
+
+
+def generate_message(schema_version):
+    vehicle = BasicVehicleFactory(
+        map_singleton=singleton_map,
+        message_sender=RecordingSender(),
+        root_seed=1,
+    ).create_vehicle(vehicle_index=0)
+    tracker = vehicle.tracker_manager
+    tracker.schema_version = schema_version
+    for _ in range(5):
+        vehicle.run_execution_step()
+    return tracker, tracker._generate_tracking_message()
+
+
+def test_v2_message_decodes_to_v1_fields():
+    tracker, body = generate_message('2.0.0')
+    expected = json.loads(tracker.tracking_data.model_dump_json())
+
+    decoded = decode_tracking_message(body)
+
+    assert decoded['vehicle_id'] == str(tracker.vehicle_id)
+    for field in ('task_state', 'vehicle_location', 'destination',
+                  'vehicle_speed', 'heading_direction',
+                  'distance_to_destination', 'out_of_zone_status'):
+        assert decoded[field] == expected[field], field
+    VehicleTrackingMessageV2_0_0.from_wire(body)  # passes validation
+
+
+def test_v2_message_is_smaller_than_v1():
+    _, v1_body = generate_message('1.0.0')
+    _, v2_body = generate_message('2.0.0')
+
+    assert decode_tracking_message(v1_body)['schema_version'] == '1.0.0'
+    assert len(v2_body) < len(v1_body) / 4
+    assert len(v2_body) == 4 * -(-V2_LAYOUT.size // 3)  # base64 length
+
+
+def test_decode_rejects_unknown_major_version():
+    _, body = generate_message('2.0.0')
+    data = bytearray(VehicleTrackingMessageV2_0_0.from_wire(body).to_bytes())
+    data[0] = 3
+
+    with pytest.raises(ValueError):
+        VehicleTrackingMessageV2_0_0.from_bytes(bytes(data))
+
+
+@pytest.mark.parametrize("schema_version", ['1.0.0', '2.0.0'])
+def test_fast_path_message_matches_validated_message(schema_version):
+    tracker, fast_message = generate_message(schema_version)
+    tracker.validate_messages = True
+
+    validated_message = tracker._generate_validated_tracking_message()
+
+    assert decode_tracking_message(fast_message) \
+        == decode_tracking_message(validated_message)
+
+
+def test_tracking_data_collected_once_per_step(monkeypatch):
+    tracker, _ = generate_message('1.0.0')
+    calls = []
+    collect = BasicTrackerManager.collect_tracking_data
+    monkeypatch.setattr(BasicTrackerManager, 'collect_tracking_data',
+                        lambda self: calls.append(collect(self)))
+
+    tracker.update()
+    tracker.send_tracking_data()
+
+    assert len(calls) == 1
+
+
+START_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def tracking_fields(y, speed=2, heading='Up', task_state='In progress',
+                    seconds=0):
+    return {
+        'task_state': task_state,
+        'vehicle_location': Location(x=0, y=y),
+        'destination': Location(x=0, y=50),
+        'vehicle_speed': speed,
+        'heading_direction': heading,
+        'distance_to_destination': 50.0 - y,
+        'out_of_zone_status': False,
+        'created_time': START_TIME + timedelta(seconds=seconds),
+    }
+
+
+@pytest.mark.parametrize("fields, reported", [
+    (tracking_fields(y=4, seconds=2), False),  # as predicted
+    (tracking_fields(y=4, speed=3, seconds=2), False),
+    (tracking_fields(y=7, seconds=2), True),  # off by 3 cells
+    (tracking_fields(y=4, heading='Left', seconds=2), True),
+    (tracking_fields(y=4, speed=4, seconds=2), True),
+    (tracking_fields(y=4, task_state='Idle', seconds=2), True),
+    (tracking_fields(y=4, seconds=10), True),  # heartbeat
+])
+def test_dead_reckoning_reports_significant_changes(fields, reported):
+    sender = RecordingSender()
+    tracker = BasicVehicleFactory(
+        map_singleton=singleton_map, message_sender=sender,
+    ).create_vehicle().tracker_manager
+    tracker.reporting = 'dead_reckoning'
+    tracker.speed_threshold = 1
+    tracker.position_threshold = 2.0
+    tracker.heartbeat = timedelta(seconds=10)
+    for step_fields in (tracking_fields(y=0), tracking_fields(y=2, seconds=1),
+                        fields):
+        tracker._tracking_fields = step_fields
+        tracker.send_tracking_data()
+
+    # the first message is always sent
+    assert len(sender.messages) == 1 + reported
+
+
+def test_interpolate_track_between_messages():
+    def message(x, y, seconds, heading='Up', task_state='In progress',
+                speed=2):
+        return {'vehicle_location': {'x': x, 'y': y},
+                'heading_direction': heading, 'vehicle_speed': speed,
+                'task_state': task_state,
+                'created_time': START_TIME + timedelta(seconds=seconds)}
+    messages = [
+        message(0, 0, 0),
+        # ISO format time as decoded from a message
+        {**message(0, 10, 10),
+         'created_time': '2024-01-01T00:00:10.000+00:00'},
+        # turned right on the last step, from (2, 10)
+        message(4, 10, 12, heading='Right'),
+        message(4, 10, 20, task_state='Idle'),
+        message(4, 12, 30),
+        # stopped in progress, no move since the previous message
+        message(4, 12, 40, speed=0),
+    ]
+    times = [START_TIME + timedelta(seconds=seconds)
+             for seconds in (-1, 0, 5, 11, 25, 35, 50)]
+
+    assert interpolate_track(messages, times) \
+        == [(0, 0), (0, 0), (0, 5), (2, 10), (4, 10), (4, 12), (4, 12)]
+    assert predict_location({'x': 0, 'y': 10}, 'Right', 2, 3) == (6, 10)
+    assert predict_location_at(messages[2], START_TIME + timedelta(
+        seconds=18), step_interval=2.0) == (10, 10)
+
+
+class ReplayFailingSender(RecordingSender):
+    """Raises on the first burst, does not accept the first message of
+    the second one"""
+    def __init__(self):
+        super().__init__()
+        self.bursts = 0
+
+    def send_messages(self, messages):
+        self.bursts += 1
+        if self.bursts == 1:
+            raise ConnectionError("Stub")
+        self.messages.extend(messages[1:])
+        return messages[:1]
+
+
+def create_offline_tracker(message_sender, offline_steps=3):
+    """Tracker of a vehicle that was OFFLINE for `offline_steps`"""
+    vehicle = BasicVehicleFactory(
+        map_singleton=singleton_map,
+        message_sender=message_sender,
+        root_seed=1,
+    ).create_vehicle(vehicle_index=0)
+    tracker = vehicle.tracker_manager
+    tracker.statuses_values = [TrackerStatus.OFFLINE]
+    tracker.statuses_weights = [1]
+    for _ in range(offline_steps):
+        tracker.update()
+        assert tracker.get_current_tracker_status() == TrackerStatus.OFFLINE
+        tracker.send_tracking_data()
+    return tracker
+
+
+def test_offline_messages_kept_until_replayed():
+    sender = ReplayFailingSender()
+    tracker = create_offline_tracker(sender)
+    backlog = tracker.offline_buffer.peek()
+    tracker.statuses_values = [TrackerStatus.ONLINE]
+
+    tracker.update()
+    tracker.send_tracking_data()  # replay raises
+    assert sender.messages == []
+    assert tracker.offline_buffer.peek()[:3] == backlog, (
+        "Expected the backlog kept, followed by the current message")
+    buffered = tracker.offline_buffer.peek()
+    assert len(buffered) == 4
+
+    tracker.update()
+    tracker.send_tracking_data()  # first message not accepted
+    assert sender.messages == buffered[1:]
+    assert tracker.offline_buffer.peek()[0] == backlog[0], (
+        "Expected the unsent message kept at the head of the buffer")
+    assert len(tracker.offline_buffer) == 2
+
+
+def test_offline_messages_replayed_on_reconnect():
+    recorder = RecordingSender()
+    tracker = create_offline_tracker(recorder)
+    assert recorder.messages == []
+    assert len(tracker.offline_buffer) == 3
+
+    tracker.statuses_values = [TrackerStatus.ONLINE]
+    tracker.update()
+    tracker.send_tracking_data()
+
+    created_times = [json.loads(message)['created_time']
+                     for message in recorder.messages]
+    assert len(created_times) == 4
+    assert created_times == sorted(created_times), (
+        "Expected buffered messages replayed in order, before the current")
+    assert len(tracker.offline_buffer) == 0
@@ -0,0 +1,92 @@
+from app.core.interfaces import MessageSender
+from app.core.vehicle_factory import BasicVehicleFactory, singleton_map
+
+
+class NullMessageSender(MessageSender):
+    def send_message(self, message):
+        pass
+
+
+def create_factory(root_seed=1):
+    return BasicVehicleFactory(map_singleton=singleton_map,
+                               message_sender=NullMessageSender(),
+                               root_seed=root_seed)
+
+
+def run_trajectory(vehicle, steps=50):
+    trajectory = []
+    for _ in range(steps):
+        vehicle.run_execution_step()
+        trajectory.append(vehicle.get_current_location())
+    return trajectory
+
+
+def test_vehicle_trajectory_is_reproducible():
+    first = create_factory().create_vehicle(vehicle_index=7)
+    second = create_factory().create_vehicle(vehicle_index=7)
+
+    assert first.vehicle_id == second.vehicle_id
+    assert run_trajectory(first) == run_trajectory(second), (
+        "Expected vehicles with the same seed and index to have "
+        "identical trajectories")
+
+
+def test_vehicle_trajectory_independent_of_other_vehicles():
+    factory = create_factory()
+    vehicles = [factory.create_vehicle() for _ in range(3)]
+    for _ in range(10):  # interleave other vehicles steps
+        vehicles[0].run_execution_step()
+        vehicles[2].run_execution_step()
+    alone = create_factory().create_vehicle(vehicle_index=1)
+
+    assert run_trajectory(vehicles[1]) == run_trajectory(alone)
+
+
+def test_vehicles_get_distinct_ids():
+    factory = create_factory()
+    ids = {factory.create_vehicle().vehicle_id for _ in range(100)}
+
+    assert len(ids) == 100
+
+
+def test_fleet_matches_vehicles_created_one_by_one():
+    fleet = create_factory().create_fleet(qty=3, first_vehicle_index=5)
+    factory = create_factory()
+    vehicles = [factory.create_vehicle(vehicle_index=5 + i) for i in range(3)]
+
+    assert [vehicle.vehicle_id for vehicle in fleet] == \
+        [vehicle.vehicle_id for vehicle in vehicles]
+    assert [run_trajectory(vehicle) for vehicle in fleet] == \
+        [run_trajectory(vehicle) for vehicle in vehicles]
+
+
+def test_fleet_continues_vehicle_indices():
+    factory = create_factory()
+    factory.create_fleet(qty=3)
+    following = factory.create_vehicle()
+
+    assert following.vehicle_id == \
+        create_factory().create_vehicle(vehicle_index=3).vehicle_id
+
+
+def test_vehicle_components_have_no_instance_dict():
+    vehicle = create_factory().create_vehicle()
+    navigation = vehicle.navigation_manager
+    components = [
+        vehicle, navigation, navigation.location_service,
+        navigation.movement_manager, navigation.heading_selector,
+        navigation.destination_tracker, navigation.allowed_zone_manager,
+        vehicle.tasks_manager, vehicle.tracker_manager,
+        vehicle.tracker_manager.offline_buffer,
+    ]
+
+    assert [type(component).__name__ for component in components
+            if hasattr(component, '__dict__')] == []
+
+
+def test_vehicles_share_provider_registrations():
+    factory = create_factory()
+    first, second = factory.create_fleet(qty=2)
+
+    assert first.navigation_manager.heading_selector.registrations is \
+        second.navigation_manager.heading_selector.registrations
@@ -0,0 +1,172 @@
+import base64
+from datetime import datetime, timezone
+from decimal import Decimal
+import importlib.util
+from pathlib import Path
+from uuid import UUID
+import pytest
+from botocore.exceptions import ClientError
+from common.schemas.sqs_messages import dump_tracking_message_json, encode_v2
+
+LAMBDA_PATH = Path(__file__).parents[4] / 'lambdas' / 'sqs_to_dynamodb' \
+    / 'lambda_function.py'
+VEHICLE_ID = UUID('12345678-1234-4234-8234-123456789abc')
+
+
+class StubDynamoDB:
+    """Records batch writes, leaves given numbers of items unprocessed on
+    consecutive calls"""
+    def __init__(self, unprocessed=()):
+        self.requests = []
+        self.unprocessed = list(unprocessed)
+
+    def Table(self, name):  # pylint: disable=invalid-name
+        return StubTable(name)
+
+    def batch_write_item(self, RequestItems):
+        (table_name, requests), = RequestItems.items()
+        self.requests.append(requests)
+        count = self.unprocessed.pop(0) if self.unprocessed else 0
+        return {'UnprocessedItems': {table_name: requests[:count]}
+                if count else {}}
+
+    def written_items(self) -> list:
+        """Items of the last write of every key"""
+        items = {}
+        for requests in self.requests:
+            for request in requests:
+                item = request['PutRequest']['Item']
+                items[(item['pk'], item['sk'])] = item
+        return list(items.values())
+
+
+class StubTable:
+    """Keeps latest state items of conditional puts"""
+    def __init__(self, name):
+        self.name = name
+        self.items = {}
+
+    def put_item(self, Item, ConditionExpression,
+                 ExpressionAttributeValues):
+        assert ConditionExpression == \
+            'attribute_not_exists(pk) OR created_time < :created_time'
+        key = (Item['pk'], Item['sk'])
+        stored = self.items.get(key)
+        if stored is not None and stored['created_time'] \
+                >= ExpressionAttributeValues[':created_time']:
+            raise ClientError({'Error': {
+                'Code': 'ConditionalCheckFailedException'}}, 'PutItem')
+        self.items[key] = Item
+
+
+@pytest.fixture(name="lambda_function")
+def lambda_function_fixture(monkeypatch):
+    monkeypatch.setenv('DYNAMODB_TABLE', 'tracking')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'eu-central-1')
+    spec = importlib.util.spec_from_file_location('sqs_to_dynamodb_lambda',
+                                                  LAMBDA_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.dynamodb = StubDynamoDB()
+    module.table = module.dynamodb.Table('tracking')
+    monkeypatch.setattr(module, 'BATCH_WRITE_BACKOFF_SEC', 0)
+    return module
+
+
+def message_fields(vehicle_id=VEHICLE_ID, second=0):
+    return {
+        'schema_version': '1.0.0',
+        'vehicle_id': vehicle_id,
+        'task_state': 'In progress',
+        'vehicle_location': {'x': 3, 'y': -4},
+        'destination': {'x': 10, 'y': 20},
+        'vehicle_speed': 2,
+        'distance_to_destination': 12.5,
+        'heading_direction': 'Left',
+        'out_of_zone_status': False,
+        'created_time': datetime(2024, 1, 1, 0, 0, second, 123000,
+                                 tzinfo=timezone.utc),
+    }
+
+
+def v1_record(**fields):
+    return {'body': dump_tracking_message_json(message_fields(**fields))}
+
+
+def v2_record(**fields):
+    return {'body': base64.b64encode(
+        encode_v2(message_fields(**fields))).decode()}
+
+
+def test_json_floats_parsed_to_decimal(lambda_function):
+    message = lambda_function.parse_record(v1_record())
+
+    assert message['distance_to_destination'] == Decimal('12.5')
+    assert isinstance(message['distance_to_destination'], Decimal)
+
+
+def test_v2_record_stored_as_v1_record(lambda_function):
+    v1_message = lambda_function.parse_record(v1_record())
+    v2_message = lambda_function.parse_record(v2_record())
+
+    v1_item = lambda_function.track_item(v1_message)
+    v2_item = lambda_function.track_item(v2_message)
+    for item in (v1_item, v2_item):
+        del item['data']['schema_version']
+        del item['data']['created_time']
+    assert v2_item == v1_item
+    assert lambda_function.latest_state_item(v2_message) \
+        == lambda_function.latest_state_item(v1_message)
+
+
+def test_items_written_in_batches_of_25(lambda_function):
+    records = [v1_record(vehicle_id=UUID(int=i, version=4))
+               for i in range(30)]
+    lambda_function.lambda_handler({'Records': records}, None)
+
+    assert [len(requests) for requests in lambda_function.dynamodb.requests] \
+        == [25, 5]
+    assert len(lambda_function.table.items) == 30, (
+        "Expected a latest state item per vehicle")
+
+
+def test_unprocessed_items_retried(lambda_function):
+    lambda_function.dynamodb.unprocessed = [2, 1]
+    lambda_function.write_batch([{'pk': str(i), 'sk': 'LATEST'}
+                                 for i in range(5)])
+
+    assert [len(requests) for requests in lambda_function.dynamodb.requests] \
+        == [5, 2, 1]
+
+
+def test_unprocessed_items_fail_invocation(lambda_function, monkeypatch):
+    monkeypatch.setattr(lambda_function, 'BATCH_WRITE_MAX_RETRIES', 2)
+    lambda_function.dynamodb.unprocessed = [1, 1, 1]
+
+    with pytest.raises(RuntimeError):
+        lambda_function.write_batch([{'pk': '1', 'sk': 'LATEST'}])
+
+
+def test_items_of_same_key_coalesced_to_newest(lambda_function):
+    records = [v1_record(second=5), v1_record(second=9), v1_record(second=1)]
+    lambda_function.lambda_handler({'Records': records}, None)
+
+    assert len(lambda_function.dynamodb.written_items()) == 3
+    assert [item['created_time']
+            for item in lambda_function.table.items.values()] \
+        == ['2024-01-01T00:00:09.123Z']
+
+
+def test_older_latest_state_does_not_overwrite_newer(lambda_function):
+    lambda_function.lambda_handler({'Records': [v1_record(second=9)]}, None)
+    # redelivered and replayed messages, in later invocations
+    lambda_function.lambda_handler({'Records': [v1_record(second=9)]}, None)
+    lambda_function.lambda_handler({'Records': [v1_record(second=1)]}, None)
+
+    assert [item['created_time']
+            for item in lambda_function.table.items.values()] \
+        == ['2024-01-01T00:00:09.123Z']
+    lambda_function.lambda_handler({'Records': [v1_record(second=30)]}, None)
+    assert [item['created_time']
+            for item in lambda_function.table.items.values()] \
+        == ['2024-01-01T00:00:30.123Z']
@@ -0,0 +1,13 @@
+import pytest
+from app.app import split_fleet
+
+
+@pytest.mark.parametrize(
+    "qty_vehicles, shards, expected", [
+        (10, 3, [4, 3, 3]),
+        (9, 3, [3, 3, 3]),
+        (2, 4, [1, 1, 0, 0]),
+    ]
+)
+def test_split_fleet(qty_vehicles, shards, expected):
+    assert split_fleet(qty_vehicles, shards) == expected
@@ -0,0 +1,62 @@
+import logging
+import queue
+from app.utils.logger import (
+    DeferredFormatQueueHandler,
+    RateLimitFilter,
+    SamplingFilter,
+    _match_logger_value,
+)
+
+
+def make_record(level=logging.DEBUG, msg="moved to %s", args=(1,)):
+    return logging.LogRecord('app.core.location', level, __file__, 1, msg,
+                             args, None)
+
+
+def test_sampling_filter_keeps_every_nth_record():
+    sampling_filter = SamplingFilter(rate=0.1)
+
+    kept = [sampling_filter.filter(make_record()) for _ in range(100)]
+
+    assert sum(kept) == 10
+    assert sampling_filter.dropped == 90
+
+
+def test_filters_keep_warnings():
+    sampling_filter = SamplingFilter(rate=0)
+    rate_limit_filter = RateLimitFilter(per_second=0)
+
+    record = make_record(level=logging.WARNING)
+
+    assert sampling_filter.filter(record)
+    assert rate_limit_filter.filter(record)
+
+
+def test_rate_limit_filter_drops_burst():
+    rate_limit_filter = RateLimitFilter(per_second=5)
+
+    kept = [rate_limit_filter.filter(make_record()) for _ in range(100)]
+
+    assert sum(kept) == 5
+
+
+def test_logger_value_matches_longest_prefix():
+    values = {'app': 0.5, 'app.core': 0.1, 'app.core.location': 0.01}
+
+    assert _match_logger_value('app.core.location', values) == 0.01
+    assert _match_logger_value('app.core.movement', values) == 0.1
+    assert _match_logger_value('app.core_extra', values) == 0.5
+    assert _match_logger_value('benchmarks', values) is None
+
+
+def test_queue_handler_merges_arguments_before_queueing():
+    records = queue.SimpleQueue()
+    handler = DeferredFormatQueueHandler(records)
+    args = [1]
+
+    handler.handle(make_record(msg="moved to %s", args=(args,)))
+    args.append(2)  # changed after logging
+
+    record = records.get_nowait()
+    assert record.getMessage() == "moved to [1]"
+    assert record.args is None
@@ -0,0 +1,62 @@
+from app.utils.metrics import NULL_METRIC, MetricsRegistry, format_stats
+
+
+def test_disabled_registry_hands_out_null_metrics():
+    registry = MetricsRegistry(enabled=False)
+
+    counter = registry.counter('steps_total', "Steps")
+    counter.inc()
+    with registry.histogram('stage_seconds', "Stages").time():
+        pass
+
+    assert counter is NULL_METRIC
+    assert registry.render() == '\n'
+
+
+def test_same_name_and_labels_return_same_metric():
+    registry = MetricsRegistry(enabled=True)
+
+    first = registry.histogram('stage_seconds', "Stages", stage='task')
+    second = registry.histogram('stage_seconds', "Stages", stage='task')
+    other = registry.histogram('stage_seconds', "Stages", stage='send')
+
+    assert first is second
+    assert first is not other
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry(enabled=True)
+    registry.counter('steps_total', "Steps").inc(3)
+    registry.gauge('in_flight', "In flight", function=lambda: 7)
+    histogram = registry.histogram('stage_seconds', "Stages",
+                                   buckets=(0.1, 1.0), stage='task')
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    lines = registry.render().splitlines()
+
+    assert '# TYPE steps_total counter' in lines
+    assert 'steps_total 3' in lines
+    assert 'in_flight 7' in lines
+    assert 'stage_seconds_bucket{stage="task",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="task",le="1.0"} 2' in lines
+    assert 'stage_seconds_bucket{stage="task",le="+Inf"} 3' in lines
+    assert 'stage_seconds_count{stage="task"} 3' in lines
+
+
+def test_format_stats_reports_rates_over_period():
+    registry = MetricsRegistry(enabled=True)
+    counter = registry.counter('steps_total', "Steps")
+    histogram = registry.histogram('stage_seconds', "Stages", stage='task')
+    counter.inc(10)
+    histogram.observe(0.001)
+    previous = registry.snapshot()
+    counter.inc(20)
+    histogram.observe(0.002)
+    histogram.observe(0.004)
+
+    line = format_stats(registry.snapshot(), previous, elapsed=2)
+
+    assert 'steps_total=10.0/s' in line
+    assert 'stage_seconds{stage="task"}=2x3.000ms' in line